@@ -2,3 +2,9 @@ export function cn(...inputs) {
   return inputs.filter(Boolean).join(' ');
 }
 
+
+// Bearer token of the logged-in admin, for the API's admin endpoints
+export function authHeaders() {
+  const token = localStorage.getItem('authToken');
+  return token ? { 'Authorization': `Bearer ${token}` } : {};
+}
@@ -2,6 +2,7 @@ import { useState, useEffect } from "react";
 import { useNavigate, useParams } from "react-router-dom";
 import useAlert from "../hooks/useAlert";
 import AlertContainer from "../components/ui/AlertContainer";
+import { authHeaders } from "../lib/utils";
 
 const AddEditProduct = () => {
   const navigate = useNavigate();
@@ -195,6 +196,7 @@ const AddEditProduct = () => {
         headers: {
           'Content-Type': 'application/json',
           'Accept': 'application/json',
+          ...authHeaders(),
         },
         body: JSON.stringify(productData),
       };
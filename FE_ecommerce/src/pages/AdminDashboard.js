@@ -4,6 +4,7 @@ import LogoutButton from '../components/LogoutButton';
 import AlertContainer from '../components/ui/AlertContainer';
 import useAlert from '../hooks/useAlert';
 import Rupiah from "../components/Rupiah";
+import { authHeaders } from "../lib/utils";
 
 const AdminDashboard = () => {
   const [products, setProducts] = useState([]);
@@ -72,6 +73,7 @@ const AdminDashboard = () => {
           method: 'DELETE',
           headers: {
             'Content-Type': 'application/json',
+            ...authHeaders(),
           },
         });
 
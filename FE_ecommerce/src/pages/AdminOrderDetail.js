@@ -21,6 +21,9 @@ const AdminOrderDetail = () => {
   }, [orderId, navigate]);
 
   const updateOrderStatus = (newStatus) => {
+    if (!canMoveTo(order.status, newStatus)) {
+      return;
+    }
     const storedOrders = JSON.parse(localStorage.getItem("orders")) || [];
     const updatedOrders = storedOrders.map(o => 
       o.orderId === orderId ? { ...o, status: newStatus } : o
@@ -32,25 +35,43 @@ const AdminOrderDetail = () => {
   const getStatusColor = (status) => {
     switch (status) {
       case 'pending': return 'bg-yellow-100 text-yellow-800 border-yellow-200';
-      case 'processing': return 'bg-blue-100 text-blue-800 border-blue-200';
-      case 'shipped': return 'bg-purple-100 text-purple-800 border-purple-200';
+      case 'confirmed': return 'bg-blue-100 text-blue-800 border-blue-200';
+      case 'preparing': return 'bg-orange-100 text-orange-800 border-orange-200';
+      case 'shipping': return 'bg-purple-100 text-purple-800 border-purple-200';
       case 'delivered': return 'bg-green-100 text-green-800 border-green-200';
+      case 'completed': return 'bg-green-100 text-green-800 border-green-200';
+      case 'cancelled': return 'bg-red-100 text-red-800 border-red-200';
       default: return 'bg-gray-100 text-gray-800 border-gray-200';
     }
   };
 
+  // Same flow as the API (product_api/order_status.py): forward only,
+  // cancellable until delivered, completed and cancelled are final
   const getStatusSteps = () => [
     { key: 'pending', label: 'Order Pending', icon: '📋' },
-    { key: 'processing', label: 'Processing', icon: '⚙️' },
-    { key: 'shipped', label: 'Shipped', icon: '🚚' },
-    { key: 'delivered', label: 'Delivered', icon: '✅' }
+    { key: 'confirmed', label: 'Confirmed', icon: '✅' },
+    { key: 'preparing', label: 'Preparing', icon: '👨‍🍳' },
+    { key: 'shipping', label: 'Shipping', icon: '🚚' },
+    { key: 'delivered', label: 'Delivered', icon: '📦' },
+    { key: 'completed', label: 'Completed', icon: '✨' }
   ];
 
+  const cancelStep = { key: 'cancelled', label: 'Cancel Order', icon: '❌' };
+  const cancellable = ['pending', 'confirmed', 'preparing', 'shipping'];
+
   const getStatusIndex = (status) => {
     const steps = getStatusSteps();
     return steps.findIndex(step => step.key === status);
   };
 
+  const canMoveTo = (current, target) => {
+    if (target === 'cancelled') {
+      return cancellable.includes(current);
+    }
+    const currentIndex = getStatusIndex(current);
+    return currentIndex >= 0 && getStatusIndex(target) > currentIndex;
+  };
+
   const formatDate = (dateString) => {
     const date = new Date(dateString);
     return date.toLocaleDateString('en-US', {
@@ -237,14 +258,17 @@ const AdminOrderDetail = () => {
             <div className="bg-white rounded-lg shadow-lg p-6">
               <h3 className="text-lg font-medium text-gray-900 mb-4">Update Status</h3>
               <div className="space-y-3">
-                {statusSteps.map((step) => (
+                {[...statusSteps, cancelStep].map((step) => (
                   <button
                     key={step.key}
                     onClick={() => updateOrderStatus(step.key)}
+                    disabled={order.status !== step.key && !canMoveTo(order.status, step.key)}
                     className={`w-full flex items-center justify-between p-3 rounded-lg border transition-colors ${
                       order.status === step.key
                         ? 'bg-purple-50 border-purple-200 text-purple-800'
-                        : 'bg-gray-50 border-gray-200 text-gray-700 hover:bg-gray-100'
+                        : canMoveTo(order.status, step.key)
+                        ? 'bg-gray-50 border-gray-200 text-gray-700 hover:bg-gray-100'
+                        : 'bg-gray-50 border-gray-200 text-gray-400 cursor-not-allowed'
                     }`}
                   >
                     <div className="flex items-center space-x-3">
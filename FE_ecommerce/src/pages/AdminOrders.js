@@ -4,6 +4,7 @@ import Rupiah from "../components/Rupiah";
 import { useNavigate } from "react-router-dom";
 import useAlert from "../hooks/useAlert";
 import AlertContainer from "../components/ui/AlertContainer";
+import { authHeaders } from "../lib/utils";
 
 const AdminOrderManagement = () => {
   const [orders, setOrders] = useState([]);
@@ -113,6 +114,7 @@ const AdminOrderManagement = () => {
         method: 'GET',
         headers: {
           'Content-Type': 'application/json',
+          ...authHeaders(),
         },
         credentials: 'include'
       });
@@ -153,6 +155,7 @@ const AdminOrderManagement = () => {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          ...authHeaders(),
         },
         credentials: 'include'
       });
@@ -190,6 +193,7 @@ const AdminOrderManagement = () => {
         method: 'PUT',
         headers: {
           'Content-Type': 'application/json',
+          ...authHeaders(),
         },
         credentials: 'include',
         body: JSON.stringify({
@@ -266,6 +270,7 @@ const AdminOrderManagement = () => {
         method: 'DELETE',
         headers: {
           'Content-Type': 'application/json',
+          ...authHeaders(),
         },
         credentials: 'include',
         body: JSON.stringify({
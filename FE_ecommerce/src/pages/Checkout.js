@@ -1,4 +1,4 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import { useNavigate } from "react-router-dom";
 import Rupiah from "../components/Rupiah";
 import OrderSuccessAlert from "../components/ui/OrderSuccessAlert";
@@ -66,6 +66,9 @@ const Checkout = () => {
     phoneNumber: ""
   });
   const [loading, setLoading] = useState(false);
+  // Sent with every attempt to place this cart, so a retried request
+  // returns the order already created instead of creating another
+  const idempotencyKey = useRef(null);
   const [showSuccessAlert, setShowSuccessAlert] = useState(false);
   const [orderId, setOrderId] = useState("");
   const [redirectTimer, setRedirectTimer] = useState(null);
@@ -221,57 +224,31 @@ const Checkout = () => {
     }));
   };
 
-  // Generate unique order ID
-  const generateOrderId = () => {
-    const timestamp = Date.now().toString();
-    const random = Math.random().toString(36).substr(2, 9);
-    return `${timestamp.substr(-8)}-${random}`;
-  };
-
-  // Update product stock in backend
-  const updateProductStock = async (productId, newStock) => {
-    try {
-      const response = await fetch(`${API_BASE_URL}/products/${productId}`, {
-        method: 'PUT',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-          stock: newStock
-        })
-      });
-
-      if (!response.ok) {
-        throw new Error('Failed to update product stock');
-      }
-
-      return await response.json();
-    } catch (error) {
-      console.error('Error updating product stock:', error);
-      throw error;
-    }
-  };
-
-  // Create order in backend
+  // Place the order: the backend prices the cart, reserves stock and
+  // creates the order in one transaction
   const createOrder = async (orderData) => {
-    try {
-      const response = await fetch(`${API_BASE_URL}/orders`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify(orderData)
-      });
-
-      if (!response.ok) {
-        throw new Error('Failed to create order');
-      }
+    if (!idempotencyKey.current) {
+      idempotencyKey.current = crypto.randomUUID();
+    }
+    const response = await fetch(`${API_BASE_URL}/checkout`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'Idempotency-Key': idempotencyKey.current,
+      },
+      body: JSON.stringify(orderData)
+    });
+    const data = await response.json();
 
-      return await response.json();
-    } catch (error) {
-      console.error('Error creating order:', error);
+    if (!response.ok) {
+      // Nothing was stored for a failed attempt: the next one gets a new key
+      idempotencyKey.current = null;
+      const error = new Error(data.error || 'Failed to create order');
+      error.details = data.details || [];
       throw error;
     }
+
+    return data;
   };
 
   // Handle successful order placement
@@ -323,33 +300,7 @@ const Checkout = () => {
     setLoading(true);
 
     try {
-      // Final stock validation before placing order
-      const response = await fetch(`${API_BASE_URL}/products`);
-      if (!response.ok) {
-        throw new Error('Failed to fetch current stock');
-      }
-      const { products: currentProducts } = await response.json();
-      
-      const finalValidation = [];
-      cart.forEach(cartItem => {
-        const currentProduct = currentProducts.find(p => p.id === cartItem.id);
-        if (!currentProduct || cartItem.quantity > currentProduct.stock) {
-          finalValidation.push(cartItem.title);
-        }
-      });
-
-      if (finalValidation.length > 0) {
-        alert(`Stock has changed for: ${finalValidation.join(', ')}. Please refresh and try again.`);
-        window.location.reload();
-        return;
-      }
-
-      // Generate unique order ID
-      const generatedOrderId = generateOrderId();
-
-      // Prepare order data for backend
-      const orderData = {
-        orderId: generatedOrderId,
+      const createdOrder = await createOrder({
         customerInfo: {
           fullName: customerInfo.fullName,
           email: customerInfo.email,
@@ -358,48 +309,25 @@ const Checkout = () => {
         },
         items: cart.map(item => ({
           id: item.id,
-          title: item.title,
-          quantity: item.quantity,
-          price: item.price
-        })),
-        subtotal: parseFloat(calculateSubtotal()),
-        shipping: shippingCost,
-        total: parseFloat(totalCost),
-        status: 'pending',
-        statusHistory: [
-          {
-            status: 'pending',
-            timestamp: new Date().toISOString(),
-            updatedBy: 'system',
-            note: 'Order placed by customer'
-          }
-        ]
-      };
-
-      // Create order in backend
-      const createdOrder = await createOrder(orderData);
-
-      // Update product stock for each item in the cart
-      const stockUpdatePromises = cart.map(async (cartItem) => {
-        const currentProduct = currentProducts.find(p => p.id === cartItem.id);
-        if (currentProduct) {
-          const newStock = currentProduct.stock - cartItem.quantity;
-          return updateProductStock(cartItem.id, newStock);
-        }
+          quantity: item.quantity
+        }))
       });
 
-      // Wait for all stock updates to complete
-      await Promise.all(stockUpdatePromises);
-
       // Clear cart from localStorage
       localStorage.removeItem("cart");
       window.dispatchEvent(new Event("cartUpdated"));
       
       // Show success alert with order ID
-      handleOrderSuccess(createdOrder.orderId || generatedOrderId);
+      idempotencyKey.current = null;
+      handleOrderSuccess(createdOrder.orderId);
 
     } catch (error) {
       console.error('Error placing order:', error);
+      if (error.message === 'Stock validation failed') {
+        alert(`Stock has changed: ${error.details.join(', ')}. Please refresh and try again.`);
+        window.location.reload();
+        return;
+      }
       alert('Failed to place order. Please try again.');
     } finally {
       setLoading(false);
@@ -1,5 +1,5 @@
 
-import { useState, useEffect } from "react";
+import { useState } from "react";
 import Rupiah from "../components/Rupiah";
 
 const OrderTracking = () => {
@@ -7,7 +7,6 @@ const OrderTracking = () => {
   const [searchedOrder, setSearchedOrder] = useState(null);
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState("");
-  const [allOrders, setAllOrders] = useState([]);
 
   const API_BASE_URL = "http://localhost:6543/api"; // Sesuaikan dengan alamat backend kamu
 
@@ -51,27 +50,6 @@ const OrderTracking = () => {
     }
   };
 
-  useEffect(() => {
-    const fetchAllOrders = async () => {
-      try {
-        const response = await fetch(`${API_BASE_URL}/orders`, {
-          method: 'GET',
-          headers: {
-            'Content-Type': 'application/json',
-          },
-          credentials: 'include'
-        });
-        const data = await response.json();
-        setAllOrders(data.orders || []);
-      } catch (err) {
-        console.error("Failed to load all orders:", err);
-      }
-    };
-
-    fetchAllOrders();
-  }, []);
-
-
   const formatDate = (dateString) => {
     const date = new Date(dateString);
     return date.toLocaleDateString('en-US', {
@@ -93,7 +71,9 @@ const OrderTracking = () => {
     setError("");
 
     try {
-      const response = await fetch(`${API_BASE_URL}/orders/order-id/${orderId.trim()}`, {
+      // Public tracking endpoint: a status and totals summary, no customer details
+      const params = new URLSearchParams({ orderId: orderId.trim() });
+      const response = await fetch(`${API_BASE_URL}/orders/track?${params}`, {
         method: 'GET',
         headers: {
           'Content-Type': 'application/json',
@@ -102,11 +82,14 @@ const OrderTracking = () => {
       });
 
       if (!response.ok) {
-        throw new Error("Order not found");
+        throw new Error("Failed to fetch order. Please try again.");
       }
 
-      const order = await response.json();
-      setSearchedOrder(order);
+      const { orders } = await response.json();
+      if (!orders || orders.length === 0) {
+        throw new Error("Order not found");
+      }
+      setSearchedOrder(orders[0]);
     } catch (err) {
       setSearchedOrder(null);
       setError(err.message || "Failed to fetch order. Please try again.");
@@ -122,7 +105,7 @@ const OrderTracking = () => {
     return currentIndex >= 0 ? currentIndex : -1;
   };
 
-  const StatusProgress = ({ currentStatus, statusHistory }) => {
+  const StatusProgress = ({ currentStatus }) => {
     // If order is cancelled, show different flow
     if (currentStatus === 'cancelled') {
       return (
@@ -258,63 +241,31 @@ const OrderTracking = () => {
             {/* Order Status Progress */}
             <div className="px-6 py-6">
               <h3 className="text-lg font-semibold text-gray-900 mb-4">Order Progress</h3>
-              <StatusProgress currentStatus={searchedOrder.status} statusHistory={searchedOrder.statusHistory} />
+              <StatusProgress currentStatus={searchedOrder.status} />
             </div>
 
-            {/* Status History */}
-            {searchedOrder.statusHistory && searchedOrder.statusHistory.length > 0 && (
-              <div className="px-6 py-4 border-t border-gray-200">
-                <h4 className="text-lg font-semibold text-gray-900 mb-4">Status History</h4>
-                <div className="space-y-3">
-                  {searchedOrder.statusHistory.slice().reverse().map((history, historyIndex) => (
-                    <div key={historyIndex} className="flex items-start space-x-3 p-3 bg-gray-50 rounded-lg">
-                      <div className={`w-8 h-8 rounded-full flex items-center justify-center text-sm ${orderStatuses[history.status]?.color || 'bg-gray-100 text-gray-600'}`}>
-                        {orderStatuses[history.status]?.icon || '📝'}
-                      </div>
-                      <div className="flex-1">
-                        <div className="flex justify-between items-start">
-                          <div>
-                            <p className="font-medium text-gray-900">
-                              {orderStatuses[history.status]?.label || history.status}
-                            </p>
-                            <p className="text-sm text-gray-600 mt-1">
-                              {history.note}
-                            </p>
-                          </div>
-                          <div className="text-right text-xs text-gray-500">
-                            <div>{formatDate(history.timestamp)}</div>
-                            <div className="mt-1">by {history.updatedBy}</div>
-                          </div>
-                        </div>
-                      </div>
-                    </div>
-                  ))}
-                </div>
-              </div>
-            )}
-
-            {/* Ordered Items */}
+            {/* Order Summary */}
             <div className="px-6 py-4 border-t border-gray-200">
-              <h4 className="text-lg font-semibold text-gray-900 mb-4">Ordered Items</h4>
-              <div className="space-y-4">
-                {searchedOrder.items.map((item, index) => (
-                  <div key={index} className="flex items-center space-x-4 p-4 bg-gray-50 rounded-lg">
-                    <img 
-                      src={item.product.image} 
-                      alt={item.product.title} 
-                      className="h-16 w-16 object-contain rounded border bg-white"
-                    />
-                    <div className="flex-1">
-                      <h5 className="font-medium text-gray-900">{item.product.title}</h5>
-                      <p className="text-sm text-gray-600">
-                        Qty: {item.quantity} × <Rupiah value={item.price}/>
-                      </p>
-                    </div>
-                    <div className="text-lg font-semibold text-gray-900">
-                      <Rupiah value={((item.price || 0) * (item.quantity || 1)).toFixed(0)}/>
-                    </div>
+              <h4 className="text-lg font-semibold text-gray-900 mb-4">Order Summary</h4>
+              <div className="space-y-2 text-sm">
+                <div className="flex justify-between">
+                  <span className="text-gray-600">Items</span>
+                  <span className="font-medium text-gray-900">{searchedOrder.itemCount}</span>
+                </div>
+                <div className="flex justify-between">
+                  <span className="text-gray-600">Subtotal</span>
+                  <span className="font-medium text-gray-900"><Rupiah value={searchedOrder.subtotal}/></span>
+                </div>
+                <div className="flex justify-between">
+                  <span className="text-gray-600">Shipping</span>
+                  <span className="font-medium text-gray-900"><Rupiah value={searchedOrder.shipping}/></span>
+                </div>
+                {searchedOrder.updatedAt && (
+                  <div className="flex justify-between">
+                    <span className="text-gray-600">Last Updated</span>
+                    <span className="font-medium text-gray-900">{formatDate(searchedOrder.updatedAt)}</span>
                   </div>
-                ))}
+                )}
               </div>
             </div>
 
@@ -0,0 +1,135 @@
+"""Move order status history from orders.status_history into order_status_events
+
+Revision ID: 2c8f5a1e7d43
+Revises: 0b6e4d2f8a31
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+import json
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c8f5a1e7d43'
+down_revision: Union[str, None] = '0b6e4d2f8a31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+orders = sa.table(
+    'orders',
+    sa.column('id', sa.Integer),
+    sa.column('status_history', sa.JSON),
+    sa.column('updated_at', sa.DateTime),
+    sa.column('created_at', sa.DateTime),
+)
+events = sa.table(
+    'order_status_events',
+    sa.column('id', sa.Integer),
+    sa.column('order_id', sa.Integer),
+    sa.column('status', sa.String),
+    sa.column('ts', sa.DateTime),
+    sa.column('updated_by', sa.String),
+    sa.column('note', sa.Text),
+)
+
+
+def _history(value):
+    if isinstance(value, str):  # drivers without a native JSON type
+        value = json.loads(value)
+    return [entry for entry in value or [] if isinstance(entry, dict) and entry.get('status')]
+
+
+def _timestamp(value, fallback):
+    try:
+        ts = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return fallback
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def _batches(connection, statement, key):
+    """Rows of ``statement`` in ``key`` order, BATCH_SIZE at a time"""
+    last = None
+    while True:
+        query = statement.order_by(key).limit(BATCH_SIZE)
+        if last is not None:
+            query = query.where(key > last)
+        rows = connection.execute(query).all()
+        if not rows:
+            return
+        yield rows
+        last = rows[-1][0]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'order_status_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('ts', sa.DateTime(), nullable=False),
+        sa.Column('updated_by', sa.String(length=100), nullable=True),
+        sa.Column('note', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id'],
+                                name=op.f('fk_order_status_events_order_id_orders')),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_order_status_events')),
+    )
+
+    connection = op.get_bind()
+    source = sa.select(orders.c.id, orders.c.status_history, orders.c.updated_at, orders.c.created_at) \
+        .where(orders.c.status_history.isnot(None))
+    for rows in _batches(connection, source, orders.c.id):
+        values = [
+            {
+                'order_id': row.id,
+                'status': str(entry['status']),
+                'ts': _timestamp(entry.get('timestamp'), row.updated_at or row.created_at),
+                'updated_by': entry.get('updatedBy'),
+                'note': entry.get('note'),
+            }
+            for row in rows for entry in _history(row.status_history)
+        ]
+        if values:
+            connection.execute(events.insert(), values)
+
+    # Built after the backfill rather than maintained through it
+    op.create_index('ix_order_status_events_order_id_ts', 'order_status_events', ['order_id', 'ts'])
+    op.create_index('ix_order_status_events_status_ts', 'order_status_events', ['status', 'ts'])
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.drop_column('status_history')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.add_column(sa.Column('status_history', sa.JSON(), nullable=True))
+
+    connection = op.get_bind()
+    source = sa.select(events.c.order_id).distinct()
+    for rows in _batches(connection, source, events.c.order_id):
+        history = {}
+        for event in connection.execute(
+                sa.select(events)
+                .where(events.c.order_id.in_([row.order_id for row in rows]))
+                .order_by(events.c.order_id, events.c.ts, events.c.id)):
+            history.setdefault(event.order_id, []).append({
+                'status': event.status,
+                'timestamp': event.ts.isoformat() if event.ts else None,
+                'updatedBy': event.updated_by,
+                'note': event.note,
+            })
+        for order_id, entries in history.items():
+            connection.execute(orders.update().where(orders.c.id == order_id).values(status_history=entries))
+
+    op.drop_index('ix_order_status_events_status_ts', table_name='order_status_events')
+    op.drop_index('ix_order_status_events_order_id_ts', table_name='order_status_events')
+    op.drop_table('order_status_events')
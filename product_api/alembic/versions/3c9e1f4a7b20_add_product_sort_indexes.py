@@ -0,0 +1,34 @@
+"""Add composite indexes backing product keyset pagination
+
+Revision ID: 3c9e1f4a7b20
+Revises: a76eaa7516b3
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e1f4a7b20'
+down_revision: Union[str, None] = 'a76eaa7516b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NULL stock would fall out of keyset comparisons on sort=stock
+    op.execute("UPDATE products SET stock = 0 WHERE stock IS NULL")
+    op.create_index('ix_products_price_id', 'products', ['price', 'id'])
+    op.create_index('ix_products_title_id', 'products', ['title', 'id'])
+    op.create_index('ix_products_stock_id', 'products', ['stock', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_stock_id', table_name='products')
+    op.drop_index('ix_products_title_id', table_name='products')
+    op.drop_index('ix_products_price_id', table_name='products')
@@ -0,0 +1,34 @@
+"""Add orders.stock_restored guarding against restocking an order twice
+
+Revision ID: 6f3b9d2e4a18
+Revises: 2c8f5a1e7d43
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6f3b9d2e4a18'
+down_revision: Union[str, None] = '2c8f5a1e7d43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+orders = sa.table('orders', sa.column('status', sa.String), sa.column('stock_restored', sa.Boolean))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('orders', sa.Column('stock_restored', sa.Boolean(), nullable=False,
+                                      server_default=sa.false()))
+    # Cancelling through PUT /api/orders/{id}/status has always restocked
+    op.execute(orders.update().where(orders.c.status == 'cancelled').values(stock_restored=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.drop_column('stock_restored')
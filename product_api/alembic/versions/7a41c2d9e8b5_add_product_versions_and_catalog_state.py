@@ -0,0 +1,47 @@
+"""Add product version/updated_at and the catalog_state version row
+
+Revision ID: 7a41c2d9e8b5
+Revises: 5d2b8e0c9f13
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a41c2d9e8b5'
+down_revision: Union[str, None] = '5d2b8e0c9f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('version', sa.Integer(), nullable=False,
+                                        server_default=sa.text('1')))
+    op.add_column('products', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE products SET updated_at = CURRENT_TIMESTAMP")
+    # SQLite would need a table rebuild (dropping the FTS triggers) to add
+    # NOT NULL afterwards; the application always writes updated_at anyway.
+    if op.get_bind().dialect.name != 'sqlite':
+        op.alter_column('products', 'updated_at', existing_type=sa.DateTime(), nullable=False)
+
+    op.create_table(
+        'catalog_state',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_catalog_state')),
+    )
+    op.execute("INSERT INTO catalog_state (id, version, updated_at) "
+               "VALUES (1, 0, CURRENT_TIMESTAMP)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('catalog_state')
+    op.drop_column('products', 'updated_at')
+    op.drop_column('products', 'version')
@@ -0,0 +1,43 @@
+"""Add the catalog change log behind GET /api/products/changes
+
+Revision ID: 9e2f6b3a1c47
+Revises: 7a41c2d9e8b5
+Create Date: 2026-10-18 10:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e2f6b3a1c47'
+down_revision: Union[str, None] = '7a41c2d9e8b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('catalog_state', sa.Column('changes_horizon', sa.BigInteger(), nullable=False,
+                                             server_default='0'))
+    op.create_table(
+        'catalog_changes',
+        sa.Column('seq', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('op', sa.String(length=10), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('seq', name=op.f('pk_catalog_changes')),
+        sqlite_autoincrement=True,
+    )
+    op.create_index(op.f('ix_catalog_changes_product_id'), 'catalog_changes', ['product_id'])
+    op.create_index(op.f('ix_catalog_changes_changed_at'), 'catalog_changes', ['changed_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_catalog_changes_changed_at'), table_name='catalog_changes')
+    op.drop_index(op.f('ix_catalog_changes_product_id'), table_name='catalog_changes')
+    op.drop_table('catalog_changes')
+    op.drop_column('catalog_state', 'changes_horizon')
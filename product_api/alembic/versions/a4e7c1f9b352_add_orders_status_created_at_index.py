@@ -0,0 +1,27 @@
+"""Add (status, created_at) index for expiring abandoned pending orders
+
+Revision ID: a4e7c1f9b352
+Revises: 6f3b9d2e4a18
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4e7c1f9b352'
+down_revision: Union[str, None] = '6f3b9d2e4a18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_orders_status_created_at', 'orders', ['status', 'created_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_orders_status_created_at', table_name='orders')
@@ -0,0 +1,49 @@
+"""Add products.sku, the upsert key of the bulk importer
+
+Also limits the SQLite FTS update trigger to real title/description
+changes, so re-importing an unchanged catalog does not rewrite the index.
+
+Revision ID: b5d83a0f6e21
+Revises: 9e2f6b3a1c47
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d83a0f6e21'
+down_revision: Union[str, None] = '9e2f6b3a1c47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+FTS_UPDATE_TRIGGER = (
+    "CREATE TRIGGER products_fts_au AFTER UPDATE OF title, description ON products {when}BEGIN "
+    "INSERT INTO products_fts(products_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO products_fts(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END"
+)
+FTS_UPDATE_WHEN = "WHEN old.title IS NOT new.title OR old.description IS NOT new.description "
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('sku', sa.String(length=64), nullable=True))
+    op.create_index('ix_products_sku', 'products', ['sku'], unique=True)
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS products_fts_au")
+        op.execute(FTS_UPDATE_TRIGGER.format(when=FTS_UPDATE_WHEN))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS products_fts_au")
+        op.execute(FTS_UPDATE_TRIGGER.format(when=''))
+    op.drop_index('ix_products_sku', table_name='products')
+    op.drop_column('products', 'sku')
@@ -0,0 +1,45 @@
+"""Add orders.ship_to_* snapshots of where each order ships
+
+Revision ID: b7e2a9d4c318
+Revises: a4e7c1f9b352
+Create Date: 2026-10-18 17:30:00.000000
+
+Existing orders get their customer's current details, before c6d2e8a4f170
+merges duplicate customers and rewrites the rows they point at.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2a9d4c318'
+down_revision: Union[str, None] = 'a4e7c1f9b352'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SNAPSHOT = {'ship_to_name': 'full_name', 'ship_to_address': 'address', 'ship_to_phone': 'phone_number'}
+
+customers = sa.table('customer_info', sa.column('id', sa.Integer),
+                     *[sa.column(name, sa.String) for name in SNAPSHOT.values()])
+orders = sa.table('orders', sa.column('customer_info_id', sa.Integer),
+                  *[sa.column(name, sa.String) for name in SNAPSHOT])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('orders', sa.Column('ship_to_name', sa.String(length=255), nullable=True))
+    op.add_column('orders', sa.Column('ship_to_address', sa.String(length=500), nullable=True))
+    op.add_column('orders', sa.Column('ship_to_phone', sa.String(length=20), nullable=True))
+    op.execute(orders.update().values({
+        column: sa.select(customers.c[source]).where(customers.c.id == orders.c.customer_info_id).scalar_subquery()
+        for column, source in SNAPSHOT.items()
+    }))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('orders') as batch_op:
+        for column in reversed(list(SNAPSHOT)):
+            batch_op.drop_column(column)
@@ -0,0 +1,106 @@
+"""Add customer_info.email_normalized, merge duplicate customers, make it unique
+
+Revision ID: c6d2e8a4f170
+Revises: b7e2a9d4c318
+Create Date: 2026-10-18 18:00:00.000000
+
+Running ``dedupe_product_api_customers`` first merges most duplicates in
+small transactions; whatever is left is merged here. Orders already carry
+their shipping snapshot (b7e2a9d4c318), so rewriting a kept row's details
+does not move them.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6d2e8a4f170'
+down_revision: Union[str, None] = 'b7e2a9d4c318'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+DETAILS = ('full_name', 'email', 'address', 'phone_number')
+
+customers = sa.table(
+    'customer_info',
+    sa.column('id', sa.Integer),
+    sa.column('email_normalized', sa.String),
+    sa.column('updated_at', sa.DateTime),
+    *[sa.column(name, sa.String) for name in DETAILS],
+)
+orders = sa.table('orders', sa.column('customer_info_id', sa.Integer))
+
+
+def normalize_email(email):
+    # Same as product_api.models.customer_info.normalize_email
+    return email.strip().casefold() if email else None
+
+
+def _backfill(connection):
+    last = 0
+    while True:
+        rows = connection.execute(
+            sa.select(customers.c.id, customers.c.email)
+            .where(customers.c.id > last).order_by(customers.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        connection.execute(
+            customers.update().where(customers.c.id == sa.bindparam('customer_id'))
+            .values(email_normalized=sa.bindparam('normalized')),
+            [{'customer_id': row.id, 'normalized': normalize_email(row.email)} for row in rows])
+        last = rows[-1].id
+
+
+def _merge_duplicates(connection):
+    """Keep the oldest row per email with the newest row's details"""
+    duplicate_keys = sa.select(customers.c.email_normalized) \
+        .where(customers.c.email_normalized.isnot(None)) \
+        .group_by(customers.c.email_normalized) \
+        .having(sa.func.count() > 1) \
+        .limit(BATCH_SIZE)
+    while True:
+        keys = connection.execute(duplicate_keys).scalars().all()
+        if not keys:
+            return
+        groups = {}
+        for row in connection.execute(
+                sa.select(customers).where(customers.c.email_normalized.in_(keys))
+                .order_by(customers.c.email_normalized, customers.c.id)):
+            groups.setdefault(row.email_normalized, []).append(row)
+        repoint, refresh, doomed = [], [], []
+        for group in groups.values():
+            keep, newest = group[0], group[-1]
+            refresh.append(dict({f'new_{name}': getattr(newest, name) for name in DETAILS}, keep_id=keep.id))
+            for row in group[1:]:
+                repoint.append({'keep_id': keep.id, 'duplicate_id': row.id})
+                doomed.append(row.id)
+        connection.execute(
+            orders.update().where(orders.c.customer_info_id == sa.bindparam('duplicate_id'))
+            .values(customer_info_id=sa.bindparam('keep_id')), repoint)
+        connection.execute(
+            customers.update().where(customers.c.id == sa.bindparam('keep_id'))
+            .values({name: sa.bindparam(f'new_{name}') for name in DETAILS}), refresh)
+        connection.execute(customers.delete().where(customers.c.id.in_(doomed)))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('customer_info', sa.Column('email_normalized', sa.String(length=255), nullable=True))
+    connection = op.get_bind()
+    _backfill(connection)
+    _merge_duplicates(connection)
+    op.create_index('uq_customer_info_email_normalized', 'customer_info', ['email_normalized'], unique=True)
+    # Lookups by email now go through email_normalized
+    op.drop_index('ix_customer_info_email', table_name='customer_info')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_customer_info_email', 'customer_info', ['email'])
+    op.drop_index('uq_customer_info_email_normalized', table_name='customer_info')
+    with op.batch_alter_table('customer_info') as batch_op:
+        batch_op.drop_column('email_normalized')
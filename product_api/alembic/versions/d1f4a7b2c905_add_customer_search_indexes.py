@@ -0,0 +1,33 @@
+"""Add indexes for customer search and keyset pages
+
+Revision ID: d1f4a7b2c905
+Revises: c6d2e8a4f170
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1f4a7b2c905'
+down_revision: Union[str, None] = 'c6d2e8a4f170'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_customer_info_name_key_id', 'customer_info', [sa.text('lower(full_name)'), 'id'])
+    # (phone_number, id) also serves the exact phone lookups of order tracking
+    op.create_index('ix_customer_info_phone_number_id', 'customer_info', ['phone_number', 'id'])
+    op.drop_index('ix_customer_info_phone_number', table_name='customer_info')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_customer_info_phone_number', 'customer_info', ['phone_number'])
+    op.drop_index('ix_customer_info_phone_number_id', table_name='customer_info')
+    op.drop_index('ix_customer_info_name_key_id', table_name='customer_info')
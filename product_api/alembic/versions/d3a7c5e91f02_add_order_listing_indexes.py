@@ -0,0 +1,34 @@
+"""Add composite indexes backing order keyset pagination and filters
+
+Revision ID: d3a7c5e91f02
+Revises: b5d83a0f6e21
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a7c5e91f02'
+down_revision: Union[str, None] = 'b5d83a0f6e21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NULL order_date would fall out of keyset comparisons on the default sort
+    op.execute("UPDATE orders SET order_date = created_at WHERE order_date IS NULL")
+    op.create_index('ix_orders_status_order_date_id', 'orders', ['status', 'order_date', 'id'])
+    op.create_index('ix_orders_order_date_id', 'orders', ['order_date', 'id'])
+    op.create_index('ix_orders_total_id', 'orders', ['total', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_orders_total_id', table_name='orders')
+    op.drop_index('ix_orders_order_date_id', table_name='orders')
+    op.drop_index('ix_orders_status_order_date_id', table_name='orders')
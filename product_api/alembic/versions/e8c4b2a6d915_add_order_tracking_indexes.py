@@ -0,0 +1,36 @@
+"""Add indexes for order tracking lookups by customer email/phone
+
+Revision ID: e8c4b2a6d915
+Revises: d3a7c5e91f02
+Create Date: 2026-10-18 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8c4b2a6d915'
+down_revision: Union[str, None] = 'd3a7c5e91f02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_customer_info_email', 'customer_info', ['email'])
+    op.create_index('ix_customer_info_phone_number', 'customer_info', ['phone_number'])
+    # Foreign keys are not indexed automatically: customer -> orders and
+    # order -> items lookups would otherwise scan
+    op.create_index('ix_orders_customer_info_id', 'orders', ['customer_info_id'])
+    op.create_index('ix_order_items_order_id', 'order_items', ['order_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_order_items_order_id', table_name='order_items')
+    op.drop_index('ix_orders_customer_info_id', table_name='orders')
+    op.drop_index('ix_customer_info_phone_number', table_name='customer_info')
+    op.drop_index('ix_customer_info_email', table_name='customer_info')
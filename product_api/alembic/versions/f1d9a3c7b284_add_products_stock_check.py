@@ -0,0 +1,35 @@
+"""Add CHECK (stock >= 0) on products
+
+Revision ID: f1d9a3c7b284
+Revises: e8c4b2a6d915
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1d9a3c7b284'
+down_revision: Union[str, None] = 'e8c4b2a6d915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The old checkout clamped oversold stock to 0, but other writers did not
+    op.execute("UPDATE products SET stock = 0 WHERE stock < 0")
+    # SQLite cannot add a constraint without rebuilding the table, which
+    # would drop the FTS triggers; new SQLite databases get it from the model
+    # and checkout's conditional UPDATE never goes below zero anyway.
+    if op.get_bind().dialect.name != 'sqlite':
+        op.create_check_constraint('stock_nonnegative', 'products', 'stock >= 0')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'sqlite':
+        op.drop_constraint('stock_nonnegative', 'products', type_='check')
@@ -0,0 +1,52 @@
+"""Index prefix-searched text in byte order on PostgreSQL
+
+Revision ID: f5c1e8a3b709
+Revises: e3b7f1c9a246
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5c1e8a3b709'
+down_revision: Union[str, None] = 'e3b7f1c9a246'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Prefix ranges compare with COLLATE "C" (models.meta.byte_order); SQLite
+# compares bytes already, so its indexes stay as they are.
+POSTGRESQL_UPGRADE = [
+    'DROP INDEX ix_customer_info_name_key_id',
+    'CREATE INDEX ix_customer_info_name_key_id ON customer_info (lower(full_name) COLLATE "C", id)',
+    'DROP INDEX ix_customer_info_phone_number_id',
+    'CREATE INDEX ix_customer_info_phone_number_id ON customer_info (phone_number COLLATE "C", id)',
+    'CREATE INDEX ix_customer_info_email_normalized_c_id ON customer_info (email_normalized COLLATE "C", id)',
+    'CREATE INDEX ix_orders_order_id_c ON orders (order_id COLLATE "C")',
+]
+
+POSTGRESQL_DOWNGRADE = [
+    'DROP INDEX ix_orders_order_id_c',
+    'DROP INDEX ix_customer_info_email_normalized_c_id',
+    'DROP INDEX ix_customer_info_phone_number_id',
+    'CREATE INDEX ix_customer_info_phone_number_id ON customer_info (phone_number, id)',
+    'DROP INDEX ix_customer_info_name_key_id',
+    'CREATE INDEX ix_customer_info_name_key_id ON customer_info (lower(full_name), id)',
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        for statement in POSTGRESQL_UPGRADE:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        for statement in POSTGRESQL_DOWNGRADE:
+            op.execute(statement)
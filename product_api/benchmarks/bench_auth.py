@@ -0,0 +1,77 @@
+"""Per-request cost of admin authentication: cached vs. uncached verification
+
+Times what the security policy does for one admin request (read the bearer
+token, verify it, check it is not revoked, load the active admin, grant the
+permission) with the process caches warm and with them disabled, which is
+what every request paid when the token was decoded and the admin queried in
+the view (and what a revocation query per request would add).
+
+    python benchmarks/bench_auth.py --requests 100000
+    python benchmarks/bench_auth.py --url postgresql://.../bench_db
+
+Without ``--url`` an in-memory SQLite database is used, which flatters the
+uncached path: a real database adds a network round trip per request.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from product_api import security
+from product_api.models import Admin, RevokedToken
+from product_api.models.meta import Base
+
+SECRET = 'bench-secret-' + 'x' * 32
+
+
+def run(authenticator, dbsession, token, requests):
+    policy = security.SecurityPolicy()
+    headers = {'Authorization': f'Bearer {token}'}
+    registry = {'authenticator': authenticator}
+    started = time.perf_counter()
+    for _ in range(requests):
+        # Only what the policy reads, so the timing is authentication alone
+        request = SimpleNamespace(headers=headers, environ={}, registry=registry, dbsession=dbsession)
+        assert policy.permits(request, None, security.ADMIN)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='sqlite://', help='database URL (default: in-memory SQLite)')
+    parser.add_argument('--requests', type=int, default=50000)
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    Base.metadata.create_all(engine, tables=[Admin.__table__, RevokedToken.__table__])
+    with Session(engine) as dbsession:
+        admin = Admin(username=f'bench-{time.time_ns()}')
+        admin.set_password('bench')
+        dbsession.add(admin)
+        dbsession.flush()
+        token = jwt.encode({'admin_id': admin.id, 'jti': 'bench', 'exp': int(time.time() + timedelta(hours=1).total_seconds())},
+                           SECRET, algorithm=security.JWT_ALGORITHM)
+        try:
+            for name, authenticator in (
+                    ('uncached', security.Authenticator(SECRET, claims_ttl=0, admin_ttl=0,
+                                                       revocation_refresh_interval=0)),
+                    ('cached', security.Authenticator(SECRET))):
+                run(authenticator, dbsession, token, 100)  # warm up
+                elapsed = run(authenticator, dbsession, token, args.requests)
+                print(f'{name:>8}: {elapsed / args.requests * 1e6:7.2f} us/request '
+                      f'({args.requests / elapsed:,.0f} requests/s)')
+        finally:
+            dbsession.rollback()
+    engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
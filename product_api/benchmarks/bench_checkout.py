@@ -0,0 +1,126 @@
+"""Concurrent checkout benchmark on one hot product
+
+Threads place single-line orders for the same product through the
+``create_order`` view, each with its own session and transaction, until
+the stock runs out. Reports checkouts/s and checks that the units sold
+match the stock taken (no oversell, no lost update). ``--legacy`` runs
+the previous read-check-decrement code for comparison.
+
+    python benchmarks/bench_checkout.py --threads 8 --stock 2000
+    python benchmarks/bench_checkout.py --url postgresql://.../bench_db --legacy
+
+Without ``--url`` a temporary SQLite file is used; SQLite allows one writer
+at a time, so run against PostgreSQL for meaningful concurrency numbers.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyramid.testing import DummyRequest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from product_api.models import CustomerInfo, Order, OrderItem, Product
+from product_api.models.meta import Base
+from product_api.views import orders
+
+CUSTOMER = {'fullName': 'Bench Shopper', 'email': 'bench@example.com',
+            'address': '1 Bench Street', 'phoneNumber': '555-0000'}
+
+
+def checkout(session, product_id):
+    request = DummyRequest(json_body={'customerInfo': CUSTOMER,
+                                      'items': [{'id': product_id, 'quantity': 1}]})
+    request.dbsession = session
+    response = orders.create_order(request)
+    if isinstance(response, dict):
+        session.commit()
+        return True
+    session.rollback()
+    return False
+
+
+def legacy_checkout(session, product_id):
+    """The former create_order: read, check, then decrement in Python"""
+    product = session.query(Product).filter(Product.id == product_id).first()
+    if product.stock < 1:
+        session.rollback()
+        return False
+    customer = CustomerInfo(**{'full_name': CUSTOMER['fullName'], 'email': CUSTOMER['email'],
+                               'address': CUSTOMER['address'], 'phone_number': CUSTOMER['phoneNumber']})
+    order = Order(order_id=f'ORD-{time.perf_counter_ns()}-{threading.get_ident()}',
+                  customer_info=customer, subtotal=0, shipping=0, total=0, status='pending')
+    order.order_items = [OrderItem(product_id=product.id, quantity=1, price=product.price)]
+    session.add(order)
+    product.stock = max(product.stock - 1, 0)
+    session.commit()
+    return True
+
+
+def worker(session_factory, product_id, place, counts, lock):
+    session = session_factory()
+    sold = errors = 0
+    while True:
+        try:
+            if not place(session, product_id):
+                break
+            sold += 1
+        except OperationalError:
+            # SQLite: database is locked
+            session.rollback()
+            errors += 1
+    session.close()
+    with lock:
+        counts['sold'] += sold
+        counts['errors'] += errors
+
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--stock', type=int, default=2000)
+    parser.add_argument('--url', help='Database URL (default: temporary SQLite file)')
+    parser.add_argument('--legacy', action='store_true', help='Run the old read-modify-write checkout')
+    args = parser.parse_args(argv)
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_checkout_'), 'bench.sqlite')}"
+    engine = create_engine(url, pool_size=args.threads, connect_args={'timeout': 30} if url.startswith('sqlite') else {})
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    with session_factory() as session:
+        product = Product(title='Hot item', description='Flash sale', price=9.99, stock=args.stock)
+        session.add(product)
+        session.commit()
+        product_id = product.id
+
+    counts = {'sold': 0, 'errors': 0}
+    lock = threading.Lock()
+    place = legacy_checkout if args.legacy else checkout
+    threads = [threading.Thread(target=worker, args=(session_factory, product_id, place, counts, lock))
+               for _ in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with session_factory() as session:
+        stock = session.execute(select(Product.stock).where(Product.id == product_id)).scalar()
+        units = session.execute(select(func.coalesce(func.sum(OrderItem.quantity), 0))).scalar()
+    print(f"{'legacy' if args.legacy else 'atomic'}: {counts['sold']} checkouts in {elapsed:.2f}s "
+          f"= {counts['sold'] / elapsed:,.0f}/s with {args.threads} threads "
+          f"(retried={counts['errors']})")
+    print(f"stock {args.stock} -> {stock}, units sold {units}, "
+          f"{'consistent' if args.stock - stock == units else 'INCONSISTENT: lost updates'}")
+
+
+if __name__ == '__main__':
+    main()
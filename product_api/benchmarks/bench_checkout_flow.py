@@ -0,0 +1,95 @@
+"""Latency and round trips per order: old storefront flow vs POST /api/checkout
+
+The old Checkout.js flow re-fetched the catalog (GET /api/products), posted
+the order with client-computed totals (POST /api/orders) and then sent one
+PUT /api/products/{id} per cart line with the new stock. The new flow is a
+single POST /api/checkout. Both run through the full WSGI app (pyramid_tm,
+caches) against a file database; SQL statements are counted on the engine.
+
+    python benchmarks/bench_checkout_flow.py --orders 200 --lines 3 --catalog 1000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from webtest import TestApp
+
+from product_api import main as make_app
+from product_api.models import Product
+from product_api.models.meta import Base
+
+CUSTOMER = {'fullName': 'Bench Shopper', 'email': 'bench@example.com',
+            'address': '1 Bench Street', 'phoneNumber': '555-0000'}
+
+
+def old_flow(app, cart):
+    catalog = {p['id']: p for p in app.get('/api/products').json['products']}
+    subtotal = sum(catalog[pid]['price'] * qty for pid, qty in cart)
+    app.post_json('/api/orders', {
+        'customerInfo': CUSTOMER,
+        'items': [{'id': pid, 'quantity': qty, 'price': catalog[pid]['price']} for pid, qty in cart],
+        'subtotal': subtotal, 'shipping': 0, 'total': subtotal, 'status': 'pending',
+    })
+    for pid, qty in cart:
+        app.put_json(f'/api/products/{pid}', {'stock': catalog[pid]['stock'] - qty})
+    return 2 + len(cart)
+
+
+def new_flow(app, cart):
+    app.post_json('/api/checkout', {
+        'customerInfo': CUSTOMER,
+        'items': [{'id': pid, 'quantity': qty} for pid, qty in cart],
+    })
+    return 1
+
+
+def run(label, flow, args):
+    path = os.path.join(tempfile.mkdtemp(prefix='bench_checkout_flow_'), 'bench.sqlite')
+    url = f'sqlite:///{path}'
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as session:
+        session.add_all([Product(title=f'Product {i}', description='Bench', price=10 + i % 50,
+                                 stock=10 ** 6) for i in range(args.catalog)])
+        session.commit()
+    engine.dispose()
+
+    app = make_app({}, **{'sqlalchemy.url': url, 'product_cache.enabled': 'true',
+                         'auth.jwt_secret': 'bench-secret-' + 'x' * 32})
+    statements = []
+    event.listen(app.registry['dbsession_factory'].kw['bind'], 'before_cursor_execute',
+                 lambda *a: statements.append(1))
+    client = TestApp(app)
+    latencies = []
+    requests = 0
+    for number in range(args.orders):
+        cart = [((number * 7 + line * 13) % args.catalog + 1, 1 + line % 2) for line in range(args.lines)]
+        started = time.perf_counter()
+        requests += flow(client, cart)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    print(f"{label}: {requests / args.orders:.1f} HTTP requests, "
+          f"{len(statements) / args.orders:.1f} SQL statements per order; latency "
+          f"median {statistics.median(latencies) * 1000:.1f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms")
+
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=200)
+    parser.add_argument('--lines', type=int, default=3, help='Cart lines per order')
+    parser.add_argument('--catalog', type=int, default=1000, help='Products in the catalog')
+    args = parser.parse_args(argv)
+    run('old flow (GET products + POST orders + PUT per line)', old_flow, args)
+    run('POST /api/checkout', new_flow, args)
+
+
+if __name__ == '__main__':
+    main()
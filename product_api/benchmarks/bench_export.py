@@ -0,0 +1,119 @@
+"""Memory and throughput benchmark for the streaming export
+
+Populates a database with synthetic orders (one customer and two items per
+order, like POST /api/orders creates them), then streams the orders export
+and samples the process's resident set size after every chunk.
+
+    python benchmarks/bench_export.py --orders 10000000 --keep
+    python benchmarks/bench_export.py --url postgresql://.../bench_db --orders 1000000
+
+Without ``--url`` a SQLite file in the temp directory is used; ``--keep``
+reuses it on the next run instead of repopulating.
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from product_api import export
+from product_api.models import CustomerInfo, Order, OrderItem, Product
+from product_api.models.meta import Base
+
+PRODUCTS = 10000
+
+
+def rss_mib():
+    """Current resident set size (Linux), else the peak so far"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def populate(engine, orders, rng, batch_size=20000):
+    with engine.begin() as connection:
+        connection.execute(insert(Product.__table__), [
+            {'title': f'Product {i}', 'description': 'Benchmark product', 'price': rng.randint(1, 500),
+             'stock': 100, 'version': 1}
+            for i in range(1, PRODUCTS + 1)
+        ])
+    for start in range(0, orders, batch_size):
+        ids = range(start + 1, min(orders, start + batch_size) + 1)
+        with engine.begin() as connection:
+            connection.execute(insert(CustomerInfo.__table__), [
+                {'id': i, 'full_name': f'Customer {i}', 'email': f'c{i}@example.com',
+                 'address': f'Jl. Benchmark {i}', 'phone_number': f'08{i:010d}'}
+                for i in ids
+            ])
+            connection.execute(insert(Order.__table__), [
+                {'id': i, 'order_id': f'ORD-{i:010d}', 'customer_info_id': i, 'subtotal': 100,
+                 'shipping': 0, 'total': 100, 'status': 'pending'}
+                for i in ids
+            ])
+            connection.execute(insert(OrderItem.__table__), [
+                {'order_id': i, 'product_id': rng.randint(1, PRODUCTS), 'quantity': rng.randint(1, 3),
+                 'price': 50}
+                for i in ids for _ in range(2)
+            ])
+        print(f"  populated {ids[-1]:,} orders", end='\r', flush=True)
+    print()
+
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=1000000)
+    parser.add_argument('--format', choices=export.FORMATS, default='ndjson')
+    parser.add_argument('--gzip', action='store_true')
+    parser.add_argument('--url', help='Database URL (default: SQLite file in the temp directory)')
+    parser.add_argument('--keep', action='store_true', help='Reuse an existing populated SQLite file')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.gettempdir(), f'bench_export_{args.orders}.sqlite')
+    url = args.url or f'sqlite:///{path}'
+    engine = create_engine(url)
+    reuse = args.keep and not args.url and os.path.exists(path)
+    if not reuse:
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        started = time.perf_counter()
+        populate(engine, args.orders, random.Random(args.seed))
+        print(f"populate: {time.perf_counter() - started:.0f}s")
+    with engine.connect() as connection:
+        count = connection.execute(select(func.count()).select_from(Order.__table__)).scalar()
+
+    baseline = rss_mib()
+    peak = baseline
+    samples = []
+    written = 0
+    started = time.perf_counter()
+    for number, chunk in enumerate(export.stream_export(sessionmaker(bind=engine), 'orders',
+                                                        args.format, gzip=args.gzip)):
+        written += len(chunk)
+        if number % 64 == 0:
+            current = rss_mib()
+            peak = max(peak, current)
+            samples.append(current)
+    elapsed = time.perf_counter() - started
+    quarter = samples[:max(1, len(samples) // 4)]
+
+    print(f"orders={count:,} bytes={written / 2**20:,.0f} MiB in {elapsed:.0f}s "
+          f"({count / elapsed:,.0f} orders/s)")
+    print(f"rss: before={baseline:.0f} MiB first-quarter-max={max(quarter):.0f} MiB "
+          f"peak={peak:.0f} MiB end={samples[-1]:.0f} MiB")
+
+    if not args.keep and not args.url:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
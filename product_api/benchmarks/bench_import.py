@@ -0,0 +1,93 @@
+"""Throughput benchmark for the bulk product importer
+
+Writes a synthetic CSV or NDJSON file and imports it into an empty database
+through ``importer.import_products``, twice: once inserting and once
+upserting the same SKUs.
+
+    python benchmarks/bench_import.py --rows 100000
+    python benchmarks/bench_import.py --url postgresql://.../bench_db --format ndjson
+
+Without ``--url`` a temporary SQLite file is used.
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from product_api import importer
+from product_api.models.meta import Base
+
+FIELDS = ['sku', 'title', 'description', 'price', 'stock', 'image']
+
+
+def make_rows(count, rng):
+    for number in range(count):
+        yield {
+            'sku': f'SUP-{number:08d}',
+            'title': f'Product {number} {rng.choice(["red", "blue", "large", "small"])}',
+            'description': 'Imported from the supplier feed, ' * rng.randint(1, 4),
+            'price': f'{rng.uniform(1, 500):.2f}',
+            'stock': str(rng.randint(0, 100)),
+            'image': f'https://cdn.example.com/{number}.jpg',
+        }
+
+
+def write_file(path, fmt, count, rng):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            writer = csv.DictWriter(f, FIELDS)
+            writer.writeheader()
+            writer.writerows(make_rows(count, rng))
+        else:
+            for row in make_rows(count, rng):
+                f.write(json.dumps(row) + '\n')
+
+
+def run(session_factory, path, fmt, batch_size):
+    session = session_factory()
+    started = time.perf_counter()
+    with open(path, 'rb') as stream:
+        report = importer.import_products(session, importer.iter_records(stream, fmt),
+                                          batch_size=batch_size)
+    session.commit()
+    session.close()
+    return report, time.perf_counter() - started
+
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--format', choices=importer.FORMATS, default='csv')
+    parser.add_argument('--batch-size', type=int, default=importer.DEFAULT_BATCH_SIZE)
+    parser.add_argument('--url', help='Database URL (default: temporary SQLite file)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='bench_import_')
+    url = args.url or f"sqlite:///{os.path.join(workdir, 'bench.sqlite')}"
+    engine = create_engine(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+
+    path = os.path.join(workdir, f'products.{args.format}')
+    write_file(path, args.format, args.rows, random.Random(args.seed))
+    print(f"file={os.path.getsize(path) / 2**20:.1f} MiB rows={args.rows} format={args.format}")
+
+    for label in ('insert', 'upsert'):
+        report, elapsed = run(session_factory, path, args.format, args.batch_size)
+        print(f"{label}: {report.imported} rows in {elapsed:.2f}s "
+              f"= {report.imported / elapsed:,.0f} rows/s (failed={report.failed})")
+
+
+if __name__ == '__main__':
+    main()
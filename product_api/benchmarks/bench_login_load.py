@@ -0,0 +1,137 @@
+"""Catalog latency while logins are hammered: inline hashing vs. the hash pool
+
+Serves the app with waitress (``--threads`` request threads, 6 as in
+development.ini) in a child process on a temporary SQLite database and
+measures
+``GET /api/products/{id}`` latency from ``--readers`` clients, first alone
+and then while ``--attackers`` clients post wrong passwords to
+``/api/admin/login`` as fast as they are answered. Each configuration gets
+a fresh server:
+
+* ``inline``: hashing on the request threads, no throttle (the old way)
+* ``pool``: ``password_hashing.workers = 2``, ``max_queue = 2``, no throttle
+* ``pool+throttle``: the pool plus the default login throttle
+
+    python benchmarks/bench_login_load.py --seconds 10
+"""
+import argparse
+import http.client
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from waitress.server import create_server
+
+from product_api import main as make_app
+from product_api.models import Admin, Product
+from product_api.models.meta import Base
+from sqlalchemy.orm import Session
+
+CONFIGURATIONS = {
+    'inline': {'password_hashing.workers': '0', 'login_throttle.enabled': 'false'},
+    'pool': {'password_hashing.workers': '2', 'password_hashing.max_queue': '2',
+             'login_throttle.enabled': 'false'},
+    'pool+throttle': {'password_hashing.workers': '2', 'password_hashing.max_queue': '2'},
+}
+
+
+def seed(url):
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([Product(title=f'Product {i}', description='x', price=10, stock=100)
+                         for i in range(100)])
+        admin = Admin(username='admin')
+        admin.set_password('correct horse')
+        session.add(admin)
+        session.commit()
+    engine.dispose()
+
+
+def serve(settings, threads, ports):
+    """Run the app in this (child) process, so clients do not share its GIL"""
+    logging.getLogger('waitress').setLevel(logging.ERROR)  # queue depth warnings are expected here
+    app = make_app({}, **dict(settings, **{'product_cache.enabled': 'true',
+                                                      'auth.jwt_secret': 'bench-secret-' + 'x' * 32}))
+    server = create_server(app, host='127.0.0.1', port=0, threads=threads, connection_limit=1000)
+    ports.put(server.effective_port)
+    server.run()
+
+
+def client_loop(port, stop, request, latencies=None, statuses=None):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    while not stop.is_set():
+        started = time.perf_counter()
+        method, path, body = request()
+        connection.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        response.read()
+        if latencies is not None:
+            latencies.append(time.perf_counter() - started)
+        if statuses is not None:
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+    connection.close()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] * 1000
+
+
+def measure(port, readers, attackers, seconds):
+    stop = threading.Event()
+    latencies, statuses = [], {}
+    counter = iter(range(10 ** 9))
+    read = lambda: ('GET', f'/api/products/{next(counter) % 100 + 1}', None)
+    guess = lambda: ('POST', '/api/admin/login', json.dumps({'username': 'admin', 'password': 'guess'}))
+    threads = [threading.Thread(target=client_loop, args=(port, stop, read, latencies)) for _ in range(readers)]
+    threads += [threading.Thread(target=client_loop, args=(port, stop, guess, None, statuses))
+                for _ in range(attackers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--threads', type=int, default=6, help='waitress request threads')
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--attackers', type=int, default=16)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        url = f"sqlite:///{os.path.join(tmpdir, 'bench.sqlite')}"
+        seed(url)
+        for name, settings in CONFIGURATIONS.items():
+            ports = multiprocessing.Queue()
+            server = multiprocessing.Process(
+                target=serve, args=(dict(settings, **{'sqlalchemy.url': url}), args.threads, ports), daemon=True)
+            server.start()
+            try:
+                port = ports.get(timeout=30)
+                for attackers in (0, args.attackers):
+                    latencies, statuses = measure(port, args.readers, attackers, args.seconds)
+                    logins = ', '.join(f'{status}: {count}' for status, count in sorted(statuses.items()))
+                    print(f'{name:>13} {attackers:>3} attackers: catalog p50 {percentile(latencies, .5):7.1f} ms '
+                          f'p95 {percentile(latencies, .95):7.1f} ms p99 {percentile(latencies, .99):7.1f} ms '
+                          f'({len(latencies) / args.seconds:,.0f} req/s)' + (f'; logins {logins}' if logins else ''))
+            finally:
+                server.terminate()
+                server.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Insert throughput of the unique ``order_id`` index: random vs. time-ordered keys
+
+Inserts ``--rows`` rows into a table shaped like ``orders`` (integer primary
+key, unique ``order_id``), ``--batch`` rows per transaction, once with
+random keys of the same length (like the old ``ORD-<8 hex>`` ids, but
+without their collisions) and once with :func:`product_api.ids.new_order_id`.
+Random keys land on any leaf page of the index, so once the index outgrows the page
+cache most inserts read and dirty a different page; ULIDs always go to the
+right-hand edge.
+
+    python benchmarks/bench_order_ids.py --rows 500000
+    python benchmarks/bench_order_ids.py --url postgresql://.../bench_db
+
+Without ``--url`` a temporary SQLite file is used, with its page cache
+limited by ``--cache-kib`` to stand in for an index larger than memory.
+"""
+import argparse
+import os
+import sys
+import secrets
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, event, insert
+
+from product_api import ids
+
+KEYS = {
+    'random': lambda: ids.ORDER_ID_PREFIX + ids.encode(secrets.randbits(128)),
+    'ulid': ids.new_order_id,
+}
+
+
+def make_table(metadata, kind):
+    return Table(f'bench_order_ids_{kind}', metadata,
+                 Column('id', Integer, primary_key=True),
+                 Column('order_id', String(50), unique=True, nullable=False))
+
+
+def run(engine, table, new_key, rows, batch):
+    started = time.perf_counter()
+    for start in range(0, rows, batch):
+        keys = [{'order_id': new_key()} for _ in range(min(batch, rows - start))]
+        with engine.begin() as connection:
+            connection.execute(insert(table), keys)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='database URL (default: temporary SQLite file)')
+    parser.add_argument('--rows', type=int, default=300000)
+    parser.add_argument('--batch', type=int, default=100, help='rows per transaction')
+    parser.add_argument('--cache-kib', type=int, default=2048, help='SQLite page cache size')
+    args = parser.parse_args()
+
+    tmpdir = None
+    url = args.url
+    if url is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(tmpdir.name, 'bench.sqlite')}"
+    engine = create_engine(url)
+    if engine.dialect.name == 'sqlite':
+        @event.listens_for(engine, 'connect')
+        def _pragmas(dbapi_connection, _record):
+            dbapi_connection.execute(f'PRAGMA cache_size = -{args.cache_kib}')
+            dbapi_connection.execute('PRAGMA journal_mode = WAL')
+
+    metadata = MetaData()
+    tables = {kind: make_table(metadata, kind) for kind in KEYS}
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    try:
+        for kind, new_key in KEYS.items():
+            elapsed = run(engine, tables[kind], new_key, args.rows, args.batch)
+            print(f'{kind:>6}: {args.rows} rows in {elapsed:.2f}s, {args.rows / elapsed:,.0f} rows/s')
+    finally:
+        metadata.drop_all(engine)
+        engine.dispose()
+        if tmpdir:
+            tmpdir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Latency benchmark for GET /api/products/search
+
+Builds a synthetic catalog and times ``search.search_products`` for random
+one- and two-word queries, reporting p50/p95/p99.
+
+    python benchmarks/bench_search.py --rows 1000000
+    python benchmarks/bench_search.py --url postgresql://.../bench_db --rows 1000000
+
+Without ``--url`` a temporary SQLite file is used (FTS5 path); pass
+``--keep`` to leave the populated database in place and reuse it next run.
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from product_api import search
+from product_api.models.meta import Base
+from product_api.models.product import Product
+
+
+def make_vocabulary(size, rng):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    return [''.join(rng.choice(letters) for _ in range(rng.randint(3, 9)))
+            for _ in range(size)]
+
+
+def zipf_weights(size):
+    # Word frequency ~ 1/rank, so a few words are very common, like real catalogs
+    return [1.0 / rank for rank in range(1, size + 1)]
+
+
+def zipf_words(vocabulary, weights, rng, count):
+    return ' '.join(rng.choices(vocabulary, cum_weights=weights, k=count))
+
+
+def populate(engine, rows, vocabulary, weights, rng, batch_size=10000):
+    with engine.begin() as connection:
+        for start in range(0, rows, batch_size):
+            batch = []
+            for _ in range(min(batch_size, rows - start)):
+                batch.append({
+                    'title': zipf_words(vocabulary, weights, rng, rng.randint(2, 5)),
+                    'description': zipf_words(vocabulary, weights, rng, 12),
+                    'price': rng.randint(1, 1000),
+                    'stock': rng.randint(0, 50),
+                })
+            connection.execute(insert(Product.__table__), batch)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='Database URL (default: temporary SQLite file)')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--limit', type=int, default=search.DEFAULT_LIMIT)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--keep', action='store_true',
+                        help='Keep (and reuse) the populated database')
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    tmpdir = None
+    url = args.url
+    if not url:
+        if args.keep:
+            url = f"sqlite:///{os.path.join(tempfile.gettempdir(), f'bench_search_{args.rows}.sqlite')}"
+        else:
+            tmpdir = tempfile.TemporaryDirectory()
+            url = f"sqlite:///{os.path.join(tmpdir.name, 'bench_search.sqlite')}"
+
+    engine = create_engine(url)
+    vocabulary = make_vocabulary(20000, rng)
+    weights = list(itertools.accumulate(zipf_weights(len(vocabulary))))
+
+    with engine.connect() as connection:
+        existing = (connection.execute(select(func.count()).select_from(Product.__table__)).scalar()
+                    if engine.dialect.has_table(connection, 'products') else 0)
+    if not (args.keep and existing == args.rows):
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        started = time.perf_counter()
+        populate(engine, args.rows, vocabulary, weights, rng)
+        print(f"populated {args.rows} products in {time.perf_counter() - started:.1f}s ({engine.dialect.name})")
+
+    session = sessionmaker(bind=engine)()
+    query_rng = random.Random(args.seed + 1)
+    queries = [zipf_words(vocabulary, weights, query_rng, query_rng.randint(1, 2))
+               for _ in range(args.queries)]
+    for q in queries[:50]:
+        search.search_products(session, q, limit=args.limit)  # warm caches
+
+    samples = []
+    hits = 0
+    for q in queries:
+        started = time.perf_counter()
+        hits += bool(search.search_products(session, q, limit=args.limit))
+        samples.append((time.perf_counter() - started) * 1000)
+    session.close()
+
+    print(f"queries={len(samples)} with_results={hits}")
+    print(f"p50={percentile(samples, 50):.2f}ms p95={percentile(samples, 95):.2f}ms "
+          f"p99={percentile(samples, 99):.2f}ms mean={statistics.mean(samples):.2f}ms")
+
+    if not args.keep:
+        Base.metadata.drop_all(engine)
+    engine.dispose()
+    if tmpdir:
+        tmpdir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
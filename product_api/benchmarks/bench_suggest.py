@@ -0,0 +1,121 @@
+"""Memory and latency benchmark for the title prefix index
+
+Builds a ``SuggestIndex`` from synthetic titles (no database involved) and
+reports its memory footprint, lookup latency per prefix length, the cost
+of incremental updates and broad-prefix latency while orders keep arriving
+from other threads.
+
+    python benchmarks/bench_suggest.py --titles 1000000
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from product_api import suggest
+
+ADJECTIVES = ['smart', 'wireless', 'portable', 'classic', 'premium', 'mini', 'pro',
+              'ultra', 'organic', 'vintage', 'compact', 'digital', 'leather', 'cotton']
+NOUNS = ['watch', 'speaker', 'mouse', 'keyboard', 'lamp', 'chair', 'bag', 'shirt',
+         'bottle', 'camera', 'headphones', 'charger', 'notebook', 'jacket', 'shoes']
+
+
+def make_titles(count, rng):
+    for product_id in range(1, count + 1):
+        yield product_id, (f"{rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS).title()} "
+                           f"{rng.randint(1, 9999)} {rng.choice(ADJECTIVES)}")
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--titles', type=int, default=1000000)
+    parser.add_argument('--lookups', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--order-threads', type=int, default=4)
+    parser.add_argument('--orders-per-second', type=int, default=500,
+                        help="per order thread, each selling one random product")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    titles = list(make_titles(args.titles, rng))
+    weights = {rng.randint(1, args.titles): rng.randint(1, 500) for _ in range(args.titles // 10)}
+
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    index = suggest.SuggestIndex()
+    index.build(titles, weights)
+    build_seconds = time.perf_counter() - started
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    print(f"titles={len(index)} build={build_seconds:.2f}s")
+    print(f"memory={used / 2**20:.1f} MiB ({used / len(index):.0f} bytes/title, "
+          f"{used / len(index) * 1e6 / 2**20:.0f} MiB per million titles)")
+
+    probe_titles = [title for _, title in rng.sample(titles, args.lookups)]
+    for length in (1, 2, 3, 5, 8):
+        prefixes = [title[:length] for title in probe_titles]
+        for prefix in prefixes[:100]:
+            index.lookup(prefix)  # warm the memo for broad prefixes
+        samples = []
+        for prefix in prefixes:
+            started = time.perf_counter()
+            index.lookup(prefix)
+            samples.append((time.perf_counter() - started) * 1e6)
+        print(f"prefix_len={length} p50={percentile(samples, 50):.1f}us "
+              f"p99={percentile(samples, 99):.1f}us")
+
+    samples = []
+    for product_id, title in make_titles(1000, rng):
+        started = time.perf_counter()
+        index.upsert(args.titles + product_id, title)
+        samples.append((time.perf_counter() - started) * 1e6)
+    print(f"upsert p50={percentile(samples, 50):.1f}us p99={percentile(samples, 99):.1f}us")
+
+    stop = threading.Event()
+    sold = []
+
+    def sell(seed):
+        seller = random.Random(seed)
+        pause = 1 / args.orders_per_second
+        while not stop.is_set():
+            index.add_weight(seller.randint(1, args.titles), seller.randint(1, 3))
+            sold.append(1)
+            time.sleep(pause)
+
+    threads = [threading.Thread(target=sell, args=(args.seed + n,), daemon=True)
+               for n in range(args.order_threads)]
+    for thread in threads:
+        thread.start()
+    started = time.perf_counter()
+    for length in (1, 2):
+        samples = []
+        for title in probe_titles:
+            lookup_started = time.perf_counter()
+            index.lookup(title[:length])
+            samples.append((time.perf_counter() - lookup_started) * 1e6)
+        print(f"with orders: prefix_len={length} p50={percentile(samples, 50):.1f}us "
+              f"p99={percentile(samples, 99):.1f}us")
+    stop.set()
+    for thread in threads:
+        thread.join()
+    print(f"with orders: {len(sold) / (time.perf_counter() - started):.0f} add_weight/s "
+          f"across {args.order_threads} threads")
+
+
+if __name__ == '__main__':
+    main()
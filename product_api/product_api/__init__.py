@@ -9,6 +9,11 @@ def main(global_config, **settings):
         config.include('.models')
         config.include('.routes')
         config.include('.cors')  # Add CORS support
+        config.include('.suggest')
+        config.include('.cache')
+        config.include('.security')
+        config.include('.hashing')
+        config.include('.throttle')
         
         config.scan()
     return config.make_wsgi_app()
\ No newline at end of file
@@ -0,0 +1,126 @@
+"""Process-local cache of already-encoded product JSON
+
+``GET /api/products/{id}`` and the unparameterised ``GET /api/products``
+serve bytes straight from here instead of loading ORM rows and running the
+json renderer. Entries are dropped by every product or stock write, once
+when the write happens and again after its transaction commits. Fills carry
+the generation they started in and are discarded if a write happened in
+between, so a reader that loaded a row before a commit can never put the
+old bytes back after that commit's invalidation. Entries also remember the
+product (or catalog) version they were encoded from and are only served for
+that version, so a body never goes out under a newer ETag.
+
+Enabled with ``product_cache.enabled = true``; ``product_cache.max_entries``
+bounds the number of single-product entries (LRU).
+"""
+import json
+import threading
+from collections import OrderedDict
+
+from pyramid.settings import asbool
+
+from . import commit_hooks
+
+DEFAULT_MAX_ENTRIES = 10000
+
+
+def encode(payload):
+    """Encode like Pyramid's ``json`` renderer does"""
+    return json.dumps(payload).encode('utf-8')
+
+
+class ProductCache:
+    """Size-bounded LRU of product JSON bytes plus the full-list payload"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+        self._list_body = None
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def generation(self):
+        """Token to pass back to :meth:`put`/:meth:`put_list` for a fill"""
+        return self._generation
+
+    def get(self, product_id, version=None):
+        with self._lock:
+            entry = self._items.get(product_id)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._items.move_to_end(product_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, product_id, body, generation, version=None):
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._items[product_id] = (version, body)
+            self._items.move_to_end(product_id)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def get_list(self, version=None):
+        with self._lock:
+            if self._list_body is None or self._list_body[0] != version:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._list_body[1]
+
+    def put_list(self, body, generation, version=None):
+        with self._lock:
+            if generation == self._generation:
+                self._list_body = (version, body)
+
+    def invalidate(self, product_ids=None):
+        """Drop ``product_ids`` (every product when ``None``) and the list"""
+        with self._lock:
+            self._generation += 1
+            self._list_body = None
+            if product_ids is None:
+                self._items.clear()
+            else:
+                for product_id in product_ids:
+                    self._items.pop(product_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._items),
+                'maxEntries': self.max_entries,
+                'listCached': self._list_body is not None,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+def get_product_cache(registry):
+    """The configured :class:`ProductCache`, or ``None`` when disabled"""
+    return registry.get('product_cache')
+
+
+def products_changed(request, product_ids=None):
+    """Invalidate cached JSON for products written by ``request``
+
+    Call from any view that changes product rows (including stock).
+    ``product_ids=None`` drops everything.
+    """
+    cache = get_product_cache(request.registry)
+    if cache is None:
+        return
+    product_ids = None if product_ids is None else list(product_ids)
+    cache.invalidate(product_ids)
+    commit_hooks.after_commit(request, cache.invalidate, product_ids)
+
+
+def includeme(config):
+    settings = config.get_settings()
+    if asbool(settings.get('product_cache.enabled', False)):
+        config.registry['product_cache'] = ProductCache(
+            max_entries=int(settings.get('product_cache.max_entries', DEFAULT_MAX_ENTRIES)))
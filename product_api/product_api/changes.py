@@ -0,0 +1,114 @@
+"""Incremental catalog change feed
+
+Clients keep a local copy of the catalog in sync by polling
+``GET /api/products/changes?since=<seq>``, which returns the current state of
+every product upserted after ``seq`` and a tombstone for every product
+deleted after it. The log itself (``catalog_changes``) is appended by the
+commit hook in :mod:`product_api.models.catalog`.
+
+Compaction drops every entry superseded by a later one for the same
+product; it never changes what a client ends up with. Retention drops
+entries older than ``catalog_changes.retention_days`` and records the
+highest removed seq as the horizon: clients that are further behind get
+410 and must reload ``GET /api/products``.
+"""
+from datetime import timedelta
+
+from sqlalchemy import delete, func, select, update
+
+from .models import Product
+from .models.catalog import CATALOG_STATE_ID, CatalogChange, CatalogState
+from .models.meta import utcnow
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+DEFAULT_RETENTION_DAYS = 7
+
+
+class ChangesExpired(Exception):
+    """``since`` is older than the retention horizon"""
+
+
+def latest_seq(dbsession):
+    """The seq a client should start polling from after a full reload"""
+    newest = dbsession.execute(select(func.max(CatalogChange.seq))).scalar()
+    return max(newest or 0, _horizon(dbsession))
+
+
+def _horizon(dbsession):
+    return dbsession.execute(
+        select(CatalogState.changes_horizon).where(CatalogState.id == CATALOG_STATE_ID)
+    ).scalar() or 0
+
+
+def read_changes(dbsession, since, limit=DEFAULT_LIMIT):
+    """Changes after ``since``, oldest first
+
+    Returns ``(changes, next_since, has_more)``. Each change is
+    ``{'seq', 'op': 'upsert', 'product': {...}}`` or
+    ``{'seq', 'op': 'delete', 'id'}``; a product appears at most once per
+    page, at the position of its latest change, with its current state.
+    """
+    if since < _horizon(dbsession):
+        raise ChangesExpired(since)
+
+    rows = dbsession.execute(
+        select(CatalogChange.seq, CatalogChange.product_id, CatalogChange.op)
+        .where(CatalogChange.seq > since)
+        .order_by(CatalogChange.seq)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not rows:
+        return [], since, False
+
+    latest = {}
+    for row in rows:
+        latest.pop(row.product_id, None)
+        latest[row.product_id] = row
+    upserted = [pid for pid, row in latest.items() if row.op == CatalogChange.UPSERT]
+    products = {}
+    if upserted:
+        products = {product.id: product for product in
+                    dbsession.query(Product).filter(Product.id.in_(upserted))}
+
+    changes = []
+    for product_id, row in latest.items():
+        product = products.get(product_id)
+        if product is None:
+            # Deleted, possibly by a later change beyond this page
+            changes.append({'seq': row.seq, 'op': CatalogChange.DELETE, 'id': product_id})
+        else:
+            changes.append({'seq': row.seq, 'op': CatalogChange.UPSERT, 'product': product.to_dict()})
+    return changes, rows[-1].seq, has_more
+
+
+def compact(dbsession):
+    """Delete entries superseded by a newer one for the same product"""
+    newest = select(func.max(CatalogChange.seq)).group_by(CatalogChange.product_id)
+    result = dbsession.execute(
+        delete(CatalogChange).where(CatalogChange.seq.not_in(newest.scalar_subquery()))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def expire(dbsession, retention_days=DEFAULT_RETENTION_DAYS, now=None):
+    """Delete entries older than ``retention_days`` and advance the horizon"""
+    cutoff = (now or utcnow()) - timedelta(days=retention_days)
+    horizon = dbsession.execute(
+        select(func.max(CatalogChange.seq)).where(CatalogChange.changed_at < cutoff)
+    ).scalar()
+    if horizon is None:
+        return 0
+    result = dbsession.execute(
+        delete(CatalogChange).where(CatalogChange.seq <= horizon)
+        .execution_options(synchronize_session=False)
+    )
+    dbsession.execute(
+        update(CatalogState)
+        .where(CatalogState.id == CATALOG_STATE_ID, CatalogState.changes_horizon < horizon)
+        .values(changes_horizon=horizon)
+    )
+    return result.rowcount
@@ -0,0 +1,88 @@
+"""Server-side checkout
+
+The client sends only product ids, quantities and customer details. The
+cart is priced here from the prices the stock reservation returns, in
+``Decimal``, and the customer, order and order items are written in the
+request's transaction, so a checkout is one HTTP request and one commit.
+"""
+from decimal import Decimal
+
+from .customers import upsert_customer
+from .ids import new_order_id
+from .inventory import StockError, order_quantities, reserve_stock
+from .models import Order, OrderItem
+from .models.meta import utcnow
+
+# Flat shipping rate charged on every order (the storefront shows 0)
+SHIPPING = Decimal('0')
+
+CUSTOMER_FIELDS = {
+    'fullName': 'full_name',
+    'email': 'email',
+    'address': 'address',
+    'phoneNumber': 'phone_number',
+}
+
+
+class CheckoutError(ValueError):
+    """The cart or customer details cannot be checked out"""
+
+    def __init__(self, message, details=None):
+        super().__init__(message)
+        self.details = details or []
+
+
+def clean_customer(data):
+    """``CustomerInfo`` column values from the request's ``customerInfo``"""
+    if not isinstance(data, dict):
+        raise CheckoutError('customerInfo is required')
+    # str() would turn a number or object into a plausible-looking value
+    invalid = [field for field in CUSTOMER_FIELDS
+               if data.get(field) is not None and not isinstance(data.get(field), str)]
+    if invalid:
+        raise CheckoutError('Customer information fields must be strings', invalid)
+    values = {column: str(data.get(field) or '').strip() for field, column in CUSTOMER_FIELDS.items()}
+    missing = [field for field, column in CUSTOMER_FIELDS.items() if not values[column]]
+    if missing:
+        raise CheckoutError('All customer information fields are required', missing)
+    return values
+
+
+def place_order(dbsession, customer_data, items, order_id=None):
+    """Price ``items`` (``[{'id', 'quantity'}]``), take their stock and add the order
+
+    Raises :class:`CheckoutError` before writing anything if the input is
+    invalid, or with every short line if stock cannot be reserved (nothing
+    is then reserved). Returns the flushed :class:`Order`.
+    """
+    customer_values = clean_customer(customer_data)
+    if not items:
+        raise CheckoutError('items is required')
+    try:
+        quantities = order_quantities(items)
+        products = reserve_stock(dbsession, quantities)
+    except StockError as e:
+        raise CheckoutError(str(e), e.details)
+    customer = upsert_customer(dbsession, customer_values)
+
+    subtotal = sum((products[product_id].price * quantity
+                    for product_id, quantity in quantities.items()), Decimal('0'))
+    now = utcnow()
+    order = Order(
+        order_id=order_id or new_order_id(),
+        customer_info=customer,
+        subtotal=subtotal,
+        shipping=SHIPPING,
+        total=subtotal + SHIPPING,
+        status='pending',
+        order_date=now,
+    )
+    order.ship_to(customer_values)
+    order.add_status_event('pending', updated_by='system', note='Order placed by customer', ts=now)
+    order.order_items = [
+        OrderItem(product=products[product_id], quantity=quantity, price=products[product_id].price)
+        for product_id, quantity in quantities.items()
+    ]
+    dbsession.add(order)
+    dbsession.flush()
+    return order
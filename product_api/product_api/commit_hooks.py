@@ -0,0 +1,56 @@
+"""Run in-process side effects only once the request transaction commits"""
+import logging
+
+import zope.sqlalchemy
+
+log = logging.getLogger(__name__)
+
+
+def after_commit(request, callback, *args):
+    """Call ``callback(*args)`` after ``request``'s transaction commits
+
+    In-memory structures (caches, indexes) must not see writes that may still
+    be rolled back. When the request is not driven by pyramid_tm (scripts,
+    unit tests with a bare session) the callback runs immediately.
+    """
+    tm = getattr(request, 'tm', None)
+    if tm is None:
+        callback(*args)
+        return
+
+    def hook(success, *hook_args):
+        if not success:
+            return
+        try:
+            callback(*hook_args)
+        except Exception:
+            # The data is committed; a failed in-memory update must not turn
+            # the response into an error.
+            log.exception("after-commit hook %r failed", callback)
+
+    tm.get().addAfterCommitHook(hook, args=args)
+
+
+def doom(request):
+    """Roll back ``request``'s transaction although the view returns normally
+
+    pyramid_tm commits whenever the view returns a response, error responses
+    included; a view answering an error after writing must call this. With
+    no transaction manager the session is rolled back at once.
+    """
+    tm = getattr(request, 'tm', None)
+    if tm is None:
+        request.dbsession.rollback()
+        return
+    tm.doom()
+
+
+def mark_changed(request):
+    """Make ``request``'s transaction commit writes made with Core statements
+
+    zope.sqlalchemy only notices ORM flushes; a session that only ran
+    ``insert()``/``update()`` statements would otherwise be rolled back.
+    """
+    tm = getattr(request, 'tm', None)
+    if tm is not None:
+        zope.sqlalchemy.mark_changed(request.dbsession, transaction_manager=tm)
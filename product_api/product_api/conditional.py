@@ -0,0 +1,52 @@
+"""ETag / Last-Modified handling for conditional GET
+
+Validators come from ``products.version``/``updated_at`` for a single
+product and from the ``catalog_state`` row for listings, so a request whose
+``If-None-Match`` or ``If-Modified-Since`` still matches is answered with 304
+without loading or serializing any product rows.
+"""
+from pyramid.response import Response
+from webob.datetime_utils import UTC, parse_date
+from webob.etag import ETagMatcher
+
+
+def product_etag(product_id, version):
+    return f"p{product_id}.{version}"
+
+
+def catalog_etag(version):
+    return f"c{version}"
+
+
+def _http_time(timestamp):
+    """Naive UTC ``timestamp`` truncated to the one-second HTTP date resolution"""
+    return timestamp.replace(microsecond=0, tzinfo=UTC)
+
+
+def not_modified(request, etag, last_modified):
+    """True when the client's cached copy is still current
+
+    ``If-None-Match`` takes precedence; ``If-Modified-Since`` is only
+    consulted when it is absent.
+    """
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return etag in ETagMatcher.parse(if_none_match)
+    if_modified_since = request.headers.get('If-Modified-Since')
+    if if_modified_since and last_modified is not None:
+        since = parse_date(if_modified_since)
+        return since is not None and _http_time(last_modified) <= since
+    return False
+
+
+def set_validators(response, etag, last_modified):
+    """Add strong ETag and Last-Modified, and make clients revalidate"""
+    response.etag = etag
+    if last_modified is not None:
+        response.last_modified = _http_time(last_modified)
+    response.cache_control = 'no-cache'
+    return response
+
+
+def not_modified_response(etag, last_modified):
+    return set_validators(Response(status=304), etag, last_modified)
@@ -8,7 +8,7 @@ def cors_headers(request):
     return {
         'Access-Control-Allow-Origin': 'http://localhost:3000',  # React app URL
         'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-        'Access-Control-Allow-Headers': 'Content-Type, Authorization, Accept',
+        'Access-Control-Allow-Headers': 'Content-Type, Authorization, Accept, Idempotency-Key',
         'Access-Control-Max-Age': '86400',
         'Access-Control-Allow-Credentials': 'true'
     }
@@ -0,0 +1,186 @@
+"""One customer row per email address
+
+Orders upsert their customer on ``customer_info.email_normalized`` (the
+trimmed, case-folded email, unique) with ``INSERT ... ON CONFLICT DO
+UPDATE`` on PostgreSQL and SQLite, so a repeat shopper reuses their row and
+its name, address and phone number become the latest ones given. Where an
+order ships is its own ``ship_to_*`` copy, so that never changes an
+earlier order.
+
+:func:`merge_duplicates` folds rows that predate the unique key into one per
+email: the oldest row is kept with the newest row's details, the others'
+orders are repointed to it and they are deleted. Orders without a shipping
+snapshot first get one from the row they pointed at. It reads only columns
+that existed before ``email_normalized`` was added, so
+``dedupe_product_api_customers`` can run ahead of the migration that adds
+the unique key (once the orders' ``ship_to_*`` columns exist), in small
+transactions, leaving that migration little to do.
+"""
+from sqlalchemy import bindparam, delete, func, select, update
+
+from .models import CustomerInfo, Order
+from .models.customer_info import normalize_email
+
+# Overwritten on an existing customer by a new order's details
+UPSERT_COLUMNS = ('full_name', 'email', 'address', 'phone_number')
+DEFAULT_MERGE_BATCH_SIZE = 1000
+
+
+def _upsert_statement(dialect):
+    """``INSERT ... ON CONFLICT (email_normalized) DO UPDATE``, if supported"""
+    if dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    if not dialect.insert_returning:
+        return None
+    statement = dialect_insert(CustomerInfo)
+    changes = {name: statement.excluded[name] for name in UPSERT_COLUMNS}
+    changes['updated_at'] = func.now()
+    return statement.on_conflict_do_update(index_elements=[CustomerInfo.email_normalized], set_=changes)
+
+
+def upsert_customer(dbsession, values):
+    """The customer for ``values['email']``, inserted or updated with ``values``
+
+    ``values`` are ``CustomerInfo`` column values. One statement where the
+    dialect has ON CONFLICT; a lookup then insert or update elsewhere.
+    """
+    values = dict(values, email_normalized=normalize_email(values['email']))
+    statement = _upsert_statement(dbsession.get_bind().dialect)
+    if statement is not None:
+        return dbsession.execute(
+            statement.values(values).returning(CustomerInfo),
+            execution_options={'populate_existing': True},
+        ).scalar_one()
+    customer = dbsession.execute(
+        select(CustomerInfo).where(CustomerInfo.email_normalized == values['email_normalized'])
+    ).scalar_one_or_none()
+    if customer is None:
+        customer = CustomerInfo()
+        dbsession.add(customer)
+    for name in UPSERT_COLUMNS:
+        setattr(customer, name, values[name])
+    dbsession.flush()
+    return customer
+
+
+def find_customer(dbsession, email):
+    """The customer with ``email`` (compared normalized), or None"""
+    return dbsession.execute(
+        select(CustomerInfo).where(CustomerInfo.email_normalized == normalize_email(email))
+    ).scalar_one_or_none()
+
+
+def order_stats(dbsession, customer_ids):
+    """``{customer id: {orderCount, lifetimeTotal, lastOrderDate}}`` for ``customer_ids``
+
+    One grouped query over ``ix_orders_customer_info_id``; customers
+    without orders are absent.
+    """
+    if not customer_ids:
+        return {}
+    rows = dbsession.execute(
+        select(Order.customer_info_id, func.count(Order.id), func.sum(Order.total), func.max(Order.order_date))
+        .where(Order.customer_info_id.in_(customer_ids))
+        .group_by(Order.customer_info_id)
+    ).all()
+    return {
+        customer_id: {
+            'orderCount': count,
+            'lifetimeTotal': float(total) if total else 0,
+            'lastOrderDate': last_order_date.isoformat() if last_order_date else None,
+        }
+        for customer_id, count, total, last_order_date in rows
+    }
+
+
+class MergeReport:
+    def __init__(self):
+        self.groups = 0
+        self.merged = 0
+        self.orders_repointed = 0
+
+    def to_dict(self):
+        return {'groups': self.groups, 'merged': self.merged, 'ordersRepointed': self.orders_repointed}
+
+
+# Duplicate groups are found in SQL, on the same key as normalize_email()
+# for ASCII addresses; the migration adding the unique key merges any
+# others with the Python function.
+_merge_key = func.lower(func.trim(CustomerInfo.email))
+
+
+def _duplicate_keys(dbsession, after, batch_size):
+    query = select(_merge_key.label('key')) \
+        .group_by(_merge_key) \
+        .having(func.count() > 1) \
+        .order_by(_merge_key) \
+        .limit(batch_size)
+    if after is not None:
+        query = query.where(_merge_key > after)
+    return dbsession.execute(query).scalars().all()
+
+
+def merge_batch(dbsession, report, batch_size=DEFAULT_MERGE_BATCH_SIZE, after=None):
+    """Merge up to ``batch_size`` groups of duplicates with a key after ``after``
+
+    Adds to ``report`` and returns the key to continue from, or None when
+    there are no more groups.
+    """
+    keys = _duplicate_keys(dbsession, after, batch_size)
+    if not keys:
+        return None
+    rows = dbsession.execute(
+        select(CustomerInfo.id, _merge_key.label('key'), *[getattr(CustomerInfo, name) for name in UPSERT_COLUMNS])
+        .where(_merge_key.in_(keys))
+        .order_by(_merge_key, CustomerInfo.id)
+    ).all()
+    groups = {}
+    for row in rows:
+        groups.setdefault(row.key, []).append(row)
+
+    snapshot, repoint, refresh, doomed = [], [], [], []
+    for group in groups.values():
+        keep, newest = group[0], group[-1]
+        snapshot += [{'row_id': row.id, 'ship_name': row.full_name, 'ship_address': row.address,
+                      'ship_phone': row.phone_number} for row in group]
+        refresh.append(dict({f'new_{name}': getattr(newest, name) for name in UPSERT_COLUMNS}, keep_id=keep.id))
+        for row in group[1:]:
+            repoint.append({'keep_id': keep.id, 'duplicate_id': row.id})
+            doomed.append(row.id)
+
+    orders = Order.__table__
+    customers = CustomerInfo.__table__
+    # Before any row's details change: orders keep shipping where they did
+    dbsession.execute(
+        update(orders).where(orders.c.customer_info_id == bindparam('row_id'), orders.c.ship_to_name.is_(None))
+        .values(ship_to_name=bindparam('ship_name'), ship_to_address=bindparam('ship_address'),
+                ship_to_phone=bindparam('ship_phone')), snapshot)
+    repointed = dbsession.execute(
+        update(orders).where(orders.c.customer_info_id == bindparam('duplicate_id'))
+        .values(customer_info_id=bindparam('keep_id')), repoint)
+    dbsession.execute(
+        update(customers).where(customers.c.id == bindparam('keep_id'))
+        .values(dict({name: bindparam(f'new_{name}') for name in UPSERT_COLUMNS}, updated_at=func.now())), refresh)
+    dbsession.execute(delete(customers).where(customers.c.id.in_(doomed)))
+
+    report.groups += len(groups)
+    report.merged += len(doomed)
+    report.orders_repointed += max(repointed.rowcount, 0)
+    return keys[-1] if len(keys) == batch_size else None
+
+
+def merge_duplicates(dbsession, batch_size=DEFAULT_MERGE_BATCH_SIZE):
+    """Merge every group of duplicate customers in the session's transaction
+
+    Returns a :class:`MergeReport`. Callers wanting a commit per batch call
+    :func:`merge_batch` themselves.
+    """
+    report = MergeReport()
+    after = merge_batch(dbsession, report, batch_size)
+    while after is not None:
+        after = merge_batch(dbsession, report, batch_size, after)
+    return report
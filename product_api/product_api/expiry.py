@@ -0,0 +1,119 @@
+"""Expiry of abandoned pending orders
+
+An order takes its stock when it is placed. One still ``pending``
+``order_expiry.ttl_minutes`` after it was created is treated as abandoned:
+it is cancelled and its stock released, so unpaid carts cannot hold
+inventory during a sale. ``expire_product_api_orders`` runs this from cron.
+
+Candidates are read oldest first through ``ix_orders_status_created_at``, a
+batch at a time, and each batch is cancelled with the set-based statements
+of :func:`product_api.order_status.transition_orders`: one UPDATE of the
+orders, one multi-row INSERT of status events and one aggregated stock
+UPDATE.
+"""
+from datetime import timedelta
+
+from sqlalchemy import distinct, func, select
+
+from . import order_status
+from .models import Order, OrderItem
+from .pagination import keyset_after, order_by_keyset
+
+DEFAULT_TTL_MINUTES = 24 * 60
+DEFAULT_BATCH_SIZE = 500
+UPDATED_BY = 'system'
+NOTE = 'Expired: not paid in time'
+
+
+class ExpiryReport:
+    def __init__(self, cutoff, dry_run=False):
+        self.cutoff = cutoff
+        self.dry_run = dry_run
+        self.batches = 0
+        self.orders = 0
+        self.units = 0
+        self.product_ids = set()
+
+    def to_dict(self):
+        return {
+            'cutoff': self.cutoff.isoformat(),
+            'dryRun': self.dry_run,
+            'batches': self.batches,
+            'orders': self.orders,
+            'unitsReleased': self.units,
+            'products': len(self.product_ids),
+        }
+
+
+def database_now(dbsession):
+    """The current time on the clock ``Order.created_at`` is written with
+
+    The column defaults to the database's ``now()``: UTC on SQLite, but the
+    session's local time once PostgreSQL stores it in a ``timestamp``
+    column. Reading the same clock back keeps the cutoff comparable.
+    """
+    return dbsession.execute(select(func.now())).scalar_one().replace(tzinfo=None)
+
+
+def cutoff_for(ttl_minutes, now):
+    """Orders created before this are expired; ``now`` as from :func:`database_now`"""
+    return now - timedelta(minutes=ttl_minutes)
+
+
+def _candidates(dbsession, cutoff, after, batch_size):
+    query = select(Order.id, Order.created_at) \
+        .where(Order.status == 'pending', Order.created_at < cutoff) \
+        .order_by(*order_by_keyset(Order.created_at, Order.id)) \
+        .limit(batch_size)
+    if after is not None:
+        query = query.where(keyset_after(Order.created_at, Order.id, *after))
+    return dbsession.execute(query).all()
+
+
+def _stock_held(dbsession, order_ids):
+    """``(units, product ids)`` held by the items of ``order_ids``"""
+    units, = dbsession.execute(
+        select(func.coalesce(func.sum(OrderItem.quantity), 0)).where(OrderItem.order_id.in_(order_ids))
+    ).one()
+    product_ids = dbsession.execute(
+        select(distinct(OrderItem.product_id)).where(OrderItem.order_id.in_(order_ids))
+    ).scalars().all()
+    return units, product_ids
+
+
+def expire_batch(dbsession, report, batch_size=DEFAULT_BATCH_SIZE, after=None):
+    """Cancel the next batch of expired orders after the ``(created_at, id)`` key ``after``
+
+    With ``report.dry_run`` only counts what would be released. Adds to
+    ``report`` and returns the key to continue from, or None when done.
+    """
+    rows = _candidates(dbsession, report.cutoff, after, batch_size)
+    if not rows:
+        return None
+    order_ids = [row.id for row in rows]
+    if not report.dry_run:
+        batch = order_status.transition_orders(
+            dbsession, order_ids, order_status.CANCELLED, note=NOTE, updated_by=UPDATED_BY)
+        order_ids = [result['id'] for result in batch.results if result['result'] == order_status.UPDATED]
+    if order_ids:
+        units, product_ids = _stock_held(dbsession, order_ids)
+        report.orders += len(order_ids)
+        report.units += units
+        report.product_ids.update(product_ids)
+    report.batches += 1
+    last = rows[-1]
+    return (last.created_at, last.id) if len(rows) == batch_size else None
+
+
+def expire_pending_orders(dbsession, ttl_minutes=DEFAULT_TTL_MINUTES, now=None,
+                          batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    """Expire every pending order past its TTL in the session's transaction
+
+    Returns an :class:`ExpiryReport`. Callers wanting a commit per batch
+    call :func:`expire_batch` themselves.
+    """
+    report = ExpiryReport(cutoff_for(ttl_minutes, now or database_now(dbsession)), dry_run=dry_run)
+    after = expire_batch(dbsession, report, batch_size)
+    while after is not None:
+        after = expire_batch(dbsession, report, batch_size, after)
+    return report
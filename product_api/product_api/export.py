@@ -0,0 +1,211 @@
+"""Streaming exports of products, orders and customers
+
+Rows are read with ``yield_per`` (a server-side cursor on PostgreSQL) and
+encoded as NDJSON or CSV into ~64 KiB chunks, optionally gzip-compressed,
+so memory use does not depend on the size of the table. Records have the
+same shape as the JSON API (``to_dict``); CSV flattens them.
+
+The web endpoint returns :func:`stream_export` as the response ``app_iter``.
+It is consumed after the view (and pyramid_tm's transaction) has finished,
+so it reads through its own session, closed when the iterator is exhausted
+or closed.
+"""
+import csv
+import io
+import json
+import zlib
+from collections import defaultdict
+
+from sqlalchemy import select
+
+from .models import CustomerInfo, Order, OrderItem, OrderStatusEvent, Product
+from .models.order import with_ship_to
+
+EXPORTS = ('products', 'orders', 'customers')
+FORMATS = ('ndjson', 'csv')
+YIELD_PER = 1000
+CHUNK_SIZE = 64 * 1024
+# Serialized products kept between order batches; cleared when it fills up
+PRODUCT_MEMO_SIZE = 50000
+
+CSV_COLUMNS = {
+    'products': ['id', 'sku', 'title', 'description', 'price', 'stock', 'image'],
+    'customers': ['id', 'fullName', 'email', 'phoneNumber', 'address', 'createdAt', 'updatedAt'],
+    'orders': ['id', 'orderId', 'status', 'subtotal', 'shipping', 'total', 'orderDate',
+               'createdAt', 'updatedAt', 'customerName', 'customerEmail', 'customerPhone',
+               'customerAddress', 'items'],
+}
+
+CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _customer_record(row):
+    """``Order.customer_dict()`` from the order's and its ``customer_*`` columns"""
+    if row.customer_id is None:
+        return None
+    return with_ship_to({
+        'id': row.customer_id,
+        'fullName': row.customer_full_name,
+        'email': row.customer_email,
+        'address': row.customer_address,
+        'phoneNumber': row.customer_phone_number,
+        'createdAt': _isoformat(row.customer_created_at),
+        'updatedAt': _isoformat(row.customer_updated_at),
+    }, row)
+
+
+def _event_record(row):
+    """``OrderStatusEvent.to_dict()`` from a Core row"""
+    return {
+        'status': row.status,
+        'timestamp': _isoformat(row.ts),
+        'updatedBy': row.updated_by,
+        'note': row.note,
+    }
+
+
+def _order_record(row, items, events, products):
+    """``Order.to_dict()`` from Core rows of the order, its items and events, and serialized products"""
+    return {
+        'id': row.id,
+        'orderId': row.order_id,
+        'customerInfo': _customer_record(row),
+        'items': [{
+            'id': item.id,
+            'productId': item.product_id,
+            'product': products.get(item.product_id),
+            'quantity': item.quantity,
+            'price': float(item.price) if item.price else 0,
+        } for item in items],
+        'subtotal': float(row.subtotal) if row.subtotal else 0,
+        'shipping': float(row.shipping) if row.shipping else 0,
+        'total': float(row.total) if row.total else 0,
+        'status': row.status,
+        'statusHistory': [_event_record(event) for event in events],
+        'orderDate': _isoformat(row.order_date),
+        'createdAt': _isoformat(row.created_at),
+        'updatedAt': _isoformat(row.updated_at),
+    }
+
+
+def _iter_orders(session, yield_per):
+    # Core rows rather than ORM objects: building Order/OrderItem/Product
+    # instances for every row made the export more than twice as slow.
+    orders = Order.__table__
+    customers = CustomerInfo.__table__
+    statement = select(orders, *[column.label(f'customer_{column.name}') for column in customers.c]) \
+        .join_from(orders, customers, isouter=True) \
+        .order_by(orders.c.id)
+    result = session.execute(statement.execution_options(yield_per=yield_per))
+    products = {}
+    for rows in result.partitions():
+        order_ids = [row.id for row in rows]
+        items = defaultdict(list)
+        for item in session.execute(
+                select(OrderItem.__table__)
+                .where(OrderItem.order_id.in_(order_ids))
+                .order_by(OrderItem.id)):
+            items[item.order_id].append(item)
+        events = defaultdict(list)
+        for event in session.execute(
+                select(OrderStatusEvent.__table__)
+                .where(OrderStatusEvent.order_id.in_(order_ids))
+                .order_by(OrderStatusEvent.order_id, OrderStatusEvent.ts, OrderStatusEvent.id)):
+            events[event.order_id].append(event)
+        wanted = {item.product_id for batch in items.values() for item in batch}
+        if len(products) + len(wanted) > PRODUCT_MEMO_SIZE:
+            products.clear()
+        missing = wanted.difference(products)
+        if missing:
+            for product in session.query(Product).filter(Product.id.in_(missing)):
+                products[product.id] = product.to_dict()
+        for row in rows:
+            yield _order_record(row, items[row.id], events[row.id], products)
+
+
+def iter_records(session, kind, yield_per=YIELD_PER):
+    """Records shaped like the API's ``to_dict()`` for every row of ``kind``, in id order"""
+    if kind == 'orders':
+        return _iter_orders(session, yield_per)
+    if kind == 'products':
+        model = Product
+    elif kind == 'customers':
+        model = CustomerInfo
+    else:
+        raise ValueError(f'Unknown export: {kind!r}')
+    result = session.execute(select(model).order_by(model.id).execution_options(yield_per=yield_per))
+    # The session's identity map is weak, so serialized rows are released
+    return (obj.to_dict() for obj in result.scalars())
+
+
+def _flatten_order(record):
+    customer = record.get('customerInfo') or {}
+    row = dict(record,
+               customerName=customer.get('fullName'),
+               customerEmail=customer.get('email'),
+               customerPhone=customer.get('phoneNumber'),
+               customerAddress=customer.get('address'))
+    row['items'] = json.dumps([
+        {'productId': item['productId'], 'quantity': item['quantity'], 'price': item['price']}
+        for item in record['items']
+    ])
+    return row
+
+
+def iter_ndjson(records):
+    for record in records:
+        yield json.dumps(record) + '\n'
+
+
+def iter_csv(records, kind):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, CSV_COLUMNS[kind], extrasaction='ignore')
+    writer.writeheader()
+    for record in records:
+        writer.writerow(_flatten_order(record) if kind == 'orders' else record)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_chunks(texts, gzip=False, chunk_size=CHUNK_SIZE):
+    """Join text pieces into encoded byte chunks of about ``chunk_size``"""
+    compressor = zlib.compressobj(wbits=31) if gzip else None  # 31: gzip container
+    pending = []
+    size = 0
+    for text in texts:
+        pending.append(text)
+        size += len(text)
+        if size >= chunk_size:
+            data = ''.join(pending).encode('utf-8')
+            pending, size = [], 0
+            if compressor:
+                data = compressor.compress(data)
+            if data:
+                yield data
+    data = ''.join(pending).encode('utf-8')
+    if compressor:
+        data = compressor.compress(data) + compressor.flush()
+    if data:
+        yield data
+
+
+def stream_export(session_factory, kind, fmt='ndjson', gzip=False, yield_per=YIELD_PER):
+    """Bytes of the ``kind`` export, read through a session of its own"""
+    session = session_factory()
+    try:
+        records = iter_records(session, kind, yield_per=yield_per)
+        texts = iter_csv(records, kind) if fmt == 'csv' else iter_ndjson(records)
+        yield from iter_chunks(texts, gzip=gzip)
+    finally:
+        session.close()
+
+
+def filename(kind, fmt, gzip=False):
+    return f"{kind}.{fmt}{'.gz' if gzip else ''}"
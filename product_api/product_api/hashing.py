@@ -0,0 +1,89 @@
+"""Password hashing off the request threads, with a bounded backlog
+
+werkzeug's scrypt/PBKDF2 hashes deliberately cost ~100 ms of CPU each. Run
+on waitress's few request threads, a burst of logins would leave none for
+catalog traffic. Hashes instead run on ``password_hashing.workers``
+dedicated threads (``hashlib`` releases the GIL while it computes), and at
+most ``password_hashing.max_queue`` more may wait for one. Beyond that a
+login is refused at once with :class:`PoolBusy` rather than holding
+another request thread: at most ``workers + max_queue`` request threads
+are ever waiting on a hash.
+
+``password_hashing.workers = 0`` hashes inline on the request thread.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_QUEUE = 8
+DEFAULT_TIMEOUT = 10
+
+
+class PoolBusy(Exception):
+    """Too many hashes are running or queued; retry shortly"""
+
+
+class HashPool:
+    def __init__(self, workers=DEFAULT_WORKERS, max_queue=DEFAULT_MAX_QUEUE, timeout=DEFAULT_TIMEOUT):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def run(self, fn, *args):
+        """``fn(*args)`` on a pool thread; raises :class:`PoolBusy` when full"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PoolBusy('Password hashing is busy')
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            raise PoolBusy('Password hashing timed out')
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_hash_pool(registry):
+    """The configured :class:`HashPool`, or ``None`` to hash inline"""
+    return registry.get('hash_pool')
+
+
+def _run(request, fn, *args):
+    pool = get_hash_pool(request.registry)
+    if pool is None:
+        return fn(*args)
+    return pool.run(fn, *args)
+
+
+def check_password(request, password_hash, password):
+    """``Admin.check_password`` on the hash pool"""
+    return _run(request, check_password_hash, password_hash, password)
+
+
+def hash_password(request, password):
+    """``Admin.set_password``'s hash, computed on the hash pool"""
+    return _run(request, generate_password_hash, password)
+
+
+def includeme(config):
+    settings = config.get_settings()
+    workers = int(settings.get('password_hashing.workers', DEFAULT_WORKERS))
+    if workers > 0:
+        config.registry['hash_pool'] = HashPool(
+            workers=workers,
+            max_queue=int(settings.get('password_hashing.max_queue', DEFAULT_MAX_QUEUE)),
+            timeout=float(settings.get('password_hashing.timeout', DEFAULT_TIMEOUT)),
+        )
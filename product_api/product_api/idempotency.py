@@ -0,0 +1,114 @@
+"""Idempotency keys for order-creating POSTs
+
+A client that may retry a request (network timeout, double click) sends the
+same ``Idempotency-Key`` header with every attempt. The first attempt runs
+the view and stores its response; later ones get the stored status and body
+back byte for byte, without running the view, so no second order is created
+and no stock is taken twice. A key reused with a different method, path or
+body is refused with 422.
+
+Only successful (2xx) responses are stored: a failed attempt wrote nothing,
+so retrying it runs the view again. Stored responses expire after
+``idempotency.ttl_hours``; ``prune_product_api_changes`` deletes expired rows.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from pyramid.response import Response
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+
+from .models.idempotency import IdempotencyKey
+from .models.meta import utcnow
+
+HEADER = 'Idempotency-Key'
+DEFAULT_TTL_HOURS = 24
+MAX_KEY_LENGTH = 255
+
+
+def request_hash(request):
+    """SHA-256 of the request's method, path and body"""
+    digest = hashlib.sha256()
+    for part in (request.method.encode('utf-8'), request.path.encode('utf-8'), request.body or b''):
+        digest.update(len(part).to_bytes(8, 'big'))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def _ttl(request):
+    settings = request.registry.settings or {}
+    return timedelta(hours=float(settings.get('idempotency.ttl_hours', DEFAULT_TTL_HOURS)))
+
+
+def _error(status, message):
+    return Response(json.dumps({'error': message}), status=status, content_type='application/json; charset=UTF-8')
+
+
+def _claim(dbsession, key, fingerprint, expires_at):
+    """The key's newly inserted row, or None if it already has one"""
+    savepoint = dbsession.begin_nested()
+    try:
+        dbsession.add(IdempotencyKey(key=key, request_hash=fingerprint, expires_at=expires_at))
+        savepoint.commit()
+    except IntegrityError:
+        savepoint.rollback()
+        return None
+    return dbsession.get(IdempotencyKey, key)
+
+
+def _replay(record):
+    response = Response(body=record.body, status=record.status_code)
+    response.headers['Content-Type'] = record.content_type
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """``view_config(decorator=...)`` making a view honour ``Idempotency-Key``
+
+    Wraps the rendered view, so the stored body is exactly what was sent.
+    """
+    def wrapper(context, request):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(context, request)
+        if len(key) > MAX_KEY_LENGTH:
+            return _error(400, f'{HEADER} must be at most {MAX_KEY_LENGTH} characters')
+
+        dbsession = request.dbsession
+        fingerprint = request_hash(request)
+        now = utcnow()
+        dbsession.execute(
+            delete(IdempotencyKey)
+            .where(IdempotencyKey.key == key, IdempotencyKey.expires_at <= now)
+            .execution_options(synchronize_session='fetch')
+        )
+        claim = _claim(dbsession, key, fingerprint, now + _ttl(request))
+        if claim is None:
+            record = dbsession.get(IdempotencyKey, key, populate_existing=True)
+            if record.request_hash != fingerprint:
+                return _error(422, f'{HEADER} was already used for a different request')
+            if record.status_code is None:
+                return _error(409, f'A request with this {HEADER} is still in progress')
+            return _replay(record)
+
+        response = view(context, request)
+        if 200 <= response.status_code < 300:
+            claim.status_code = response.status_code
+            claim.content_type = response.headers.get('Content-Type')
+            claim.body = response.body
+        elif claim in dbsession:  # the view may have rolled the session back
+            dbsession.delete(claim)
+        return response
+
+    return wrapper
+
+
+def purge_expired(dbsession, now=None):
+    """Delete stored responses past their TTL; returns how many"""
+    result = dbsession.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.expires_at <= (now or utcnow()))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
@@ -0,0 +1,103 @@
+"""Time-ordered order identifiers
+
+``new_order_id()`` returns ``ORD-`` followed by a ULID: 48 bits of
+millisecond timestamp then 80 random bits, in Crockford base32 (26
+characters). IDs sort by creation time, so inserts into the unique index on
+``orders.order_id`` append at its right-hand edge instead of splitting pages
+all over it, and a prefix of an ID selects a contiguous key range.
+
+Within a process IDs are strictly increasing: a second ID in the same
+millisecond (or after the clock stepped back) reuses the previous timestamp
+and adds one to the random part. Across processes and threads uniqueness
+rests on the 80 random bits; forked children start a fresh sequence.
+"""
+import os
+import secrets
+import threading
+import time
+
+ORDER_ID_PREFIX = 'ORD-'
+
+# Crockford's base32: no I, L, O or U
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+ULID_LENGTH = 26
+
+_RANDOM_BITS = 80
+_RANDOM_MAX = (1 << _RANDOM_BITS) - 1
+
+_lock = threading.Lock()
+_last_ms = -1
+_last_random = 0
+
+
+def _reset_after_fork():
+    global _lock, _last_ms, _last_random
+    _lock = threading.Lock()
+    _last_ms = -1
+    _last_random = 0
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def encode(value, length=ULID_LENGTH):
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+def ulid(now_ms=None):
+    """A new ULID string, greater than any returned before in this process"""
+    global _last_ms, _last_random
+    with _lock:
+        ms = int(time.time() * 1000) if now_ms is None else now_ms
+        if ms <= _last_ms:
+            ms = _last_ms
+            random_part = _last_random + 1
+            if random_part > _RANDOM_MAX:
+                # 2**80 IDs in one millisecond: borrow the next one
+                ms += 1
+                random_part = secrets.randbits(_RANDOM_BITS)
+        else:
+            random_part = secrets.randbits(_RANDOM_BITS)
+        _last_ms, _last_random = ms, random_part
+    return encode((ms << _RANDOM_BITS) | random_part)
+
+
+def timestamp_ms(value):
+    """Milliseconds since the epoch encoded in a ULID (or an order id)"""
+    if value.startswith(ORDER_ID_PREFIX):
+        value = value[len(ORDER_ID_PREFIX):]
+    # 26 characters hold 130 bits; the first 10 are two zero bits and the timestamp
+    number = 0
+    for char in value[:10]:
+        number = number * 32 + ALPHABET.index(char)
+    return number
+
+
+def new_order_id():
+    return ORDER_ID_PREFIX + ulid()
+
+
+def prefix_bounds(prefix):
+    """``(low, high)`` with ``low <= order_id < high`` for IDs starting with ``prefix``
+
+    Compared in :class:`~product_api.models.meta.byte_order`, the range is
+    served by a B-tree index on every backend, which ``LIKE 'prefix%'`` is
+    not (SQLite's LIKE is case-insensitive, PostgreSQL needs
+    ``text_pattern_ops`` outside the C locale). ``high`` is None when there
+    is no upper bound. Returns None for a prefix that is not an
+    ``ORD-<base32>`` order id prefix.
+    """
+    body = prefix[len(ORDER_ID_PREFIX):]
+    if not prefix.startswith(ORDER_ID_PREFIX) or not body or any(c not in ALPHABET for c in body):
+        return None
+    digits = list(body)
+    while digits and digits[-1] == ALPHABET[-1]:
+        digits.pop()
+    if not digits:
+        return prefix, None
+    digits[-1] = ALPHABET[ALPHABET.index(digits[-1]) + 1]
+    return prefix, ORDER_ID_PREFIX + ''.join(digits)
@@ -0,0 +1,211 @@
+"""Streaming bulk import of products from CSV or NDJSON
+
+Records are parsed one at a time from the input stream, validated with the
+same rules as ``POST /api/products`` (:func:`product_api.validation.clean_product`)
+and written in batches with Core ``INSERT`` executemany. Rows carrying a
+``sku`` are upserted on it (``ON CONFLICT (sku) DO UPDATE`` on PostgreSQL
+and SQLite); rows without one are always inserted. Invalid rows are skipped
+and reported by row number; the rest of the file is still imported.
+
+CSV files need a header row naming the columns (``title``, ``description``,
+``price``, ``stock``, ``image``, ``sku``); empty cells count as absent.
+"""
+import csv
+import io
+import json
+
+from sqlalchemy import bindparam, insert, select, update
+
+from .models import Product
+from .models.catalog import mark_catalog_changed
+from .models.meta import utc_timestamp
+from .validation import clean_product
+
+FORMATS = ('csv', 'ndjson')
+DEFAULT_BATCH_SIZE = 5000
+# Only the first errors are kept in the report; all are counted
+MAX_REPORTED_ERRORS = 1000
+
+# Columns an upsert overwrites on an existing SKU
+UPSERT_COLUMNS = ('title', 'description', 'price', 'stock', 'image')
+
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self.product_ids = []
+
+    def add_error(self, row, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'error': message})
+
+    def to_dict(self):
+        return {
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errorsTruncated': self.failed > len(self.errors),
+        }
+
+
+def format_for(content_type=None, filename=None):
+    """Guess the import format from a content type or file name"""
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    if content_type in ('text/csv', 'application/csv'):
+        return 'csv'
+    if content_type in ('application/x-ndjson', 'application/ndjson', 'application/jsonl'):
+        return 'ndjson'
+    if filename:
+        if filename.lower().endswith('.csv'):
+            return 'csv'
+        if filename.lower().endswith(('.ndjson', '.jsonl')):
+            return 'ndjson'
+    return None
+
+
+def _text_stream(stream):
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    if isinstance(stream, io.RawIOBase):
+        stream = io.BufferedReader(stream)
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+
+def iter_csv(stream):
+    """Yield ``(row_number, record, error)`` for each CSV data row"""
+    reader = csv.reader(_text_stream(stream))
+    row_number = 0
+    try:
+        header = [name.strip() for name in next(reader, [])]
+        for row_number, values in enumerate(reader, start=1):
+            yield row_number, {name: value for name, value in zip(header, values)
+                               if name and value}, None
+    except csv.Error as e:
+        yield row_number + 1, None, f'Malformed CSV: {e}'
+
+
+def iter_ndjson(stream):
+    """Yield ``(row_number, record, error)`` for each non-blank line"""
+    for row_number, line in enumerate(_text_stream(stream), start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield row_number, None, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(record, dict):
+            yield row_number, None, 'Each line must be a JSON object'
+            continue
+        yield row_number, record, None
+
+
+def iter_records(stream, fmt):
+    if fmt == 'csv':
+        return iter_csv(stream)
+    if fmt == 'ndjson':
+        return iter_ndjson(stream)
+    raise ValueError(f'Unsupported import format: {fmt!r}')
+
+
+# Set in SQL rather than through the column defaults, which would be
+# evaluated and bound once per row
+_NEW_ROW_VALUES = {'version': 1, 'updated_at': utc_timestamp()}
+
+
+def _upsert_statement(dialect_name):
+    """``INSERT ... ON CONFLICT (sku) DO UPDATE ... RETURNING id``, if supported"""
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    statement = dialect_insert(Product).values(_NEW_ROW_VALUES)
+    changes = {name: statement.excluded[name] for name in UPSERT_COLUMNS}
+    changes['version'] = Product.version + 1
+    changes['updated_at'] = utc_timestamp()
+    return statement.on_conflict_do_update(
+        index_elements=[Product.sku], set_=changes,
+    ).returning(Product.id).execution_options(insertmanyvalues_page_size=DEFAULT_BATCH_SIZE)
+
+
+def _upsert_generic(connection, rows):
+    """Update-then-insert for dialects without ON CONFLICT"""
+    existing = dict(connection.execute(
+        select(Product.sku, Product.id).where(Product.sku.in_([row['sku'] for row in rows]))
+    ).all())
+    updates = [dict(row, match_sku=row['sku']) for row in rows if row['sku'] in existing]
+    inserts = [row for row in rows if row['sku'] not in existing]
+    if updates:
+        connection.execute(update(Product).where(Product.sku == bindparam('match_sku')), updates)
+    ids = [existing[row['sku']] for row in updates]
+    if inserts:
+        ids += connection.execute(
+            insert(Product).values(_NEW_ROW_VALUES).returning(Product.id), inserts).scalars().all()
+    return ids
+
+
+class _BatchWriter:
+    def __init__(self, connection):
+        self.connection = connection
+        self.upsert = _upsert_statement(connection.dialect.name)
+        # RETURNING makes SQLAlchemy send multi-row VALUES statements
+        # (bounded by the driver's parameter limit) instead of executemany,
+        # under which the SQLite FTS5 triggers flush once per row
+        self.insert = insert(Product).values(_NEW_ROW_VALUES).returning(Product.id) \
+            .execution_options(insertmanyvalues_page_size=DEFAULT_BATCH_SIZE)
+
+    def write(self, rows):
+        by_sku = {}
+        plain = []
+        for row in rows:
+            if row['sku']:
+                # ON CONFLICT cannot touch the same row twice in one statement;
+                # the last occurrence of a SKU wins
+                by_sku[row['sku']] = row
+            else:
+                plain.append(row)
+        ids = []
+        if plain:
+            ids += self.connection.execute(self.insert, plain).scalars().all()
+        if by_sku:
+            if self.upsert is None:
+                ids += _upsert_generic(self.connection, list(by_sku.values()))
+            else:
+                ids += self.connection.execute(self.upsert, list(by_sku.values())).scalars().all()
+        return ids
+
+
+def import_products(dbsession, records, batch_size=DEFAULT_BATCH_SIZE):
+    """Write ``records`` (from :func:`iter_records`) in the session's transaction
+
+    Returns an :class:`ImportReport`. The caller commits or aborts.
+    """
+    report = ImportReport()
+    writer = _BatchWriter(dbsession.connection())
+    batch = []
+    for row_number, record, error in records:
+        if error is None:
+            try:
+                batch.append(clean_product(record))
+            except (ValueError, TypeError) as e:
+                error = str(e)
+        if error is not None:
+            report.add_error(row_number, error)
+            continue
+        if len(batch) >= batch_size:
+            report.product_ids += writer.write(batch)
+            batch = []
+    if batch:
+        report.product_ids += writer.write(batch)
+    # A SKU repeated in the file is written (and returned) once per batch
+    # it appears in, but is one product
+    report.product_ids = list(dict.fromkeys(report.product_ids))
+    report.imported = len(report.product_ids)
+    if report.product_ids:
+        mark_catalog_changed(dbsession, upserted=report.product_ids)
+    return report
@@ -0,0 +1,146 @@
+"""Atomic stock reservation for checkout
+
+Every order line is reserved with one conditional statement::
+
+    UPDATE products SET stock = stock - :q WHERE id = :id AND stock >= :q
+    RETURNING *
+
+The row lock taken by the UPDATE serializes concurrent checkouts of the same
+product, and a line that no longer fits matches no row, so stock can neither
+be oversold nor lose an update. Lines are reserved in product id order, so
+two orders sharing products lock them in the same order. ``CHECK (stock >= 0)``
+on ``products`` backs this up for every other writer.
+"""
+from sqlalchemy import func, select, update
+
+from .models import Order, OrderItem, Product
+from .models.catalog import mark_catalog_changed
+
+
+class StockError(Exception):
+    """One or more order lines cannot be reserved; ``details`` says why"""
+
+    def __init__(self, details):
+        super().__init__('Stock validation failed')
+        self.details = details
+
+
+def order_quantities(items):
+    """Quantity per product id for order ``items`` (``{'id', 'quantity'}``)
+
+    Lines for the same product are added together.
+    """
+    quantities = {}
+    for item in items:
+        try:
+            product_id = int(item.get('id'))
+            quantity = int(item.get('quantity', 1))
+        except (AttributeError, TypeError, ValueError):
+            raise StockError([f'Invalid order item: {item!r}'])
+        if quantity < 1:
+            raise StockError([f'Invalid quantity for product {product_id}: {quantity}'])
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    return quantities
+
+
+def _shortage(dbsession, product_id, quantity):
+    row = dbsession.execute(
+        select(Product.title, Product.stock).where(Product.id == product_id)
+    ).first()
+    if row is None:
+        return f'Product with id {product_id} not found'
+    return f'Insufficient stock for {row.title}. Available: {row.stock}, Requested: {quantity}'
+
+
+def _take(dbsession, product_id, quantity):
+    """Decrement one product's stock if it suffices; the refreshed product, or None"""
+    statement = update(Product) \
+        .where(Product.id == product_id, Product.stock >= quantity) \
+        .values(stock=Product.stock - quantity) \
+        .execution_options(synchronize_session=False, populate_existing=True)
+    if dbsession.get_bind().dialect.update_returning:
+        return dbsession.execute(statement.returning(Product)).scalar()
+    if dbsession.execute(statement).rowcount != 1:
+        return None
+    return dbsession.get(Product, product_id, populate_existing=True)
+
+
+def reserve_stock(dbsession, quantities):
+    """Take ``{product_id: quantity}`` from stock, all or nothing
+
+    Returns ``{product_id: Product}`` as the rows were right after the
+    reservation; their ``price`` is the order's price snapshot. Raises
+    :class:`StockError` listing every line that cannot be reserved, in
+    which case no stock has been taken.
+    """
+    products = {}
+    errors = []
+    savepoint = dbsession.begin_nested()
+    try:
+        for product_id in sorted(quantities):
+            product = _take(dbsession, product_id, quantities[product_id])
+            if product is None:
+                errors.append(_shortage(dbsession, product_id, quantities[product_id]))
+            else:
+                products[product_id] = product
+        if errors:
+            raise StockError(errors)
+    except BaseException:
+        savepoint.rollback()
+        raise
+    savepoint.commit()
+    mark_catalog_changed(dbsession, upserted=products)
+    return products
+
+
+def _claim_restock(dbsession, order_ids):
+    """Set ``stock_restored`` on those of ``order_ids`` without it; their ids"""
+    unrestored = (Order.id.in_(order_ids), Order.stock_restored.is_(False))
+    statement = update(Order).values(stock_restored=True).execution_options(synchronize_session='fetch')
+    if dbsession.get_bind().dialect.update_returning:
+        return dbsession.execute(statement.where(*unrestored).returning(Order.id)).scalars().all()
+    claimed = dbsession.execute(select(Order.id).where(*unrestored).with_for_update()).scalars().all()
+    if claimed:
+        dbsession.execute(statement.where(Order.id.in_(claimed)))
+    return claimed
+
+
+def restore_stock(dbsession, order_ids):
+    """Put every item of ``order_ids`` back in stock, at most once per order
+
+    Each order is first claimed by setting its ``stock_restored`` flag with
+    a guarded UPDATE, so retries and concurrent calls skip it. The claimed
+    orders' quantities are then added back with one statement, however many
+    orders and items there are::
+
+        UPDATE products SET stock = stock + returned.quantity
+        FROM (SELECT product_id, sum(quantity) AS quantity FROM order_items
+              WHERE order_id IN (...) GROUP BY product_id) AS returned
+        WHERE products.id = returned.product_id
+
+    Returns ``(restored order ids, restocked products)``; products already
+    in the session are refreshed in place.
+    """
+    if not order_ids:
+        return [], []
+    claimed = _claim_restock(dbsession, order_ids)
+    if not claimed:
+        return [], []
+    returned = select(OrderItem.product_id, func.sum(OrderItem.quantity).label('quantity')) \
+        .where(OrderItem.order_id.in_(claimed)) \
+        .group_by(OrderItem.product_id) \
+        .subquery('returned')
+    statement = update(Product) \
+        .where(Product.id == returned.c.product_id) \
+        .values(stock=Product.stock + returned.c.quantity) \
+        .execution_options(synchronize_session=False, populate_existing=True)
+    if dbsession.get_bind().dialect.update_returning:
+        products = dbsession.execute(statement.returning(Product)).scalars().all()
+    else:
+        product_ids = dbsession.execute(select(returned.c.product_id)).scalars().all()
+        dbsession.execute(statement)
+        products = dbsession.execute(
+            select(Product).where(Product.id.in_(product_ids)).execution_options(populate_existing=True)
+        ).scalars().all()
+    mark_catalog_changed(dbsession, upserted=[product.id for product in products])
+    return claimed, products
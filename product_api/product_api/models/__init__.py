@@ -8,8 +8,10 @@ import zope.sqlalchemy
 from .mymodel import MyModel  # flake8: noqa
 from .product import Product
 from .customer_info import CustomerInfo
-from .order import Order, OrderItem
-from .admin import Admin
+from .order import Order, OrderItem, OrderStatusEvent
+from .admin import Admin, RevokedToken
+from .catalog import CatalogState, CatalogChange
+from .idempotency import IdempotencyKey
 from .meta import Base
 
 # run configure_mappers after defining all of the models to ensure
@@ -1,6 +1,6 @@
 from sqlalchemy import Column, Integer, String, DateTime, Boolean, func
 from werkzeug.security import generate_password_hash, check_password_hash
-from .meta import Base
+from .meta import Base, utcnow
 
 class Admin(Base):
     __tablename__ = 'admins'
@@ -29,4 +29,19 @@ class Admin(Base):
             'createdAt': self.created_at.isoformat() if self.created_at else None,
             'updatedAt': self.updated_at.isoformat() if self.updated_at else None,
             'lastLogin': self.last_login.isoformat() if self.last_login else None
-        }
\ No newline at end of file
+        }
+
+
+class RevokedToken(Base):
+    """An admin token signed out before its ``exp``
+
+    Only needed until ``expires_at``: the token stops verifying then anyway,
+    and prune_product_api_changes deletes the row.
+    """
+    __tablename__ = 'revoked_tokens'
+
+    jti = Column(String(64), primary_key=True)
+    admin_id = Column(Integer, nullable=False)  # no FK: outlives deleted admins
+    expires_at = Column(DateTime, nullable=False, index=True)
+    # Processes load the rows revoked since their last refresh by this
+    revoked_at = Column(DateTime, nullable=False, default=utcnow, index=True)
@@ -0,0 +1,116 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, DDL, event, insert, select, update
+from sqlalchemy.orm import Session
+from .meta import Base, utcnow, utc_timestamp
+from .product import Product
+
+
+class CatalogState(Base):
+    """Single row holding the catalog-wide version
+
+    ``version`` is bumped in the same transaction as every product insert,
+    update or delete, so ``(version, updated_at)`` validates the whole
+    product list without reading any product rows.
+    """
+    __tablename__ = 'catalog_state'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=utcnow)
+    # Highest catalog_changes.seq removed by retention; feeds asking for
+    # changes since an older seq must resynchronise from the full list
+    changes_horizon = Column(BigInteger, nullable=False, default=0, server_default='0')
+
+
+class CatalogChange(Base):
+    """One product upsert or delete, in commit order
+
+    Rows are written by the same commit hook that bumps the catalog version,
+    after it has locked the ``catalog_state`` row, so ``seq`` values become
+    visible in increasing order and a reader never sees a gap that is filled
+    in later.
+    """
+    __tablename__ = 'catalog_changes'
+    __table_args__ = {'sqlite_autoincrement': True}  # never reuse a pruned seq
+
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+
+    seq = Column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True)
+    product_id = Column(Integer, nullable=False, index=True)  # no FK: outlives deletes
+    op = Column(String(10), nullable=False)
+    changed_at = Column(DateTime, nullable=False, default=utcnow, index=True)
+
+
+CATALOG_STATE_ID = 1
+
+event.listen(CatalogState.__table__, 'after_create', DDL(
+    "INSERT INTO catalog_state (id, version, updated_at, changes_horizon) "
+    "VALUES (1, 0, CURRENT_TIMESTAMP, 0)"))
+
+
+def get_catalog_state(dbsession):
+    """``(version, updated_at)`` of the catalog; ``(0, None)`` before the first write"""
+    row = dbsession.execute(
+        select(CatalogState.version, CatalogState.updated_at)
+        .where(CatalogState.id == CATALOG_STATE_ID)
+    ).first()
+    return (row.version, row.updated_at) if row else (0, None)
+
+
+def mark_catalog_changed(session, upserted=(), deleted=()):
+    """Record product writes to publish when ``session`` commits
+
+    ORM flushes of ``Product`` objects are recorded automatically; code
+    writing products through Core statements must call this itself. Commit
+    then bumps the catalog version and appends to the change log.
+    """
+    changes = session.info.setdefault('catalog_changes', {})
+    for product_id in upserted:
+        changes[product_id] = CatalogChange.UPSERT
+    for product_id in deleted:
+        changes[product_id] = CatalogChange.DELETE
+
+
+def bump_catalog_version(connection):
+    """Increment the catalog version inside the caller's transaction"""
+    connection.execute(
+        update(CatalogState)
+        .where(CatalogState.id == CATALOG_STATE_ID)
+        .values(version=CatalogState.version + 1, updated_at=utcnow())
+    )
+
+
+@event.listens_for(Session, 'after_flush')
+def _detect_product_writes(session, flush_context):
+    upserted = [obj.id for obj in session.new if isinstance(obj, Product)]
+    upserted += [obj.id for obj in session.dirty
+                 if isinstance(obj, Product) and session.is_modified(obj, include_collections=False)]
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Product)]
+    if upserted or deleted:
+        mark_catalog_changed(session, upserted, deleted)
+
+
+@event.listens_for(Session, 'before_commit')
+def _publish_on_commit(session):
+    # Runs as late as possible: the catalog_state row lock is then held only
+    # while the transaction commits, not for the whole request. Savepoint
+    # commits are left to the enclosing transaction.
+    if session.in_nested_transaction():
+        return
+    session.flush()
+    changes = session.info.pop('catalog_changes', None)
+    if changes:
+        connection = session.connection()
+        bump_catalog_version(connection)
+        connection.execute(insert(CatalogChange).values(changed_at=utc_timestamp()), [
+            {'product_id': product_id, 'op': op} for product_id, op in changes.items()
+        ])
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_on_rollback(session, previous_transaction):
+    # A rolled back savepoint leaves the enclosing transaction's writes; any
+    # of its own that stay recorded are republished harmlessly
+    if previous_transaction.nested:
+        return
+    session.info.pop('catalog_changes', None)
@@ -1,16 +1,35 @@
-from sqlalchemy import Column, Integer, String, DateTime, func
-from .meta import Base
+from sqlalchemy import Column, Integer, String, DateTime, Index, func
+from sqlalchemy.orm import validates
+from .meta import Base, byte_order
+
+
+def normalize_email(email):
+    """The key customers are deduplicated on: trimmed and case-folded"""
+    return email.strip().casefold() if email else None
+
 
 class CustomerInfo(Base):
     __tablename__ = 'customer_info'
+    __table_args__ = (
+        # One row per customer: orders upsert on it (product_api.customers),
+        # order tracking and customer search look customers up through it
+        Index('uq_customer_info_email_normalized', 'email_normalized', unique=True),
+    )
     
     id = Column(Integer, primary_key=True)
     full_name = Column(String(255), nullable=False)
     email = Column(String(255), nullable=False)
+    # Maintained from email; see normalize_email()
+    email_normalized = Column(String(255))
     address = Column(String(500), nullable=False)
     phone_number = Column(String(20), nullable=False)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+    @validates('email')
+    def _set_email_normalized(self, key, email):
+        self.email_normalized = normalize_email(email)
+        return email
     
     def to_dict(self):
         return {
@@ -21,4 +40,17 @@ class CustomerInfo(Base):
             'phoneNumber': self.phone_number,
             'createdAt': self.created_at.isoformat() if self.created_at else None,
             'updatedAt': self.updated_at.isoformat() if self.updated_at else None
-        }
\ No newline at end of file
+        }
+
+
+# Case-insensitive name search and sort of GET /api/customers
+NAME_KEY = func.lower(CustomerInfo.full_name)
+
+# Prefix search and keyset order of GET /api/customers compare in byte order
+# (see byte_order); the phone index also serves the exact phone lookups of
+# order tracking, which compare the same way.
+Index('ix_customer_info_name_key_id', byte_order(NAME_KEY), CustomerInfo.id)
+Index('ix_customer_info_phone_number_id', byte_order(CustomerInfo.phone_number), CustomerInfo.id)
+# Elsewhere uq_customer_info_email_normalized already is in byte order
+Index('ix_customer_info_email_normalized_c_id', byte_order(CustomerInfo.email_normalized),
+      CustomerInfo.id).ddl_if(dialect='postgresql')
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from .meta import Base, utcnow
+
+
+class IdempotencyKey(Base):
+    """Stored response of a request sent with an ``Idempotency-Key`` header
+
+    The row is inserted when the request starts, in its transaction, so a
+    concurrent request with the same key waits on the primary key and then
+    replays this one. ``status_code`` is NULL until the response is stored.
+    """
+    __tablename__ = 'idempotency_keys'
+
+    key = Column(String(255), primary_key=True)
+    # SHA-256 of method, path and body: a key reused for another request is refused
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer)
+    content_type = Column(String(255))
+    body = Column(LargeBinary)
+    created_at = Column(DateTime, nullable=False, default=utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -1,4 +1,9 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.sql.expression import FunctionElement
 from sqlalchemy.schema import MetaData
 
 # Recommended naming convention used by Alembic, as various different database
@@ -14,3 +19,54 @@ NAMING_CONVENTION = {
 
 metadata = MetaData(naming_convention=NAMING_CONVENTION)
 Base = declarative_base(metadata=metadata)
+
+
+def utcnow():
+    """Naive UTC timestamp for columns used as HTTP Last-Modified validators"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class utc_timestamp(FunctionElement):
+    """Database-side equivalent of :func:`utcnow`
+
+    Used by bulk statements so the timestamp is computed once by the
+    database instead of being bound (and converted) for every row.
+    """
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utc_timestamp)
+def _utc_timestamp(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(utc_timestamp, 'postgresql')
+def _utc_timestamp_postgresql(element, compiler, **kw):
+    return "(now() AT TIME ZONE 'utc')"
+
+
+class byte_order(FunctionElement):
+    """``expr`` compared and sorted by code point on every backend
+
+    PostgreSQL otherwise uses the database collation, in which a
+    ``prefix <= value < successor`` range is not a prefix match (``en_US``
+    skips punctuation, so ``'555-' <= '5551234' < '555.'``). SQLite
+    already compares bytes. Indexes serving such ranges are declared on
+    the same expression.
+    """
+    inherit_cache = True
+
+    def __init__(self, expr):
+        super().__init__(expr)
+        self.type = expr.type
+
+
+@compiles(byte_order)
+def _byte_order(element, compiler, **kw):
+    return compiler.process(element.clauses, **kw)
+
+
+@compiles(byte_order, 'postgresql')
+def _byte_order_postgresql(element, compiler, **kw):
+    return '%s COLLATE "C"' % compiler.process(element.clauses, **kw)
@@ -1,19 +1,37 @@
-from sqlalchemy import Column, Integer, String, Text, Numeric, DateTime, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, Integer, String, Text, Numeric, DateTime, Boolean, ForeignKey, Index, false
+from sqlalchemy.orm import joinedload, relationship, selectinload
 from sqlalchemy import func
-from .meta import Base
+from .meta import Base, byte_order, utcnow
 
 class Order(Base):
     __tablename__ = 'orders'
+    __table_args__ = (
+        # Keyset orders of GET /api/orders, optionally narrowed to one status
+        Index('ix_orders_status_order_date_id', 'status', 'order_date', 'id'),
+        Index('ix_orders_order_date_id', 'order_date', 'id'),
+        Index('ix_orders_total_id', 'total', 'id'),
+        Index('ix_orders_customer_info_id', 'customer_info_id'),
+        # Pending orders past their TTL, oldest first (product_api.expiry)
+        Index('ix_orders_status_created_at', 'status', 'created_at'),
+    )
     
     id = Column(Integer, primary_key=True)
     order_id = Column(String(50), unique=True, nullable=False)  # Custom order ID
     customer_info_id = Column(Integer, ForeignKey('customer_info.id'), nullable=False)
+    # Where this order ships, as given when it was placed. The customer row
+    # only identifies the shopper and holds their latest details, which a
+    # later order (or a merge of duplicate customers) may overwrite.
+    ship_to_name = Column(String(255))
+    ship_to_address = Column(String(500))
+    ship_to_phone = Column(String(20))
     subtotal = Column(Numeric(12, 3), nullable=False)
     shipping = Column(Numeric(10, 2), nullable=False, default=0)
     total = Column(Numeric(12, 3), nullable=False)
     status = Column(String(50), nullable=False, default='pending')
-    status_history = Column(JSON)  # Store status history as JSON
+    # Set when the items go back in stock, so they never go back twice
+    stock_restored = Column(Boolean, nullable=False, default=False, server_default=false())
     order_date = Column(DateTime, default=func.now())
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
@@ -21,12 +39,41 @@ class Order(Base):
     # Relationships
     customer_info = relationship("CustomerInfo", backref="orders")
     order_items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
-    
+    status_events = relationship("OrderStatusEvent", back_populates="order", cascade="all, delete-orphan",
+                                 order_by="(OrderStatusEvent.ts, OrderStatusEvent.id)")
+
+    @property
+    def status_history(self):
+        """``status_events`` in the API's ``statusHistory`` shape"""
+        return [event.to_dict() for event in self.status_events]
+
+    @status_history.setter
+    def status_history(self, entries):
+        self.status_events = [OrderStatusEvent.from_dict(entry) for entry in entries or []]
+
+    def add_status_event(self, status, updated_by=None, note=None, ts=None):
+        """Record a transition: one INSERT of a small row at flush"""
+        event = OrderStatusEvent(status=status, updated_by=updated_by, note=note, ts=ts or utcnow())
+        self.status_events.append(event)
+        return event
+
+    def ship_to(self, customer_values):
+        """Snapshot the shipping details of ``CustomerInfo`` column values"""
+        self.ship_to_name = customer_values['full_name']
+        self.ship_to_address = customer_values['address']
+        self.ship_to_phone = customer_values['phone_number']
+
+    def customer_dict(self):
+        """``customerInfo``: the customer, with this order's shipping details"""
+        if self.customer_info is None:
+            return None
+        return with_ship_to(self.customer_info.to_dict(), self)
+
     def to_dict(self):
         return {
             'id': self.id,
             'orderId': self.order_id,
-            'customerInfo': self.customer_info.to_dict() if self.customer_info else None,
+            'customerInfo': self.customer_dict(),
             'items': [item.to_dict() for item in self.order_items],
             'subtotal': float(self.subtotal) if self.subtotal else 0,
             'shipping': float(self.shipping) if self.shipping else 0,
@@ -38,8 +85,24 @@ class Order(Base):
             'updatedAt': self.updated_at.isoformat() if self.updated_at else None
         }
 
+def with_ship_to(customer, order):
+    """``customer`` (a ``customerInfo`` dict) with ``order``'s snapshot, if it has one"""
+    if order.ship_to_name is not None:
+        customer.update(fullName=order.ship_to_name, address=order.ship_to_address,
+                        phoneNumber=order.ship_to_phone)
+    return customer
+
+
+# order_id_prefix ranges of GET /api/orders (see ids.prefix_bounds); elsewhere
+# the unique order_id index already is in byte order
+Index('ix_orders_order_id_c', byte_order(Order.order_id)).ddl_if(dialect='postgresql')
+
+
 class OrderItem(Base):
     __tablename__ = 'order_items'
+    __table_args__ = (
+        Index('ix_order_items_order_id', 'order_id'),
+    )
     
     id = Column(Integer, primary_key=True)
     order_id = Column(Integer, ForeignKey('orders.id'), nullable=False)
@@ -58,4 +121,56 @@ class OrderItem(Base):
             'product': self.product.to_dict() if self.product else None,
             'quantity': self.quantity,
             'price': float(self.price) if self.price else 0
-        }
\ No newline at end of file
+        }
+
+
+class OrderStatusEvent(Base):
+    """One status transition of an order; rows are only ever inserted"""
+    __tablename__ = 'order_status_events'
+    __table_args__ = (
+        # An order's history in order, and "orders that became <status> in a period"
+        Index('ix_order_status_events_order_id_ts', 'order_id', 'ts'),
+        Index('ix_order_status_events_status_ts', 'status', 'ts'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    order_id = Column(Integer, ForeignKey('orders.id'), nullable=False)
+    status = Column(String(50), nullable=False)
+    ts = Column(DateTime, nullable=False, default=utcnow)
+    updated_by = Column(String(100))
+    note = Column(Text)
+
+    order = relationship("Order", back_populates="status_events")
+
+    @classmethod
+    def from_dict(cls, entry):
+        """An event from a ``statusHistory`` entry"""
+        if not isinstance(entry, dict):
+            raise ValueError('statusHistory entries must be objects')
+        ts = datetime.fromisoformat(entry['timestamp']) if entry.get('timestamp') else utcnow()
+        if ts.tzinfo is not None:
+            ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+        return cls(
+            status=entry['status'],
+            ts=ts,
+            updated_by=entry.get('updatedBy'),
+            note=entry.get('note'),
+        )
+
+    def to_dict(self):
+        return {
+            'status': self.status,
+            'timestamp': self.ts.isoformat() if self.ts else None,
+            'updatedBy': self.updated_by,
+            'note': self.note
+        }
+
+
+# Everything Order.to_dict() reads, loaded up front: one query for the
+# orders and their customers, one for the items and their products and
+# one for the status events, however many orders are serialized.
+ORDER_LOAD_OPTIONS = (
+    joinedload(Order.customer_info),
+    selectinload(Order.order_items).joinedload(OrderItem.product),
+    selectinload(Order.status_events),
+)
@@ -1,8 +1,18 @@
-from sqlalchemy import Column, Integer, String, Text, Numeric
-from .meta import Base
+from sqlalchemy import CheckConstraint, Column, Integer, String, Text, Numeric, DateTime, Index, DDL, event, text
+from .meta import Base, utcnow
 
 class Product(Base):
     __tablename__ = 'products'
+    __table_args__ = (
+        # Composite indexes backing the keyset sort orders of GET /api/products
+        Index('ix_products_price_id', 'price', 'id'),
+        Index('ix_products_title_id', 'title', 'id'),
+        Index('ix_products_stock_id', 'stock', 'id'),
+        # Upsert target of the bulk importer; NULL SKUs do not conflict
+        Index('ix_products_sku', 'sku', unique=True),
+        # Checkout reserves stock with a conditional UPDATE; never below zero
+        CheckConstraint('stock >= 0', name='stock_nonnegative'),
+    )
     
     id = Column(Integer, primary_key=True)
     title = Column(String(255), nullable=False)
@@ -10,6 +20,12 @@ class Product(Base):
     price = Column(Numeric(12, 3), nullable=False)
     stock = Column(Integer, default=0)
     image = Column(String(1000))
+    sku = Column(String(64))  # external (supplier) identifier
+    # Validators for conditional GET: version is incremented by every UPDATE
+    # issued through SQLAlchemy (ORM or Core), updated_at is naive UTC.
+    version = Column(Integer, nullable=False, default=1, server_default=text('1'),
+                     onupdate=text('products.version + 1'))
+    updated_at = Column(DateTime, nullable=False, default=utcnow, onupdate=utcnow)
     
     def to_dict(self):
         return {
@@ -18,5 +34,49 @@ class Product(Base):
             'description': self.description,
             'price': float(self.price) if self.price is not None else 0,
             'stock': self.stock,
-            'image': self.image
-        }
\ No newline at end of file
+            'image': self.image,
+            'sku': self.sku
+        }
+
+
+# Full-text search index (see product_api/search.py).
+#
+# PostgreSQL keeps a generated tsvector column with a GIN index, so the
+# database maintains it on every INSERT/UPDATE. SQLite uses an external
+# content FTS5 table kept in sync by triggers. Either way every write path
+# (ORM views, Core statements, raw SQL) updates the index in the same
+# transaction. The same statements are applied to existing databases by the
+# 5d2b8e0c9f13 migration (update trigger condition: b5d83a0f6e21).
+POSTGRESQL_SEARCH_DDL = [
+    "ALTER TABLE products ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')) STORED",
+    "CREATE INDEX ix_products_search_vector ON products USING GIN (search_vector)",
+]
+
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE products_fts USING fts5("
+    "title, description, content='products', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER products_fts_ai AFTER INSERT ON products BEGIN "
+    "INSERT INTO products_fts(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER products_fts_ad AFTER DELETE ON products BEGIN "
+    "INSERT INTO products_fts(products_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER products_fts_au AFTER UPDATE OF title, description ON products "
+    "WHEN old.title IS NOT new.title OR old.description IS NOT new.description BEGIN "
+    "INSERT INTO products_fts(products_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO products_fts(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+]
+
+for statement in POSTGRESQL_SEARCH_DDL:
+    event.listen(Product.__table__, 'after_create',
+                 DDL(statement).execute_if(dialect='postgresql'))
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(Product.__table__, 'after_create',
+                 DDL(statement).execute_if(dialect='sqlite'))
+event.listen(Product.__table__, 'before_drop',
+             DDL("DROP TABLE IF EXISTS products_fts").execute_if(dialect='sqlite'))
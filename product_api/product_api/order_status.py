@@ -0,0 +1,163 @@
+"""Order statuses, the transitions allowed between them, and batch operations
+
+Orders move forward through ``FLOW`` (skipping steps is allowed) and can be
+cancelled until they are delivered; ``completed`` and ``cancelled`` are
+final. Cancelling puts the order's items back in stock, once: see
+:func:`product_api.inventory.restore_stock`.
+"""
+from sqlalchemy import insert, select, update
+
+from .inventory import restore_stock
+from .models import Order, OrderStatusEvent
+from .models.meta import utcnow
+
+FLOW = ('pending', 'confirmed', 'preparing', 'shipping', 'delivered', 'completed')
+CANCELLED = 'cancelled'
+STATUSES = FLOW + (CANCELLED,)
+CANCELLABLE = ('pending', 'confirmed', 'preparing', 'shipping')
+
+MAX_BATCH_SIZE = 1000
+
+# Per-order outcomes of a batch
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+NOT_FOUND = 'not_found'
+INVALID_TRANSITION = 'invalid_transition'
+CONFLICT = 'conflict'
+RESTORED = 'restored'
+ALREADY_RESTORED = 'already_restored'
+NOT_CANCELLED = 'not_cancelled'
+
+
+def allowed_transition(current, target):
+    if target == CANCELLED:
+        return current in CANCELLABLE
+    return current in FLOW and target in FLOW and FLOW.index(target) > FLOW.index(current)
+
+
+def clean_order_ids(value):
+    """Distinct integer order ids from a request's ``ids``, in the given order"""
+    if not isinstance(value, list) or not value:
+        raise ValueError('ids must be a non-empty list of order ids')
+    if len(value) > MAX_BATCH_SIZE:
+        raise ValueError(f'At most {MAX_BATCH_SIZE} orders can be updated at once')
+    order_ids = []
+    for order_id in value:
+        try:
+            if isinstance(order_id, bool) or not isinstance(order_id, (int, str)):
+                raise ValueError
+            order_ids.append(int(order_id))
+        except ValueError:
+            raise ValueError(f'Invalid order id: {order_id!r}')
+    return list(dict.fromkeys(order_ids))
+
+
+def _move(dbsession, order_ids, source, target):
+    """Set ``target`` on those of ``order_ids`` still in ``source``; their ids"""
+    statement = update(Order) \
+        .where(Order.id.in_(order_ids), Order.status == source) \
+        .values(status=target) \
+        .execution_options(synchronize_session='fetch')
+    if dbsession.get_bind().dialect.update_returning:
+        return set(dbsession.execute(statement.returning(Order.id)).scalars())
+    dbsession.execute(statement)
+    return set(order_ids)  # locked by the SELECT ... FOR UPDATE
+
+
+class BatchResult:
+    def __init__(self):
+        self.results = []
+        self.restocked_product_ids = []
+
+    def count(self, result):
+        return sum(1 for entry in self.results if entry['result'] == result)
+
+    @property
+    def updated(self):
+        return self.count(UPDATED)
+
+    def add(self, order_id, result, previous=None):
+        entry = {'id': order_id, 'result': result}
+        if previous is not None:
+            entry['from'] = previous
+        self.results.append(entry)
+
+
+def transition_orders(dbsession, order_ids, status, note=None, updated_by='admin'):
+    """Move ``order_ids`` to ``status`` with set-based statements
+
+    One SELECT reads the current statuses, one UPDATE per distinct current
+    status applies the allowed transitions (guarded on that status, so a
+    concurrent change is reported as a conflict rather than overwritten),
+    one multi-row INSERT records the events and, for cancellations, one
+    aggregated UPDATE restores stock. Returns a :class:`BatchResult`.
+    """
+    if status not in STATUSES:
+        raise ValueError(f"status must be one of: {', '.join(STATUSES)}")
+    current = dict(dbsession.execute(
+        select(Order.id, Order.status).where(Order.id.in_(order_ids)).with_for_update()
+    ).all())
+
+    by_source = {}
+    for order_id in order_ids:
+        source = current.get(order_id)
+        if source is not None and allowed_transition(source, status):
+            by_source.setdefault(source, []).append(order_id)
+    moved = set()
+    for source, ids in by_source.items():
+        moved |= _move(dbsession, ids, source, status)
+
+    batch = BatchResult()
+    for order_id in order_ids:
+        source = current.get(order_id)
+        if source is None:
+            batch.add(order_id, NOT_FOUND)
+        elif order_id in moved:
+            batch.add(order_id, UPDATED, source)
+        elif source == status:
+            batch.add(order_id, UNCHANGED, source)
+        elif allowed_transition(source, status):
+            batch.add(order_id, CONFLICT, source)
+        else:
+            batch.add(order_id, INVALID_TRANSITION, source)
+
+    if moved:
+        now = utcnow()
+        updated = [order_id for order_id in order_ids if order_id in moved]
+        dbsession.execute(insert(OrderStatusEvent), [
+            {'order_id': order_id, 'status': status, 'ts': now, 'updated_by': updated_by, 'note': note}
+            for order_id in updated
+        ])
+        if status == CANCELLED:
+            _, products = restore_stock(dbsession, updated)
+            batch.restocked_product_ids = [product.id for product in products]
+    return batch
+
+
+def restore_cancelled_orders(dbsession, order_ids):
+    """Put the items of cancelled ``order_ids`` back in stock, once each
+
+    Returns a :class:`BatchResult`: ``restored``, ``already_restored``,
+    ``not_cancelled`` or ``not_found`` per order.
+    """
+    current = {row.id: row for row in dbsession.execute(
+        select(Order.id, Order.status, Order.stock_restored).where(Order.id.in_(order_ids))
+    )}
+    eligible = [order_id for order_id in order_ids
+                if order_id in current and current[order_id].status == CANCELLED]
+    restored, products = restore_stock(dbsession, eligible)
+    restored = set(restored)
+
+    batch = BatchResult()
+    batch.restocked_product_ids = [product.id for product in products]
+    for order_id in order_ids:
+        row = current.get(order_id)
+        if row is None:
+            batch.add(order_id, NOT_FOUND)
+        elif order_id in restored:
+            batch.add(order_id, RESTORED)
+        elif row.status == CANCELLED:
+            batch.add(order_id, ALREADY_RESTORED)
+        else:
+            batch.add(order_id, NOT_CANCELLED, row.status)
+    return batch
@@ -0,0 +1,206 @@
+"""Keyset (cursor) pagination helpers shared by the list endpoints"""
+import base64
+import json
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import and_, or_
+
+from .models.meta import byte_order
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class InvalidPageRequest(ValueError):
+    """Raised when limit/cursor/sort parameters cannot be used"""
+
+
+def parse_limit(value, default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    """Parse the ``limit`` query parameter, clamped to ``maximum``"""
+    if value in (None, ''):
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise InvalidPageRequest('limit must be an integer')
+    if limit < 1:
+        raise InvalidPageRequest('limit must be a positive integer')
+    return min(limit, maximum)
+
+
+def parse_sort(value, allowed, default):
+    """Parse ``sort=<key>`` / ``sort=-<key>`` into ``(key, descending)``"""
+    value = (value or default).strip()
+    descending = value.startswith('-')
+    key = value.lstrip('-')
+    if key not in allowed:
+        raise InvalidPageRequest(
+            f"sort must be one of: {', '.join(sorted(allowed))}")
+    return key, descending
+
+
+def parse_decimal(value, name):
+    """Parse a numeric filter parameter such as ``min_price``"""
+    try:
+        number = Decimal(value)
+    except (InvalidOperation, TypeError):
+        raise InvalidPageRequest(f'{name} must be a number')
+    if not number.is_finite():
+        raise InvalidPageRequest(f'{name} must be a number')
+    return number
+
+
+def parse_datetime(value, name, end_of_day=False):
+    """Parse an ISO date or datetime filter parameter
+
+    A bare date is midnight, or with ``end_of_day`` midnight of the next
+    day, so that ``to=2026-10-18`` can be applied as ``< 2026-10-19``.
+    Returns ``(value, is_date)``.
+    """
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise InvalidPageRequest(f'{name} must be an ISO date or datetime')
+    is_date = len(value) == 10
+    if is_date and end_of_day:
+        parsed += timedelta(days=1)
+    # Timestamps are stored naive; compare in the wall time the client sent
+    return parsed.replace(tzinfo=None), is_date
+
+
+def _encode_value(value):
+    if isinstance(value, Decimal):
+        return {'d': str(value)}
+    if hasattr(value, 'isoformat'):
+        return {'t': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    """Invert :func:`_encode_value`; raises ``ValueError`` for anything it cannot produce"""
+    if isinstance(value, dict):
+        (tag, text), = value.items()
+        if not isinstance(text, str):
+            raise ValueError(text)
+        if tag == 'd':
+            number = Decimal(text)
+            if not number.is_finite():
+                raise ValueError(text)
+            return number
+        if tag == 't':
+            return datetime.fromisoformat(text)
+        raise ValueError(tag)
+    if isinstance(value, (list, bool)):
+        raise ValueError(value)
+    return value
+
+
+# Values of a numeric column not (yet) loaded from the database may be
+# plain ints or floats; their cursors are just as valid
+_CURSOR_TYPES = {Decimal: (Decimal, int, float), float: (float, int)}
+
+
+def _cursor_types(column):
+    """Types a cursor value for ``column`` may have, or None if unknown"""
+    try:
+        python_type = column.type.python_type
+    except (AttributeError, NotImplementedError):
+        return None
+    return _CURSOR_TYPES.get(python_type, python_type)
+
+
+def encode_cursor(sort_key, sort_value, row_id):
+    """Build an opaque cursor pointing just after ``(sort_value, row_id)``"""
+    payload = json.dumps([sort_key, _encode_value(sort_value), row_id],
+                         separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort_key, sort_column=None):
+    """Decode a cursor produced by :func:`encode_cursor`
+
+    Returns ``(sort_value, row_id)``. A cursor issued for a different sort
+    order is rejected, since its position means nothing in this ordering,
+    as is one whose value is not of ``sort_column``'s type.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key, value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(row_id, int) or isinstance(row_id, bool):
+            raise ValueError(row_id)
+        value = _decode_value(value)
+    except (ValueError, TypeError, UnicodeError, ArithmeticError):
+        raise InvalidPageRequest('Invalid cursor')
+    if key != sort_key:
+        raise InvalidPageRequest('Cursor does not match the requested sort order')
+    types = None if sort_column is None else _cursor_types(sort_column)
+    if value is not None and types is not None and not isinstance(value, types):
+        raise InvalidPageRequest('Invalid cursor')
+    return value, row_id
+
+
+def keyset_after(sort_column, id_column, sort_value, row_id, descending=False):
+    """Criterion selecting rows strictly after ``(sort_value, row_id)``
+
+    Written as ``col > v OR (col = v AND id > last_id)`` rather than a row
+    value comparison so it works on every backend and still lets the
+    ``(sort_column, id)`` index drive the scan.
+    """
+    if sort_column is id_column:
+        return id_column < row_id if descending else id_column > row_id
+    if descending:
+        return or_(sort_column < sort_value,
+                   and_(sort_column == sort_value, id_column < row_id))
+    return or_(sort_column > sort_value,
+               and_(sort_column == sort_value, id_column > row_id))
+
+
+def prefix_criteria(column, prefix):
+    """Criteria selecting rows whose ``column`` starts with ``prefix``
+
+    The range ``prefix <= column < successor`` compares in
+    :class:`~product_api.models.meta.byte_order`, the only order in which it
+    holds exactly the prefix matches, and is served by an index on that
+    expression; the ``LIKE`` only re-checks the rows the range yields.
+    """
+    ordered = byte_order(column)
+    criteria = [ordered >= prefix, column.startswith(prefix, autoescape=True)]
+    last = ord(prefix[-1])
+    if last < sys.maxunicode:
+        criteria.append(ordered < prefix[:-1] + chr(last + 1))
+    return criteria
+
+
+def order_by_keyset(sort_column, id_column, descending=False):
+    """ORDER BY clauses matching :func:`keyset_after`"""
+    if sort_column is id_column:
+        return [id_column.desc() if descending else id_column.asc()]
+    if descending:
+        return [sort_column.desc(), id_column.desc()]
+    return [sort_column.asc(), id_column.asc()]
+
+
+def paginate(query, sort_key, sort_column, id_column, limit, cursor=None,
+             descending=False):
+    """Apply a keyset page to ``query``
+
+    Returns ``(rows, next_cursor)``; ``next_cursor`` is ``None`` on the last
+    page. One extra row is fetched to detect whether another page exists.
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor, sort_key, sort_column)
+        query = query.filter(keyset_after(sort_column, id_column, sort_value,
+                                          row_id, descending))
+    rows = query.order_by(*order_by_keyset(sort_column, id_column, descending)) \
+                .limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort_key,
+                                    getattr(last, sort_column.key),
+                                    getattr(last, id_column.key))
+    return rows, next_cursor
@@ -4,6 +4,12 @@ def includeme(config):
     
     # Product routes
     config.add_route('products', '/api/products')
+    # Literal sub-paths must be registered before /api/products/{id}
+    config.add_route('product_search', '/api/products/search')
+    config.add_route('product_suggest', '/api/products/suggest')
+    config.add_route('product_changes', '/api/products/changes')
+    config.add_route('product_batch', '/api/products/batch')
+    config.add_route('product_import', '/api/products/import')
     config.add_route('product', '/api/products/{id}')
     
     # Customer Info routes
@@ -12,12 +18,24 @@ def includeme(config):
     
     # Order routes
     config.add_route('orders', '/api/orders')
+    config.add_route('order_track', '/api/orders/track')
+    # A literal ':' would start a placeholder; this one only matches itself
+    config.add_route('order_status_batch', '/api/orders/{action:status:batch}')
+    config.add_route('order_restore_stock_batch', '/api/orders/{action:restore-stock:batch}')
     config.add_route('order', '/api/orders/{id}')
     config.add_route('order_by_order_id', '/api/orders/order-id/{order_id}')  # New route
     config.add_route('order_status', '/api/orders/{id}/status')
+    config.add_route('order_restore_stock', '/api/orders/{id}/restore-stock')
+    
+    # Server-priced checkout: one request, one transaction
+    config.add_route('checkout', '/api/checkout')
+    
+    # Streaming exports: /api/export/products|orders|customers
+    config.add_route('export', '/api/export/{kind}')
     
     # Admin routes
     config.add_route('admin_login', '/api/admin/login')
     config.add_route('admin_logout', '/api/admin/logout')
     config.add_route('admin_create', '/api/admin/create')
-    config.add_route('admin_profile', '/api/admin/profile')
\ No newline at end of file
+    config.add_route('admin_profile', '/api/admin/profile')
+    config.add_route('admin_product_cache', '/api/admin/product-cache')
\ No newline at end of file
@@ -0,0 +1,56 @@
+import argparse
+import json
+import sys
+
+from pyramid.paster import bootstrap, setup_logging
+
+from .. import commit_hooks, customers
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Merge customers sharing an email into one row, repointing their orders',
+    )
+    parser.add_argument(
+        'config_uri',
+        help='Configuration file, e.g., development.ini',
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=customers.DEFAULT_MERGE_BATCH_SIZE,
+        help='Emails merged per transaction',
+    )
+    parser.add_argument(
+        '--json',
+        action='store_true',
+        help='Print the report as JSON',
+    )
+    return parser.parse_args(argv[1:])
+
+
+def main(argv=sys.argv):
+    args = parse_args(argv)
+    setup_logging(args.config_uri)
+    env = bootstrap(args.config_uri)
+
+    request = env['request']
+    report = customers.MergeReport()
+    after = None
+    try:
+        # One transaction per batch, so this can run on a live database
+        # before the migration that adds the unique email key
+        while True:
+            with request.tm:
+                commit_hooks.mark_changed(request)
+                after = customers.merge_batch(request.dbsession, report, args.batch_size, after)
+            if after is None:
+                break
+    finally:
+        env['closer']()
+
+    if args.json:
+        print(json.dumps(report.to_dict()))
+    else:
+        print(f'Merged {report.merged} duplicate customers into {report.groups}, '
+              f'repointing {report.orders_repointed} orders')
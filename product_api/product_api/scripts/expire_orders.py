@@ -0,0 +1,74 @@
+import argparse
+import json
+import sys
+
+from pyramid.paster import bootstrap, setup_logging
+
+from .. import commit_hooks, expiry
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Cancel pending orders past their TTL and release their stock',
+    )
+    parser.add_argument(
+        'config_uri',
+        help='Configuration file, e.g., development.ini',
+    )
+    parser.add_argument(
+        '--ttl-minutes',
+        type=float,
+        help='Override order_expiry.ttl_minutes',
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        help='Override order_expiry.batch_size (orders per transaction)',
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Only report what would be cancelled and released',
+    )
+    parser.add_argument(
+        '--json',
+        action='store_true',
+        help='Print the report as JSON, for metrics collection',
+    )
+    return parser.parse_args(argv[1:])
+
+
+def main(argv=sys.argv):
+    args = parse_args(argv)
+    setup_logging(args.config_uri)
+    env = bootstrap(args.config_uri)
+    settings = env['registry'].settings
+
+    ttl_minutes = args.ttl_minutes
+    if ttl_minutes is None:
+        ttl_minutes = float(settings.get('order_expiry.ttl_minutes', expiry.DEFAULT_TTL_MINUTES))
+    batch_size = args.batch_size or int(settings.get('order_expiry.batch_size', expiry.DEFAULT_BATCH_SIZE))
+
+    request = env['request']
+    after = None
+    try:
+        with request.tm:
+            now = expiry.database_now(request.dbsession)
+        report = expiry.ExpiryReport(expiry.cutoff_for(ttl_minutes, now), dry_run=args.dry_run)
+        # One transaction per batch keeps row locks short during a sale
+        while True:
+            with request.tm:
+                if not args.dry_run:
+                    commit_hooks.mark_changed(request)
+                after = expiry.expire_batch(request.dbsession, report, batch_size, after)
+            if after is None:
+                break
+    finally:
+        env['closer']()
+
+    if args.json:
+        print(json.dumps(report.to_dict()))
+    else:
+        verb = 'would be' if args.dry_run else 'were'
+        print(f'{report.orders} pending orders created before {report.cutoff.isoformat()} {verb} cancelled, '
+              f'releasing {report.units} units of {len(report.product_ids)} products')
@@ -0,0 +1,41 @@
+import argparse
+import sys
+
+from pyramid.paster import bootstrap, setup_logging
+
+from .. import export
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Stream products, orders or customers to a file',
+    )
+    parser.add_argument(
+        'config_uri',
+        help='Configuration file, e.g., development.ini',
+    )
+    parser.add_argument('kind', choices=export.EXPORTS)
+    parser.add_argument('--format', choices=export.FORMATS, default='ndjson')
+    parser.add_argument('--gzip', action='store_true', help='gzip the output')
+    parser.add_argument(
+        '-o', '--output',
+        default='-',
+        help='Output file (default: stdout)',
+    )
+    return parser.parse_args(argv[1:])
+
+
+def main(argv=sys.argv):
+    args = parse_args(argv)
+    setup_logging(args.config_uri)
+    env = bootstrap(args.config_uri)
+
+    output = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    try:
+        for chunk in export.stream_export(env['registry']['dbsession_factory'],
+                                          args.kind, args.format, gzip=args.gzip):
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+        env['closer']()
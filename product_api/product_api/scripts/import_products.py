@@ -0,0 +1,64 @@
+import argparse
+import sys
+import time
+
+from pyramid.paster import bootstrap, setup_logging
+
+from .. import commit_hooks, importer
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Bulk create or update products (upserting on sku)',
+    )
+    parser.add_argument(
+        'config_uri',
+        help='Configuration file, e.g., development.ini',
+    )
+    parser.add_argument(
+        'path',
+        help='CSV or NDJSON file to import, or - for stdin',
+    )
+    parser.add_argument(
+        '--format',
+        choices=importer.FORMATS,
+        help='Input format (default: from the file extension)',
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=importer.DEFAULT_BATCH_SIZE,
+        help='Rows per INSERT executemany',
+    )
+    return parser.parse_args(argv[1:])
+
+
+def main(argv=sys.argv):
+    args = parse_args(argv)
+    fmt = args.format or importer.format_for(filename=args.path)
+    if fmt is None:
+        sys.exit('Cannot tell the format from the file name; pass --format')
+    setup_logging(args.config_uri)
+    env = bootstrap(args.config_uri)
+
+    stream = sys.stdin.buffer if args.path == '-' else open(args.path, 'rb')
+    started = time.perf_counter()
+    try:
+        with env['request'].tm:
+            commit_hooks.mark_changed(env['request'])
+            report = importer.import_products(
+                env['request'].dbsession,
+                importer.iter_records(stream, fmt),
+                batch_size=args.batch_size,
+            )
+    finally:
+        stream.close()
+        env['closer']()
+    elapsed = time.perf_counter() - started
+
+    for error in report.errors:
+        print(f"row {error['row']}: {error['error']}", file=sys.stderr)
+    print(f'{report.imported} rows imported, {report.failed} rejected '
+          f'in {elapsed:.1f}s ({report.imported / max(elapsed, 1e-9):.0f} rows/s)')
+    if report.failed:
+        sys.exit(1)
@@ -0,0 +1,48 @@
+import argparse
+import sys
+
+from pyramid.paster import bootstrap, setup_logging
+from pyramid.settings import asbool
+
+from .. import changes, commit_hooks, idempotency, security
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Compact and expire the catalog change log, expired idempotency keys and token revocations',
+    )
+    parser.add_argument(
+        'config_uri',
+        help='Configuration file, e.g., development.ini',
+    )
+    parser.add_argument(
+        '--retention-days',
+        type=float,
+        help='Override catalog_changes.retention_days',
+    )
+    return parser.parse_args(argv[1:])
+
+
+def main(argv=sys.argv):
+    args = parse_args(argv)
+    setup_logging(args.config_uri)
+    env = bootstrap(args.config_uri)
+    settings = env['registry'].settings
+
+    retention_days = args.retention_days
+    if retention_days is None:
+        retention_days = float(settings.get('catalog_changes.retention_days',
+                                            changes.DEFAULT_RETENTION_DAYS))
+    with env['request'].tm:
+        commit_hooks.mark_changed(env['request'])
+        dbsession = env['request'].dbsession
+        compacted = 0
+        if asbool(settings.get('catalog_changes.compact', True)):
+            compacted = changes.compact(dbsession)
+        expired = changes.expire(dbsession, retention_days=retention_days)
+        keys = idempotency.purge_expired(dbsession)
+        revocations = security.purge_expired_revocations(dbsession)
+    print(f'catalog_changes: {compacted} superseded and {expired} expired entries removed')
+    print(f'idempotency_keys: {keys} expired responses removed')
+    print(f'revoked_tokens: {revocations} expired revocations removed')
+    env['closer']()
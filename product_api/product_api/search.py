@@ -0,0 +1,191 @@
+"""Ranked full-text search over product title and description
+
+The index itself is declared next to the model in ``models/product.py``:
+a generated ``tsvector`` column with a GIN index on PostgreSQL and an FTS5
+table maintained by triggers on SQLite. This module only builds queries.
+"""
+import re
+
+from sqlalchemy import column, func, select, table, text
+
+from .models import Product
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_TERMS = 8
+
+# Upper bound on the matches scored for one query. Candidates are read in
+# index (or id) order with a plain LIMIT, so a query costs the same whether its terms
+# match a hundred rows or most of the catalog. Up to MAX_CANDIDATES matches
+# every one is scored and the ranking is exact; past that (frequent terms)
+# it is the best of the first MAX_CANDIDATES, title matches first.
+MAX_CANDIDATES = 200
+
+# Relative weight of a term hit in the title versus the description
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+# BM25 term-frequency saturation and length normalisation parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+AVG_TITLE_TERMS = 4.0
+AVG_DESCRIPTION_TERMS = 20.0
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text_value):
+    """Every lowercase word token of ``text_value``"""
+    return _TERM_RE.findall((text_value or '').lower())
+
+
+def search_terms(query):
+    """Split free text into at most ``MAX_TERMS`` lowercase word tokens"""
+    return tokenize(query)[:MAX_TERMS]
+
+
+def _bm25_field(terms, tokens, avg_length):
+    length_norm = 1 - BM25_B + BM25_B * len(tokens) / avg_length
+    score = 0.0
+    for term in terms:
+        frequency = tokens.count(term)
+        if frequency:
+            score += frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * length_norm)
+    return score
+
+
+def score_document(terms, title, description):
+    """BM25-style score of one product for ``terms``
+
+    The IDF factor is left out: candidates come from an AND query, so every
+    one of them contains every term and IDF would scale them all alike.
+    """
+    return (
+        TITLE_WEIGHT * _bm25_field(terms, tokenize(title), AVG_TITLE_TERMS)
+        + DESCRIPTION_WEIGHT * _bm25_field(terms, tokenize(description),
+                                           AVG_DESCRIPTION_TERMS)
+    )
+
+
+def _fts5_match_expression(terms):
+    # Quote every token so user input can never be parsed as FTS5 syntax
+    # (column filters, NEAR, boolean operators); tokens are implicitly ANDed.
+    return ' '.join('"%s"' % term.replace('"', '""') for term in terms)
+
+
+def _fts5_rowids(dbsession, match, limit):
+    # No ORDER BY: FTS5 stops reading the doclists after ``limit`` rowids
+    return dbsession.execute(
+        text("SELECT rowid FROM products_fts WHERE products_fts MATCH :match LIMIT :limit"),
+        {'match': match, 'limit': limit},
+    ).scalars().all()
+
+
+def _search_sqlite(dbsession, terms, limit):
+    """FTS5 finds bounded candidates, scoring happens here
+
+    FTS5's built-in bm25() computes IDF by walking the full doclist of every
+    phrase, so ``ORDER BY bm25()`` costs hundreds of milliseconds for a term
+    present in most of a million-row catalog no matter the LIMIT. Titles
+    are searched first (the strongest matches, scored on the title alone)
+    and the whole document only when titles cannot fill the page.
+    """
+    match = _fts5_match_expression(terms)
+    title_ids = _fts5_rowids(dbsession, '{title} : (%s)' % match, MAX_CANDIDATES)
+    scored = []
+    if title_ids:
+        rows = dbsession.execute(
+            select(Product.id, Product.title).where(Product.id.in_(title_ids))
+        ).all()
+        scored = [(TITLE_WEIGHT * _bm25_field(terms, tokenize(row.title), AVG_TITLE_TERMS), row.id)
+                  for row in rows]
+    if len(scored) < limit:
+        # Too few titles contain every term: rank the remaining matches on
+        # the whole document
+        seen = set(title_ids)
+        other_ids = [rowid for rowid in _fts5_rowids(dbsession, match, MAX_CANDIDATES)
+                     if rowid not in seen]
+        if other_ids:
+            rows = dbsession.execute(
+                select(Product.id, Product.title, Product.description)
+                .where(Product.id.in_(other_ids))
+            ).all()
+            scored += [(score_document(terms, row.title, row.description), row.id)
+                       for row in rows]
+    if not scored:
+        return []
+
+    ranked = sorted(scored, key=lambda item: (-item[0], item[1]))[:limit]
+    products = {
+        product.id: product
+        for product in dbsession.query(Product).filter(
+            Product.id.in_([product_id for _, product_id in ranked]))
+    }
+    return [(products[product_id], score) for score, product_id in ranked
+            if product_id in products]
+
+
+# Products in id order checked for matches before the GIN index is used. A
+# GIN bitmap scan collects every match before LIMIT applies (~25 ms for two
+# terms each in a tenth of a million-row catalog); testing the tsvector of
+# this many rows takes ~3 ms and fills the page whenever terms are frequent.
+PROBE_ROWS = 5000
+
+_products = table('products', column('id'), column('search_vector'))
+
+
+def _tsvector_candidates(dbsession, source, tsquery):
+    """``{id: rank}`` of at most MAX_CANDIDATES unordered matches in ``source``"""
+    vector = source.c.search_vector
+    return dict(dbsession.execute(
+        select(source.c.id, func.ts_rank_cd(vector, tsquery))
+        .where(vector.op('@@')(tsquery))
+        .limit(MAX_CANDIDATES)
+    ).all())
+
+
+def _search_postgresql(dbsession, terms, limit):
+    """A bounded probe for frequent terms, the GIN index for the rest
+
+    Neither step orders by ts_rank_cd(), which would read and rank every
+    match: each stops after MAX_CANDIDATES and only those are ranked.
+    """
+    tsquery = func.plainto_tsquery('simple', ' '.join(terms))
+    window = (select(_products.c.id, _products.c.search_vector)
+              .order_by(_products.c.id).limit(PROBE_ROWS).subquery())
+    ranks = _tsvector_candidates(dbsession, window, tsquery)
+    if len(ranks) < limit:
+        # Too rare to fill the page from the probe: few matches, a cheap index scan
+        ranks = _tsvector_candidates(dbsession, _products, tsquery)
+    if not ranks:
+        return []
+
+    ranked = sorted(ranks, key=lambda product_id: (-ranks[product_id], product_id))[:limit]
+    products = {product.id: product
+                for product in dbsession.query(Product).filter(Product.id.in_(ranked))}
+    return [(products[product_id], ranks[product_id]) for product_id in ranked
+            if product_id in products]
+
+
+def _search_fallback(dbsession, terms, limit):
+    """Unranked substring match for databases without a full-text index"""
+    query = dbsession.query(Product)
+    for term in terms:
+        pattern = f'%{term}%'
+        query = query.filter(
+            Product.title.ilike(pattern) | Product.description.ilike(pattern))
+    return [(product, 0.0) for product in query.order_by(Product.id).limit(limit)]
+
+
+def search_products(dbsession, query, limit=DEFAULT_LIMIT):
+    """Return ``[(product, rank), ...]`` best match first"""
+    terms = search_terms(query)
+    if not terms:
+        return []
+    dialect = dbsession.get_bind().dialect.name
+    if dialect == 'sqlite':
+        return _search_sqlite(dbsession, terms, limit)
+    if dialect == 'postgresql':
+        return [(product, float(rank)) for product, rank in
+                _search_postgresql(dbsession, terms, limit)]
+    return _search_fallback(dbsession, terms, limit)
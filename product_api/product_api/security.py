@@ -0,0 +1,398 @@
+"""Bearer-token security policy for the admin API
+
+Views that change the catalog, orders or customers, or that list them, are
+registered with ``permission=ADMIN``. The policy takes the
+``Authorization: Bearer <jwt>`` header, verifies the HS256 token once per
+request and grants every permission to an active admin; the storefront
+views carry no permission and stay public.
+
+Verification is cached per process so a hit costs a hash and two dict
+lookups rather than an HMAC check, JSON decoding and an ``admins`` query:
+
+* decoded claims by SHA-256 digest of the token, for
+  ``auth.claims_cache_ttl`` seconds and never past the token's ``exp``;
+* active admins by id, for ``auth.admin_cache_ttl`` seconds. Any ORM
+  update or delete of an ``Admin`` (deactivation, a new password) drops
+  its entry when flushed and again after the commit. Other processes
+  notice within the TTL.
+
+Logging out revokes the token's ``jti`` until its ``exp``. Each process
+mirrors the unexpired ``revoked_tokens`` rows in memory and checks every
+request against that set, so a request queries nothing for revocation. It
+reads only the rows revoked since its last look, at most every
+``auth.revocation_refresh_interval`` seconds. A token is refused at once by
+the process that revoked it, and by the others within that interval.
+Tokens issued without a ``jti`` cannot be revoked and simply expire.
+
+``auth.jwt_secret``, or the ``PRODUCT_API_JWT_SECRET`` environment variable
+when set, signs and verifies the tokens. The application refuses to start
+without one of at least 32 characters.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta, timezone
+
+import jwt
+from pyramid.exceptions import ConfigurationError
+from pyramid.security import Allowed, Denied
+from pyramid.response import Response
+from sqlalchemy import delete, event, select
+from sqlalchemy.orm import Session, object_session
+
+from . import commit_hooks
+from .models import Admin, RevokedToken
+from .models.meta import utcnow
+
+# Permission of the admin views
+ADMIN = 'admin'
+
+# Only verifies tokens for views called outside the application (unit tests);
+# includeme refuses to run with it
+DEFAULT_JWT_SECRET = 'your-secret-key-here'
+JWT_SECRET_ENVIRON = 'PRODUCT_API_JWT_SECRET'
+MIN_JWT_SECRET_LENGTH = 32
+# Values shipped in this repository, never acceptable as a real secret
+PLACEHOLDER_JWT_SECRETS = {DEFAULT_JWT_SECRET, 'change-me'}
+JWT_ALGORITHM = 'HS256'
+DEFAULT_CLAIMS_CACHE_TTL = 300
+DEFAULT_ADMIN_CACHE_TTL = 60
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_REVOCATION_REFRESH_INTERVAL = 5
+# Re-read this far behind the newest revocation already loaded, for
+# transactions that committed after a refresh that had passed their revoked_at
+REVOCATION_OVERLAP = timedelta(seconds=60)
+
+IDENTITY_KEY = 'product_api.identity'
+CHANGED_ADMINS_KEY = 'product_api.changed_admins'
+
+AdminIdentity = namedtuple('AdminIdentity', ['id', 'username'])
+
+
+class AuthenticationError(Exception):
+    """The request carries no usable admin token"""
+
+
+class TTLCache:
+    """Size-bounded mapping whose entries expire ``ttl`` seconds after being put"""
+
+    def __init__(self, ttl, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def get(self, key):
+        entry = self._items.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            with self._lock:
+                self._items.pop(key, None)
+            return None
+        return entry[1]
+
+    def put(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._items[key] = (time.monotonic() + ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def __len__(self):
+        return len(self._items)
+
+
+def _unix_time(utc_datetime):
+    return utc_datetime.replace(tzinfo=timezone.utc).timestamp()
+
+
+class RevocationList:
+    """Revoked token ids that have not expired yet, mirrored from ``revoked_tokens``"""
+
+    def __init__(self, refresh_interval=DEFAULT_REVOCATION_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._revoked = {}  # jti -> exp, Unix time
+        self._since = None  # newest revoked_at loaded
+        self._next_refresh = 0.0
+
+    def add(self, jti, exp):
+        with self._lock:
+            self._revoked[jti] = exp
+
+    def is_revoked(self, dbsession, jti):
+        if time.monotonic() >= self._next_refresh:
+            with self._refresh_lock:
+                if time.monotonic() >= self._next_refresh:
+                    self.refresh(dbsession)
+        return jti in self._revoked
+
+    def refresh(self, dbsession):
+        """Load the rows revoked since the last refresh and drop expired ids"""
+        query = select(RevokedToken.jti, RevokedToken.expires_at, RevokedToken.revoked_at).where(
+            RevokedToken.expires_at > utcnow())
+        if self._since is not None:
+            query = query.where(RevokedToken.revoked_at >= self._since - REVOCATION_OVERLAP)
+        rows = dbsession.execute(query).all()
+        now = time.time()
+        with self._lock:
+            revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+            for row in rows:
+                revoked[row.jti] = _unix_time(row.expires_at)
+                if self._since is None or row.revoked_at > self._since:
+                    self._since = row.revoked_at
+            self._revoked = revoked
+        self._next_refresh = time.monotonic() + self.refresh_interval
+
+    def __len__(self):
+        return len(self._revoked)
+
+
+# Every admin cache in the process, for invalidation from ORM events
+_admin_caches = weakref.WeakSet()
+
+
+class Authenticator:
+    """Verifies admin tokens, with the claims and admin caches"""
+
+    def __init__(self, secret=DEFAULT_JWT_SECRET, claims_ttl=DEFAULT_CLAIMS_CACHE_TTL,
+                 admin_ttl=DEFAULT_ADMIN_CACHE_TTL, max_entries=DEFAULT_MAX_ENTRIES,
+                 revocation_refresh_interval=DEFAULT_REVOCATION_REFRESH_INTERVAL):
+        self.secret = secret
+        self.claims = TTLCache(claims_ttl, max_entries)
+        self.admins = TTLCache(admin_ttl, max_entries)
+        self.revocations = RevocationList(revocation_refresh_interval)
+        _admin_caches.add(self.admins)
+
+    def decode(self, token):
+        """The token's claims; raises ``jwt.InvalidTokenError``"""
+        digest = hashlib.sha256(token.encode('utf-8')).digest()
+        claims = self.claims.get(digest)
+        if claims is None:
+            claims = jwt.decode(token, self.secret, algorithms=[JWT_ALGORITHM])
+            exp = claims.get('exp')
+            self.claims.put(digest, claims, None if exp is None else exp - time.time())
+        return claims
+
+    def admin(self, dbsession, admin_id):
+        """The active admin ``admin_id`` as an :data:`AdminIdentity`, or None"""
+        identity = self.admins.get(admin_id)
+        if identity is None:
+            row = dbsession.execute(
+                select(Admin.id, Admin.username, Admin.is_active).where(Admin.id == admin_id)
+            ).one_or_none()
+            if row is None or not row.is_active:
+                return None
+            identity = AdminIdentity(row.id, row.username)
+            self.admins.put(admin_id, identity)
+        return identity
+
+    def bearer_claims(self, request):
+        """The verified, unrevoked claims of ``request``'s bearer token
+
+        Raises :class:`AuthenticationError` saying why there are none.
+        """
+        auth_header = request.headers.get('Authorization') or ''
+        scheme, _, token = auth_header.partition(' ')
+        if scheme != 'Bearer' or not token:
+            raise AuthenticationError('Authorization token required')
+        try:
+            claims = self.decode(token)
+        except jwt.ExpiredSignatureError:
+            raise AuthenticationError('Token has expired')
+        except jwt.InvalidTokenError:
+            raise AuthenticationError('Invalid token')
+        jti = claims.get('jti')
+        if jti is not None:
+            # Our tokens carry a hex string; anything else cannot be looked up
+            if not isinstance(jti, str):
+                raise AuthenticationError('Invalid token')
+            if self.revocations.is_revoked(request.dbsession, jti):
+                raise AuthenticationError('Token has been revoked')
+        return claims
+
+    def authenticate(self, request):
+        """The :data:`AdminIdentity` of ``request``'s bearer token
+
+        Raises :class:`AuthenticationError` saying why there is none.
+        """
+        claims = self.bearer_claims(request)
+        admin_id = claims.get('admin_id')
+        if not isinstance(admin_id, int):
+            raise AuthenticationError('Invalid token')
+        identity = self.admin(request.dbsession, admin_id)
+        if identity is None:
+            raise AuthenticationError('Admin not found or deactivated')
+        return identity
+
+
+def get_authenticator(registry):
+    """The configured :class:`Authenticator`
+
+    Without one (views called outside the application) tokens are
+    verified with the default secret and nothing is cached.
+    """
+    authenticator = registry.get('authenticator')
+    if authenticator is None:
+        authenticator = Authenticator(claims_ttl=0, admin_ttl=0, revocation_refresh_interval=0)
+    return authenticator
+
+
+def authenticate(request):
+    """:meth:`Authenticator.authenticate` with the request's authenticator"""
+    return get_authenticator(request.registry).authenticate(request)
+
+
+def _revoke_statement(dialect):
+    """``INSERT ... ON CONFLICT (jti) DO NOTHING``, if supported"""
+    if dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert(RevokedToken).on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+
+
+def revoke(request):
+    """Revoke ``request``'s bearer token until it expires
+
+    Returns the :data:`AdminIdentity` it belonged to; raises
+    :class:`AuthenticationError` like :func:`authenticate`. Revoking a
+    token another process has already revoked is not an error.
+    """
+    authenticator = get_authenticator(request.registry)
+    identity = authenticator.authenticate(request)
+    claims = authenticator.bearer_claims(request)
+    jti, exp = claims.get('jti'), claims.get('exp')
+    if jti is not None and exp is not None:
+        values = {'jti': jti, 'admin_id': identity.id,
+                  'expires_at': datetime.fromtimestamp(exp, timezone.utc).replace(tzinfo=None)}
+        dbsession = request.dbsession
+        statement = _revoke_statement(dbsession.get_bind().dialect)
+        if statement is not None:
+            dbsession.execute(statement.values(values))
+            commit_hooks.mark_changed(request)
+        elif dbsession.get(RevokedToken, jti) is None:
+            dbsession.add(RevokedToken(**values))
+        commit_hooks.after_commit(request, authenticator.revocations.add, jti, exp)
+    return identity
+
+
+def purge_expired_revocations(dbsession, now=None):
+    """Delete revocations of tokens past their ``exp``; returns how many"""
+    result = dbsession.execute(
+        delete(RevokedToken).where(RevokedToken.expires_at <= (now or utcnow()))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+class SecurityPolicy:
+    """Active admins holding a valid token may do anything; nobody else is anyone"""
+
+    def identity(self, request):
+        # Pyramid asks once per permission check; verify once per request
+        try:
+            return request.environ[IDENTITY_KEY]
+        except KeyError:
+            pass
+        try:
+            identity = authenticate(request)
+        except AuthenticationError:
+            identity = None
+        request.environ[IDENTITY_KEY] = identity
+        return identity
+
+    def authenticated_userid(self, request):
+        identity = self.identity(request)
+        return None if identity is None else identity.id
+
+    def permits(self, request, context, permission):
+        if self.identity(request) is None:
+            return Denied('Admin authentication required')
+        return Allowed('Authenticated admin')
+
+    def remember(self, request, userid, **kw):
+        return []
+
+    def forget(self, request, **kw):
+        return []
+
+
+def forbidden_view(request):
+    """401 without a usable token, 403 otherwise, as JSON like the other errors"""
+    try:
+        authenticate(request)
+    except AuthenticationError as e:
+        error, status = str(e), 401
+    else:
+        error, status = 'Forbidden', 403
+    response = Response(json.dumps({'error': error}), status=status, content_type='application/json; charset=UTF-8')
+    if status == 401:
+        response.headers['WWW-Authenticate'] = 'Bearer'
+    return response
+
+
+def _invalidate_admin(admin_id):
+    for cache in list(_admin_caches):
+        cache.pop(admin_id)
+
+
+@event.listens_for(Admin, 'after_update')
+@event.listens_for(Admin, 'after_delete')
+def _admin_changed(mapper, connection, target):
+    # Dropped now so this process stops trusting the row at once, and
+    # again after the commit in case a request re-cached it in between
+    _invalidate_admin(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(CHANGED_ADMINS_KEY, set()).add(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    for admin_id in session.info.pop(CHANGED_ADMINS_KEY, ()):
+        _invalidate_admin(admin_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _after_rollback(session, previous_transaction):
+    session.info.pop(CHANGED_ADMINS_KEY, None)
+
+
+def jwt_secret(settings):
+    """The configured signing secret; raises ``ConfigurationError`` if unusable"""
+    secret = os.environ.get(JWT_SECRET_ENVIRON) or settings.get('auth.jwt_secret')
+    if not secret or secret in PLACEHOLDER_JWT_SECRETS or len(secret) < MIN_JWT_SECRET_LENGTH:
+        raise ConfigurationError(
+            f'Set auth.jwt_secret (or {JWT_SECRET_ENVIRON}) to a random value of at least '
+            f'{MIN_JWT_SECRET_LENGTH} characters; anyone knowing it can sign admin tokens')
+    return secret
+
+
+def includeme(config):
+    settings = config.get_settings()
+    config.registry['authenticator'] = Authenticator(
+        secret=jwt_secret(settings),
+        claims_ttl=float(settings.get('auth.claims_cache_ttl', DEFAULT_CLAIMS_CACHE_TTL)),
+        admin_ttl=float(settings.get('auth.admin_cache_ttl', DEFAULT_ADMIN_CACHE_TTL)),
+        max_entries=int(settings.get('auth.cache_max_entries', DEFAULT_MAX_ENTRIES)),
+        revocation_refresh_interval=float(settings.get('auth.revocation_refresh_interval',
+                                                       DEFAULT_REVOCATION_REFRESH_INTERVAL)),
+    )
+    config.set_security_policy(SecurityPolicy())
+    config.add_forbidden_view(forbidden_view)
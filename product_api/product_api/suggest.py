@@ -0,0 +1,287 @@
+"""In-process prefix index of product titles for type-ahead suggestions
+
+Titles are kept case-folded in one sorted list, so every prefix maps to a
+contiguous slice found with two bisections. Each slice is ranked by
+popularity (units sold, from ``order_items``). The index is built lazily
+from the database on first use, patched by the product and order views after
+their transactions commit, and rebuilt in the background every
+``suggest.refresh_interval`` seconds to pick up writes made by other
+processes. Writes applied while a rebuild runs are replayed onto the rebuilt
+index before it replaces the current one.
+"""
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+
+from sqlalchemy import func
+
+from .models import OrderItem, Product
+
+log = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 20
+
+# Prefixes matching more titles than this get their ranked result memoised,
+# so one- and two-letter prefixes stay O(limit). Writes only touch the memoised
+# prefixes of the title they change.
+MEMO_THRESHOLD = 2000
+
+_SEPARATOR = '\x00'
+# Sorts after every character a title can continue with
+_MAX_CHAR = '\U0010ffff'
+
+
+def fold(title):
+    """Normalise a title or prefix for matching"""
+    return ' '.join((title or '').casefold().split())
+
+
+class SuggestIndex:
+    """Sorted-array prefix index with popularity weights"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._keys = []      # sorted "<folded title>\x00<title>\x00<id>"
+        self._by_id = {}     # id -> its key in _keys
+        self._weights = {}   # id -> units sold; absent means 0
+        self._memo = {}      # folded prefix -> ranked results
+        self.loaded_at = None
+
+    def __len__(self):
+        return len(self._keys)
+
+    @staticmethod
+    def _make_key(product_id, title):
+        return f"{fold(title)}{_SEPARATOR}{title}{_SEPARATOR}{product_id}"
+
+    @staticmethod
+    def _split_key(key):
+        _, title, product_id = key.split(_SEPARATOR)
+        return int(product_id), title
+
+    @staticmethod
+    def _folded(key):
+        return key.partition(_SEPARATOR)[0]
+
+    def build(self, titles, weights=None):
+        """Replace the contents with ``titles`` (``[(id, title), ...]``)"""
+        by_id = {product_id: self._make_key(product_id, title)
+                 for product_id, title in titles}
+        keys = sorted(by_id.values())
+        weights = {pid: int(w) for pid, w in (weights or {}).items() if w}
+        with self._lock:
+            self._keys, self._by_id, self._weights = keys, by_id, weights
+            self._memo = {}
+            self.loaded_at = time.monotonic()
+
+    def load(self, dbsession):
+        """Build from the database: every title plus units sold per product"""
+        titles = dbsession.query(Product.id, Product.title) \
+                          .execution_options(yield_per=10000)
+        weights = dbsession.query(OrderItem.product_id, func.sum(OrderItem.quantity)) \
+                           .group_by(OrderItem.product_id)
+        self.build(titles, dict(weights))
+
+    def upsert(self, product_id, title):
+        key = self._make_key(product_id, title)
+        with self._lock:
+            old = self._by_id.get(product_id)
+            if old == key:
+                return
+            if old is not None:
+                self._remove_key(old)
+                self._invalidate(self._folded(old))
+            insort(self._keys, key)
+            self._by_id[product_id] = key
+            self._invalidate(self._folded(key))
+
+    def remove(self, product_id):
+        with self._lock:
+            key = self._by_id.pop(product_id, None)
+            if key is not None:
+                self._remove_key(key)
+                self._weights.pop(product_id, None)
+                self._invalidate(self._folded(key))
+
+    def add_weight(self, product_id, quantity):
+        with self._lock:
+            weight = self._weights[product_id] = self._weights.get(product_id, 0) + quantity
+            if quantity < 0:
+                key = self._by_id.get(product_id)
+                if key is not None:
+                    self._invalidate(self._folded(key))
+            else:
+                self._reweigh(product_id, weight)
+
+    def _invalidate(self, folded):
+        """Drop the memoised results of every prefix of ``folded``"""
+        for memo_key in [memo_key for memo_key in self._memo if folded.startswith(memo_key[0])]:
+            del self._memo[memo_key]
+
+    def _reweigh(self, product_id, weight):
+        """Patch the memoised rankings a weight increase can change
+
+        A heavier product can only move up: it enters a memoised top
+        ``limit`` when it now outranks the last entry, otherwise that result
+        stays valid. Cheaper than re-ranking thousands of titles per order.
+        """
+        key = self._by_id.get(product_id)
+        if key is None or not self._memo:
+            return
+        folded = self._folded(key)
+        entry = {'id': product_id, 'title': self._split_key(key)[1], 'popularity': weight}
+
+        def rank(result):
+            return -result['popularity'], self._by_id[result['id']]
+
+        for (prefix, limit), results in list(self._memo.items()):
+            if not folded.startswith(prefix):
+                continue
+            others = [result for result in results if result['id'] != product_id]
+            if len(others) == len(results) == limit and rank(entry) > rank(results[-1]):
+                continue
+            # A new list: earlier callers may still be serialising the old one
+            self._memo[prefix, limit] = sorted(others + [entry], key=rank)[:limit]
+
+    def _remove_key(self, key):
+        position = bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            del self._keys[position]
+
+    def lookup(self, prefix, limit=DEFAULT_LIMIT):
+        """Most popular titles starting with ``prefix``
+
+        Returns ``[{'id': ..., 'title': ..., 'popularity': ...}, ...]``,
+        most sold first, then alphabetically.
+        """
+        folded = fold(prefix)
+        if not folded:
+            return []
+        with self._lock:
+            keys, weights = self._keys, self._weights
+            start = bisect_left(keys, folded)
+            end = bisect_left(keys, folded + _MAX_CHAR, start)
+            if end - start > MEMO_THRESHOLD:
+                memo_key = (folded, limit)
+                if memo_key not in self._memo:
+                    self._memo[memo_key] = self._rank(keys, weights, start, end, limit)
+                return self._memo[memo_key]
+            return self._rank(keys, weights, start, end, limit)
+
+    def _rank(self, keys, weights, start, end, limit):
+        entries = (self._split_key(keys[i]) for i in range(start, end))
+        if not weights:
+            # No sales data: the sorted order is already alphabetical
+            best = [next(entries) for _ in range(min(limit, end - start))]
+        else:
+            # Slice index breaks weight ties alphabetically (keys are sorted)
+            best = heapq.nsmallest(
+                limit,
+                ((-weights.get(pid, 0), i, pid, title)
+                 for i, (pid, title) in enumerate(entries)),
+            )
+            best = [(pid, title) for _, _, pid, title in best]
+        return [{'id': pid, 'title': title, 'popularity': weights.get(pid, 0)}
+                for pid, title in best]
+
+
+class SuggestService:
+    """Owns the process-wide :class:`SuggestIndex` and its refresh cycle"""
+
+    def __init__(self, session_factory=None, refresh_interval=300):
+        self.index = SuggestIndex()
+        self.session_factory = session_factory
+        self.refresh_interval = refresh_interval
+        self._load_lock = threading.Lock()
+        # Guards _refreshing, _pending and the swap to a rebuilt index
+        self._refresh_lock = threading.Lock()
+        self._refreshing = False
+        self._pending = None  # writes to replay onto the index being rebuilt
+
+    def get_index(self, dbsession):
+        """The index, loading it synchronously on first use"""
+        if self.index.loaded_at is None:
+            with self._load_lock:
+                if self.index.loaded_at is None:
+                    self.index.load(dbsession)
+        elif self._is_stale():
+            self._refresh_in_background()
+        return self.index
+
+    def _is_stale(self):
+        return (self.refresh_interval
+                and time.monotonic() - self.index.loaded_at > self.refresh_interval)
+
+    def _refresh_in_background(self):
+        if self.session_factory is None:
+            return
+        with self._refresh_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+            # Started before the rebuild reads, so no write falls in between;
+            # a sale committed just before the read may be counted twice
+            # until the next refresh.
+            self._pending = []
+        threading.Thread(target=self._rebuild, name='suggest-refresh', daemon=True).start()
+
+    def _rebuild(self):
+        fresh = SuggestIndex()
+        session = self.session_factory()
+        try:
+            fresh.load(session)
+        except Exception:
+            log.exception("Refreshing the suggest index failed")
+        finally:
+            session.close()
+            with self._refresh_lock:
+                if fresh.loaded_at is not None:
+                    for method, args in self._pending:
+                        getattr(fresh, method)(*args)
+                    self.index = fresh
+                self._pending = None
+                self._refreshing = False
+
+    def refresh(self):
+        """Rebuild in the background, e.g. after a bulk import"""
+        if self.index.loaded_at is not None:
+            self._refresh_in_background()
+
+    # Incremental updates; ignored until the index has been loaded
+
+    def _apply(self, method, *args):
+        with self._refresh_lock:
+            if self.index.loaded_at is None:
+                return
+            getattr(self.index, method)(*args)
+            if self._pending is not None:
+                self._pending.append((method, args))
+
+    def product_saved(self, product_id, title):
+        self._apply('upsert', product_id, title)
+
+    def product_deleted(self, product_id):
+        self._apply('remove', product_id)
+
+    def items_sold(self, quantities):
+        for product_id, quantity in quantities:
+            self._apply('add_weight', product_id, quantity)
+
+
+def get_suggest_service(registry):
+    """The registry's :class:`SuggestService`, created on first access"""
+    service = registry.get('suggest_service')
+    if service is None:
+        service = registry['suggest_service'] = SuggestService()
+    return service
+
+
+def includeme(config):
+    settings = config.get_settings()
+    config.registry['suggest_service'] = SuggestService(
+        session_factory=config.registry.get('dbsession_factory'),
+        refresh_interval=int(settings.get('suggest.refresh_interval', 300)),
+    )
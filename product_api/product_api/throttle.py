@@ -0,0 +1,98 @@
+"""Token-bucket throttling of login attempts
+
+Every attempt takes a token from the bucket of its client address and one
+from the bucket of the username it names, before any password is hashed.
+A bucket holds up to ``burst`` tokens and refills at ``per_minute`` tokens
+a minute, so a user who mistypes a password a few times is not slowed
+down, while a guesser, or a client spraying many usernames, is refused
+with 429 after a handful of tries at almost no cost.
+
+Buckets live in process memory, bounded to ``login_throttle.max_keys``
+keys each (least recently used dropped first). With several processes each
+enforces its own limit.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from pyramid.settings import asbool
+
+DEFAULT_IP_PER_MINUTE = 20
+DEFAULT_IP_BURST = 10
+DEFAULT_USERNAME_PER_MINUTE = 5
+DEFAULT_USERNAME_BURST = 5
+DEFAULT_MAX_KEYS = 100000
+
+
+class TokenBucket:
+    """Per-key token buckets refilling at ``per_minute``, holding at most ``burst``"""
+
+    def __init__(self, per_minute, burst, max_keys=DEFAULT_MAX_KEYS):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def take(self, key, now=None):
+        """Take a token for ``key``: 0 if allowed, else seconds until one is available"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+class LoginThrottle:
+    def __init__(self, ip_per_minute=DEFAULT_IP_PER_MINUTE, ip_burst=DEFAULT_IP_BURST,
+                 username_per_minute=DEFAULT_USERNAME_PER_MINUTE, username_burst=DEFAULT_USERNAME_BURST,
+                 max_keys=DEFAULT_MAX_KEYS):
+        self.by_ip = TokenBucket(ip_per_minute, ip_burst, max_keys)
+        self.by_username = TokenBucket(username_per_minute, username_burst, max_keys)
+
+    def check(self, client_addr, username=None, now=None):
+        """Seconds the client must wait before trying, 0 if it may go ahead
+
+        The username's bucket is only drawn from once the address is allowed.
+        """
+        wait = self.by_ip.take(client_addr, now)
+        if wait or username is None:
+            return wait
+        # Usernames are matched exactly at login; fold case so variants share a bucket
+        return self.by_username.take(username.casefold(), now)
+
+
+def get_login_throttle(registry):
+    """The configured :class:`LoginThrottle`, or ``None`` when disabled"""
+    return registry.get('login_throttle')
+
+
+def retry_after(request, username=None):
+    """Seconds (rounded up) ``request`` must wait before a login, 0 if allowed"""
+    throttle = get_login_throttle(request.registry)
+    if throttle is None:
+        return 0
+    wait = throttle.check(request.remote_addr or '', username)
+    return math.ceil(wait) if wait else 0
+
+
+def includeme(config):
+    settings = config.get_settings()
+    if asbool(settings.get('login_throttle.enabled', True)):
+        config.registry['login_throttle'] = LoginThrottle(
+            ip_per_minute=float(settings.get('login_throttle.ip_per_minute', DEFAULT_IP_PER_MINUTE)),
+            ip_burst=int(settings.get('login_throttle.ip_burst', DEFAULT_IP_BURST)),
+            username_per_minute=float(settings.get('login_throttle.username_per_minute',
+                                                   DEFAULT_USERNAME_PER_MINUTE)),
+            username_burst=int(settings.get('login_throttle.username_burst', DEFAULT_USERNAME_BURST)),
+            max_keys=int(settings.get('login_throttle.max_keys', DEFAULT_MAX_KEYS)),
+        )
@@ -0,0 +1,65 @@
+"""Validation shared by ``POST /api/products`` and the bulk importer"""
+import math
+
+from .models import Product
+
+PRODUCT_REQUIRED_FIELDS = ('title', 'description', 'price')
+
+
+class MissingFieldError(ValueError):
+    """A required product field is absent or empty"""
+
+    def __init__(self, field):
+        super().__init__(f'{field} is required')
+        self.field = field
+
+
+def clean_stock(value):
+    """``stock`` as an int; ``products`` has ``CHECK (stock >= 0)``"""
+    stock = int(value)
+    if stock < 0:
+        raise ValueError('stock must not be negative')
+    return stock
+
+
+def clean_price(value):
+    """``price`` as a float; ``nan`` and ``inf`` convert but are not prices"""
+    price = float(value)
+    if not math.isfinite(price):
+        raise ValueError('price must be a finite number')
+    return price
+
+
+def clean_string(field, value):
+    """``value`` for the string column ``products.<field>``, if it fits
+
+    ``None`` stays ``None``; anything else must be a ``str`` no longer than
+    the column, which PostgreSQL would otherwise reject for the whole import.
+    """
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f'{field} must be a string')
+    length = Product.__table__.c[field].type.length
+    if length is not None and len(value) > length:
+        raise ValueError(f'{field} must be at most {length} characters')
+    return value
+
+
+def clean_product(data):
+    """Column values for a new product from request/import ``data``
+
+    Raises :class:`MissingFieldError` for a missing required field and
+    ``ValueError``/``TypeError`` for values that do not convert.
+    """
+    for field in PRODUCT_REQUIRED_FIELDS:
+        if not data.get(field):
+            raise MissingFieldError(field)
+    return {
+        'title': clean_string('title', data.get('title')),
+        'description': clean_string('description', data.get('description')),
+        'price': clean_price(data.get('price')),
+        'stock': clean_stock(data.get('stock', 0)),
+        'image': clean_string('image', data.get('image')),
+        'sku': clean_string('sku', data.get('sku') or None),
+    }
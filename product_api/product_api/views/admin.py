@@ -3,30 +3,63 @@ from pyramid.httpexceptions import HTTPOk
 from pyramid.view import view_config
 import json
 import jwt
+import uuid
 from datetime import datetime, timedelta
 from sqlalchemy.exc import SQLAlchemyError
 from ..models import Admin
+from ..cache import get_product_cache
+from .. import hashing
+from .. import security
+from .. import throttle
 
-# JWT Secret - In production, use environment variable
-JWT_SECRET = 'your-secret-key-here'  # Change this to a secure secret
-JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 24
 
+
+def _too_many_attempts(wait):
+    response = Response(json.dumps({'error': 'Too many login attempts, try again later'}),
+                        status=429, content_type='application/json; charset=UTF-8')
+    response.headers['Retry-After'] = str(wait)
+    return response
+
+
+def _credentials(data):
+    """``(username, password)`` from a JSON body, or None unless both are non-empty strings"""
+    if not isinstance(data, dict):
+        return None
+    username, password = data.get('username'), data.get('password')
+    if not (isinstance(username, str) and isinstance(password, str) and username and password):
+        return None
+    return username, password
+
+
+def _credentials_required():
+    return Response(json.dumps({'error': 'Username and password are required'}),
+                    status=400, content_type='application/json; charset=UTF-8')
+
+
+def _hashing_busy():
+    response = Response(json.dumps({'error': 'Server busy, try again shortly'}),
+                        status=503, content_type='application/json; charset=UTF-8')
+    response.headers['Retry-After'] = '1'
+    return response
+
 @view_config(route_name='admin_login', request_method='POST', renderer='json')
 def admin_login(request):
     """Admin login"""
     try:
-        data = request.json_body
-        username = data.get('username')
-        password = data.get('password')
+        credentials = _credentials(request.json_body)
+        if credentials is None:
+            return _credentials_required()
+        username, password = credentials
         
-        if not username or not password:
-            return Response(json.dumps({'error': 'Username and password are required'}), 
-                          status=400, content_type='application/json; charset=UTF-8')
+        # Throttled per address and per username before any hash work
+        wait = throttle.retry_after(request, username)
+        if wait:
+            return _too_many_attempts(wait)
         
         # Find admin by username
         admin = request.dbsession.query(Admin).filter(Admin.username == username).first()
-        if not admin or not admin.check_password(password):
+        if not admin or not hashing.check_password(request, admin.password_hash, password):
             return Response(json.dumps({'error': 'Invalid username or password'}), 
                           status=401, content_type='application/json; charset=UTF-8')
         
@@ -41,10 +74,12 @@ def admin_login(request):
         payload = {
             'admin_id': admin.id,
             'username': admin.username,
+            'jti': uuid.uuid4().hex,  # revoked by logout
             'exp': datetime.utcnow() + timedelta(hours=JWT_EXPIRATION_HOURS),
             'iat': datetime.utcnow()
         }
-        token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+        token = jwt.encode(payload, security.get_authenticator(request.registry).secret,
+                           algorithm=security.JWT_ALGORITHM)
         
         return {
             'message': 'Login successful',
@@ -52,6 +87,8 @@ def admin_login(request):
             'admin': admin.to_dict()
         }
         
+    except hashing.PoolBusy:
+        return _hashing_busy()
     except (ValueError, KeyError, SQLAlchemyError) as e:
         return Response(json.dumps({'error': str(e)}), status=400, content_type='application/json; charset=UTF-8')
     
@@ -61,21 +98,29 @@ def admin_login_options(request):
 
 @view_config(route_name='admin_logout', request_method='POST', renderer='json')
 def admin_logout(request):
-    """Admin logout"""
-    # For JWT, logout is handled client-side by removing the token
+    """Admin logout: the token is revoked until it expires"""
+    try:
+        security.revoke(request)
+    except security.AuthenticationError as e:
+        return Response(json.dumps({'error': str(e)}), 
+                      status=401, content_type='application/json; charset=UTF-8')
+    except SQLAlchemyError as e:
+        return Response(json.dumps({'error': str(e)}), status=400, content_type='application/json; charset=UTF-8')
     return {'message': 'Logout successful'}
 
-@view_config(route_name='admin_create', request_method='POST', renderer='json')
+@view_config(route_name='admin_create', request_method='POST', renderer='json', permission=security.ADMIN)
 def create_admin(request):
-    """Create new admin account"""
+    """Create new admin account (by an admin; the first one comes from create_admin.py)"""
     try:
-        data = request.json_body
-        username = data.get('username')
-        password = data.get('password')
+        credentials = _credentials(request.json_body)
+        if credentials is None:
+            return _credentials_required()
+        username, password = credentials
         
-        if not username or not password:
-            return Response(json.dumps({'error': 'Username and password are required'}), 
-                          status=400, content_type='application/json; charset=UTF-8')
+        # Hashing the new password costs as much as a login attempt
+        wait = throttle.retry_after(request)
+        if wait:
+            return _too_many_attempts(wait)
         
         # Check if username already exists
         existing_admin = request.dbsession.query(Admin).filter(Admin.username == username).first()
@@ -85,7 +130,7 @@ def create_admin(request):
         
         # Create new admin
         admin = Admin(username=username)
-        admin.set_password(password)
+        admin.password_hash = hashing.hash_password(request, password)
         
         request.dbsession.add(admin)
         request.dbsession.flush()
@@ -95,6 +140,8 @@ def create_admin(request):
             'admin': admin.to_dict()
         }
         
+    except hashing.PoolBusy:
+        return _hashing_busy()
     except (ValueError, KeyError, SQLAlchemyError) as e:
         return Response(json.dumps({'error': str(e)}), status=400, content_type='application/json; charset=UTF-8')
     
@@ -106,37 +153,31 @@ def admin_profile_options(request):
 def get_admin_profile(request):
     """Get admin profile (requires authentication)"""
     try:
-        # Get token from Authorization header
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return Response(json.dumps({'error': 'Authorization token required'}), 
-                          status=401, content_type='application/json; charset=UTF-8')
-        
-        token = auth_header.split(' ')[1]
-        
-        try:
-            # Decode JWT token
-            payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-            admin_id = payload.get('admin_id')
-            
-            # Get admin from database
-            admin = request.dbsession.query(Admin).filter(Admin.id == admin_id).first()
-            if not admin:
-                return Response(json.dumps({'error': 'Admin not found'}), 
-                              status=404, content_type='application/json; charset=UTF-8')
-            
-            return admin.to_dict()
-            
-        except jwt.ExpiredSignatureError:
-            return Response(json.dumps({'error': 'Token has expired'}), 
-                          status=401, content_type='application/json; charset=UTF-8')
-        except jwt.InvalidTokenError:
-            return Response(json.dumps({'error': 'Invalid token'}), 
-                          status=401, content_type='application/json; charset=UTF-8')
-        
-    except Exception as e:
+        identity = security.authenticate(request)
+        admin = request.dbsession.get(Admin, identity.id)
+        return admin.to_dict()
+    except security.AuthenticationError as e:
+        return Response(json.dumps({'error': str(e)}), 
+                      status=401, content_type='application/json; charset=UTF-8')
+    except SQLAlchemyError as e:
         return Response(json.dumps({'error': str(e)}), status=400, content_type='application/json; charset=UTF-8')
     
 @view_config(route_name='admin_profile', request_method='OPTIONS', renderer='json')
 def admin_profile_options(request):
-    return HTTPOk()
\ No newline at end of file
+    return HTTPOk()
+
+@view_config(route_name='admin_product_cache', request_method='GET', renderer='json', permission=security.ADMIN)
+def get_product_cache_stats(request):
+    """Hit/miss counters of the product JSON cache"""
+    cache = get_product_cache(request.registry)
+    if cache is None:
+        return {'enabled': False}
+    return dict(cache.stats(), enabled=True)
+
+@view_config(route_name='admin_product_cache', request_method='DELETE', renderer='json', permission=security.ADMIN)
+def clear_product_cache(request):
+    """Drop every cached product payload"""
+    cache = get_product_cache(request.registry)
+    if cache is not None:
+        cache.invalidate()
+    return {'message': 'Product cache cleared'}
@@ -0,0 +1,46 @@
+from pyramid.response import Response
+from pyramid.view import view_config
+import json
+from sqlalchemy.exc import SQLAlchemyError
+from .. import cache as product_cache
+from .. import checkout
+from .. import commit_hooks
+from ..cors import options_view
+from ..idempotency import idempotent
+from ..suggest import get_suggest_service
+import logging
+
+log = logging.getLogger(__name__)
+
+@view_config(route_name='checkout', request_method='POST', renderer='json', decorator=idempotent)
+def checkout_order(request):
+    """Place an order from ``customerInfo`` and ``items`` (``id``, ``quantity``)
+
+    Prices, totals and stock are settled server-side in this request's
+    transaction; the created order is returned.
+    """
+    try:
+        data = request.json_body
+    except ValueError:
+        return Response(json.dumps({'error': 'Invalid JSON data'}), status=400, content_type='application/json; charset=UTF-8')
+    if not isinstance(data, dict):
+        return Response(json.dumps({'error': 'Invalid JSON data'}), status=400, content_type='application/json; charset=UTF-8')
+    try:
+        order = checkout.place_order(request.dbsession, data.get('customerInfo'), data.get('items'))
+    except checkout.CheckoutError as e:
+        return Response(json.dumps({'error': str(e), 'details': e.details}), status=400, content_type='application/json; charset=UTF-8')
+    except SQLAlchemyError as e:
+        log.error(f"Database error during checkout: {e}")
+        # Stock may already be reserved: the 500 must not commit it
+        commit_hooks.doom(request)
+        return Response(json.dumps({'error': 'Database error occurred'}), status=500, content_type='application/json; charset=UTF-8')
+
+    sold = [(item.product_id, item.quantity) for item in order.order_items]
+    commit_hooks.after_commit(request, get_suggest_service(request.registry).items_sold, sold)
+    product_cache.products_changed(request, [product_id for product_id, _ in sold])
+    log.info(f"Checkout placed order {order.order_id}")
+    return order.to_dict()
+
+@view_config(route_name='checkout', request_method='OPTIONS')
+def checkout_options(request):
+    return options_view(request)
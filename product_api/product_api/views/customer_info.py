@@ -1,19 +1,109 @@
 from pyramid.response import Response
 from pyramid.view import view_config
 import json
+from sqlalchemy import and_, or_, select
 from sqlalchemy.exc import SQLAlchemyError
 from ..models import CustomerInfo
+from ..models.customer_info import NAME_KEY, normalize_email
+from ..models.meta import byte_order
+from ..customers import find_customer, order_stats
+from .. import pagination
+from .. import security
 
-@view_config(route_name='customer_info_list', request_method='GET', renderer='json')
+# Prefix search parameters of GET /api/customers: the indexed column each
+# matches and how a value is cleaned to compare with it
+CUSTOMER_SEARCH_PARAMS = {
+    'name': (NAME_KEY, lambda value: value.strip().lower()),
+    'email': (CustomerInfo.email_normalized, normalize_email),
+    'phone': (CustomerInfo.phone_number, str.strip),
+}
+
+# Sort keys, each backed by a (column, id) index; text sorts in the byte
+# order prefix searches compare in, so one index range serves both
+CUSTOMER_SORT_COLUMNS = {
+    'name': byte_order(NAME_KEY),
+    'email': byte_order(CustomerInfo.email_normalized),
+    'phone': byte_order(CustomerInfo.phone_number),
+    'id': CustomerInfo.id,
+}
+
+CUSTOMER_PAGE_PARAMS = ('limit', 'cursor', 'sort', 'q', 'stats') + tuple(CUSTOMER_SEARCH_PARAMS)
+
+
+def _search_criteria(params):
+    """``(criteria, default sort key)`` for the name/email/phone/q parameters"""
+    criteria, sort_keys = [], []
+    for name, (column, clean) in CUSTOMER_SEARCH_PARAMS.items():
+        value = clean(params.get(name) or '')
+        if value:
+            criteria.append(and_(*pagination.prefix_criteria(column, value)))
+            sort_keys.append(name)
+    q = params.get('q', '').strip()
+    if q:
+        criteria.append(or_(*[and_(*pagination.prefix_criteria(column, clean(q)))
+                              for column, clean in CUSTOMER_SEARCH_PARAMS.values()]))
+    # Sorting on the searched column lets one index range serve both
+    return criteria, sort_keys[0] if sort_keys else 'id'
+
+
+def get_customers_page(request):
+    """Keyset-paginated customer search"""
+    params = request.params
+    limit = pagination.parse_limit(params.get('limit'))
+    criteria, default_sort = _search_criteria(params)
+    sort_key, descending = pagination.parse_sort(params.get('sort'), CUSTOMER_SORT_COLUMNS, default=default_sort)
+    cursor_key = f"-{sort_key}" if descending else sort_key
+    sort_column = CUSTOMER_SORT_COLUMNS[sort_key]
+
+    query = select(CustomerInfo, sort_column.label('sort_value')).where(*criteria)
+    if params.get('cursor'):
+        sort_value, row_id = pagination.decode_cursor(params['cursor'], cursor_key, sort_column)
+        query = query.where(pagination.keyset_after(sort_column, CustomerInfo.id, sort_value, row_id, descending))
+    rows = request.dbsession.execute(
+        query.order_by(*pagination.order_by_keyset(sort_column, CustomerInfo.id, descending)).limit(limit + 1)
+    ).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = pagination.encode_cursor(cursor_key, last.sort_value, last.CustomerInfo.id)
+    customers = [row.CustomerInfo.to_dict() for row in rows]
+    if params.get('stats') in ('1', 'true'):
+        stats = order_stats(request.dbsession, [customer['id'] for customer in customers])
+        for customer in customers:
+            customer.update(stats.get(customer['id'], {'orderCount': 0, 'lifetimeTotal': 0, 'lastOrderDate': None}))
+    return {
+        'customers': customers,
+        'nextCursor': next_cursor,
+        'limit': limit,
+    }
+
+
+@view_config(route_name='customer_info_list', request_method='GET', renderer='json', permission=security.ADMIN)
 def get_customers(request):
-    """Get all customers"""
+    """Get customers
+
+    Without query parameters every customer is returned as before. Any of
+    ``limit``, ``cursor``, ``sort`` (``name``, ``email``, ``phone`` or
+    ``id``, ``-`` for descending), the prefix searches ``name``, ``email``
+    (both ignoring case), ``phone`` and ``q`` (any of the three), or
+    ``stats=1`` (adds ``orderCount``, ``lifetimeTotal`` and
+    ``lastOrderDate``) switches to a keyset-paginated page with a
+    ``nextCursor``. The page is sorted on the searched column by default,
+    otherwise on ``id``.
+    """
     try:
+        if any(name in request.params for name in CUSTOMER_PAGE_PARAMS):
+            return get_customers_page(request)
         customers = request.dbsession.query(CustomerInfo).all()
         return {'customers': [customer.to_dict() for customer in customers]}
+    except pagination.InvalidPageRequest as e:
+        return Response(json.dumps({'error': str(e)}), status=400, content_type='application/json; charset=UTF-8')
     except SQLAlchemyError as e:
         return Response(json.dumps({'error': str(e)}), status=500, content_type='application/json; charset=UTF-8')
 
-@view_config(route_name='customer_info', request_method='GET', renderer='json')
+@view_config(route_name='customer_info', request_method='GET', renderer='json', permission=security.ADMIN)
 def get_customer(request):
     """Get single customer"""
     try:
@@ -25,7 +115,7 @@ def get_customer(request):
     except (ValueError, SQLAlchemyError) as e:
         return Response(json.dumps({'error': str(e)}), status=400, content_type='application/json; charset=UTF-8')
 
-@view_config(route_name='customer_info_list', request_method='POST', renderer='json')
+@view_config(route_name='customer_info_list', request_method='POST', renderer='json', permission=security.ADMIN)
 def create_customer(request):
     """Create new customer"""
     try:
@@ -41,13 +131,17 @@ def create_customer(request):
         if not all([customer.full_name, customer.email, customer.address, customer.phone_number]):
             return Response(json.dumps({'error': 'All fields are required'}), status=400, content_type='application/json; charset=UTF-8')
         
+        # One customer per email (ignoring case and surrounding spaces)
+        if find_customer(request.dbsession, customer.email) is not None:
+            return Response(json.dumps({'error': 'A customer with this email already exists'}), status=409, content_type='application/json; charset=UTF-8')
+        
         request.dbsession.add(customer)
         request.dbsession.flush()
         return customer.to_dict()
     except (ValueError, KeyError, SQLAlchemyError) as e:
         return Response(json.dumps({'error': str(e)}), status=400, content_type='application/json; charset=UTF-8')
 
-@view_config(route_name='customer_info', request_method='PUT', renderer='json')
+@view_config(route_name='customer_info', request_method='PUT', renderer='json', permission=security.ADMIN)
 def update_customer(request):
     """Update customer"""
     try:
@@ -57,6 +151,10 @@ def update_customer(request):
             return Response(json.dumps({'error': 'Customer not found'}), status=404, content_type='application/json; charset=UTF-8')
         
         data = request.json_body
+        if data.get('email'):
+            existing = find_customer(request.dbsession, data['email'])
+            if existing is not None and existing.id != customer.id:
+                return Response(json.dumps({'error': 'A customer with this email already exists'}), status=409, content_type='application/json; charset=UTF-8')
         customer.full_name = data.get('fullName', customer.full_name)
         customer.email = data.get('email', customer.email)
         customer.address = data.get('address', customer.address)
@@ -66,7 +164,7 @@ def update_customer(request):
     except (ValueError, KeyError, SQLAlchemyError) as e:
         return Response(json.dumps({'error': str(e)}), status=400, content_type='application/json; charset=UTF-8')
 
-@view_config(route_name='customer_info', request_method='DELETE', renderer='json')
+@view_config(route_name='customer_info', request_method='DELETE', renderer='json', permission=security.ADMIN)
 def delete_customer(request):
     """Delete customer"""
     try:
@@ -0,0 +1,33 @@
+from pyramid.response import Response
+from pyramid.settings import asbool
+from pyramid.view import view_config
+import json
+from .. import export
+from .. import security
+import logging
+
+log = logging.getLogger(__name__)
+
+@view_config(route_name='export', request_method='GET', permission=security.ADMIN)
+def export_data(request):
+    """Stream every product, order or customer as NDJSON or CSV
+
+    ``format=ndjson|csv`` (default ndjson); ``gzip=true`` returns a .gz file.
+    """
+    kind = request.matchdict['kind']
+    if kind not in export.EXPORTS:
+        return Response(json.dumps({'error': f'Unknown export {kind!r}'}), status=404, content_type='application/json; charset=UTF-8')
+    fmt = request.params.get('format', 'ndjson')
+    if fmt not in export.FORMATS:
+        return Response(json.dumps({'error': 'format must be ndjson or csv'}), status=400, content_type='application/json; charset=UTF-8')
+    gzip = asbool(request.params.get('gzip', False))
+
+    log.info(f"Exporting {kind} as {export.filename(kind, fmt, gzip)}")
+    response = Response(
+        app_iter=export.stream_export(request.registry['dbsession_factory'], kind, fmt, gzip=gzip),
+        content_type='application/gzip' if gzip else export.CONTENT_TYPES[fmt],
+    )
+    if not gzip:
+        response.charset = 'UTF-8'
+    response.content_disposition = f'attachment; filename="{export.filename(kind, fmt, gzip)}"'
+    return response
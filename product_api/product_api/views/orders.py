@@ -2,26 +2,189 @@ from pyramid.response import Response
 from pyramid.view import view_config
 from pyramid.httpexceptions import HTTPOk
 import json
-import uuid
-from datetime import datetime
+import logging
+from sqlalchemy import func, select
 from sqlalchemy.exc import SQLAlchemyError
 from ..models import Order, OrderItem, CustomerInfo, Product
+from ..models.customer_info import normalize_email
+from ..models.meta import byte_order, utcnow
+from ..models.order import ORDER_LOAD_OPTIONS
+from .. import cache as product_cache
+from ..cors import options_view
+from ..idempotency import idempotent
+from .. import checkout
+from .. import commit_hooks
+from .. import customers
+from .. import ids
+from .. import inventory
+from .. import order_status
+from .. import pagination
+from .. import security
+from ..suggest import get_suggest_service
 
-@view_config(route_name='orders', request_method='GET', renderer='json')
+log = logging.getLogger(__name__)
+
+# Sort keys accepted by GET /api/orders?sort=, each backed by a (column, id) index
+ORDER_SORT_COLUMNS = {
+    'order_date': Order.order_date,
+    'total': Order.total,
+    'id': Order.id,
+}
+
+ORDER_PAGE_PARAMS = ('limit', 'cursor', 'sort', 'status', 'from', 'to', 'min_total', 'q', 'order_id_prefix')
+
+
+def _filtered_orders_query(request):
+    """Order query with the status/from/to/min_total/q/order_id_prefix filters applied"""
+    params = request.params
+    query = request.dbsession.query(Order).options(*ORDER_LOAD_OPTIONS)
+    if params.get('status'):
+        statuses = [status.strip() for status in params['status'].split(',') if status.strip()]
+        query = query.filter(Order.status.in_(statuses))
+    if params.get('from'):
+        start, _ = pagination.parse_datetime(params['from'], 'from')
+        query = query.filter(Order.order_date >= start)
+    if params.get('to'):
+        end, is_date = pagination.parse_datetime(params['to'], 'to', end_of_day=True)
+        query = query.filter(Order.order_date < end if is_date else Order.order_date <= end)
+    if params.get('min_total'):
+        query = query.filter(Order.total >= pagination.parse_decimal(params['min_total'], 'min_total'))
+    q = params.get('q', '').strip()
+    if q:
+        query = query.filter(Order.order_id.icontains(q, autoescape=True)
+                             | Order.customer_info.has(CustomerInfo.email.icontains(q, autoescape=True)))
+    prefix = params.get('order_id_prefix', '').strip()
+    if prefix:
+        bounds = ids.prefix_bounds(prefix)
+        if bounds is None:
+            query = query.filter(Order.order_id.startswith(prefix, autoescape=True))
+        else:
+            low, high = bounds
+            order_id = byte_order(Order.order_id)
+            query = query.filter(order_id >= low)
+            if high is not None:
+                query = query.filter(order_id < high)
+    return query
+
+
+def get_orders_page(request):
+    """Keyset-paginated, filtered and sorted order listing"""
+    params = request.params
+    limit = pagination.parse_limit(params.get('limit'))
+    sort_key, descending = pagination.parse_sort(
+        params.get('sort'), ORDER_SORT_COLUMNS, default='-order_date')
+    cursor_key = f"-{sort_key}" if descending else sort_key
+
+    orders, next_cursor = pagination.paginate(
+        _filtered_orders_query(request),
+        cursor_key,
+        ORDER_SORT_COLUMNS[sort_key],
+        Order.id,
+        limit,
+        cursor=params.get('cursor') or None,
+        descending=descending,
+    )
+    return {
+        'orders': [order.to_dict() for order in orders],
+        'nextCursor': next_cursor,
+        'limit': limit,
+    }
+
+
+@view_config(route_name='orders', request_method='GET', renderer='json', permission=security.ADMIN)
 def get_orders(request):
-    """Get all orders"""
+    """Get orders
+
+    Without query parameters every order is returned as before. Any of
+    ``limit``, ``cursor``, ``sort`` (``order_date``, ``total`` or ``id``,
+    ``-`` for descending; default ``-order_date``), ``status`` (comma
+    separated), ``from``/``to`` (ISO date or datetime on ``order_date``),
+    ``min_total``, ``q`` (order id or customer email contains) or
+    ``order_id_prefix`` (an index range scan, e.g. ``ORD-01J`` for one time
+    span) switches to a keyset-paginated page with a ``nextCursor``.
+    """
     try:
-        orders = request.dbsession.query(Order).all()
+        if any(name in request.params for name in ORDER_PAGE_PARAMS):
+            return get_orders_page(request)
+        orders = request.dbsession.query(Order).options(*ORDER_LOAD_OPTIONS).all()
         return {'orders': [order.to_dict() for order in orders]}
+    except pagination.InvalidPageRequest as e:
+        return Response(json.dumps({'error': str(e)}), status=400, content_type='application/json; charset=UTF-8')
     except SQLAlchemyError as e:
         return Response(json.dumps({'error': str(e)}), status=500, content_type='application/json; charset=UTF-8')
 
-@view_config(route_name='order', request_method='GET', renderer='json')
+# Lookup parameters of GET /api/orders/track, the columns they match and
+# how a value is cleaned first (emails match on the unique normalized key,
+# phones in the byte order of ix_customer_info_phone_number_id)
+TRACK_PARAMS = {
+    'orderId': (Order.order_id, str.strip),
+    'email': (CustomerInfo.email_normalized, normalize_email),
+    'phone': (byte_order(CustomerInfo.phone_number), str.strip),
+}
+
+TRACK_DEFAULT_LIMIT = 20
+
+
+def _order_summary(row):
+    return {
+        'id': row.id,
+        'orderId': row.order_id,
+        'status': row.status,
+        'subtotal': float(row.subtotal) if row.subtotal else 0,
+        'shipping': float(row.shipping) if row.shipping else 0,
+        'total': float(row.total) if row.total else 0,
+        'itemCount': int(row.item_count or 0),
+        'orderDate': row.order_date.isoformat() if row.order_date else None,
+        'createdAt': row.created_at.isoformat() if row.created_at else None,
+        'updatedAt': row.updated_at.isoformat() if row.updated_at else None,
+    }
+
+
+@view_config(route_name='order_track', request_method='GET', renderer='json')
+def track_orders(request):
+    """Order summaries for a shopper, newest first
+
+    Matches ``orderId``, ``email`` (ignoring case) and/or ``phone`` exactly
+    (all given ones must match) through indexed columns, and returns status,
+    totals, dates and the number of items instead of full orders.
+    """
+    try:
+        criteria = [column == clean(request.params[name])
+                    for name, (column, clean) in TRACK_PARAMS.items()
+                    if request.params.get(name, '').strip()]
+        if not criteria:
+            return Response(json.dumps({'error': 'orderId, email or phone is required'}), status=400, content_type='application/json; charset=UTF-8')
+        limit = pagination.parse_limit(request.params.get('limit'), default=TRACK_DEFAULT_LIMIT)
+        # Correlated, so only the matched orders' items are counted
+        item_count = select(func.sum(OrderItem.quantity)) \
+            .where(OrderItem.order_id == Order.id).scalar_subquery()
+        rows = request.dbsession.execute(
+            select(Order.id, Order.order_id, Order.status, Order.subtotal, Order.shipping,
+                   Order.total, Order.order_date, Order.created_at, Order.updated_at,
+                   item_count.label('item_count'))
+            .join(CustomerInfo, Order.customer_info_id == CustomerInfo.id)
+            .where(*criteria)
+            .order_by(Order.order_date.desc(), Order.id.desc())
+            .limit(limit)
+        ).all()
+        return {'orders': [_order_summary(row) for row in rows]}
+    except pagination.InvalidPageRequest as e:
+        return Response(json.dumps({'error': str(e)}), status=400, content_type='application/json; charset=UTF-8')
+    except SQLAlchemyError as e:
+        return Response(json.dumps({'error': str(e)}), status=500, content_type='application/json; charset=UTF-8')
+
+
+@view_config(route_name='order_track', request_method='OPTIONS')
+def order_track_options(request):
+    return options_view(request)
+
+
+@view_config(route_name='order', request_method='GET', renderer='json', permission=security.ADMIN)
 def get_order(request):
     """Get single order"""
     try:
         order_id = int(request.matchdict['id'])
-        order = request.dbsession.query(Order).filter(Order.id == order_id).first()
+        order = request.dbsession.query(Order).options(*ORDER_LOAD_OPTIONS).filter(Order.id == order_id).first()
         if not order:
             return Response(json.dumps({'error': 'Order not found'}), status=404, content_type='application/json; charset=UTF-8')
         return order.to_dict()
@@ -29,88 +192,68 @@ def get_order(request):
         return Response(json.dumps({'error': str(e)}), status=400, content_type='application/json; charset=UTF-8')
     
 
-@view_config(route_name='orders', request_method='POST', renderer='json')
+@view_config(route_name='orders', request_method='POST', renderer='json', decorator=idempotent,
+             permission=security.ADMIN)
 def create_order(request):
-    """Create new order with stock validation and deduction"""
+    """Create new order, reserving its stock atomically
+
+    Admin-only: totals and status are taken from the body as given. Shoppers
+    go through ``POST /api/checkout``, which computes them.
+    """
     try:
         data = request.json_body
         
         # Use provided order ID or generate one
-        order_id = data.get('orderId') or f"ORD-{uuid.uuid4().hex[:8].upper()}"
-        
-        # Validate stock before creating order
+        order_id = data.get('orderId') or ids.new_order_id()
         items = data.get('items', [])
-        stock_errors = []
-        
-        for item_data in items:
-            product = request.dbsession.query(Product).filter(Product.id == item_data.get('id')).first()
-            if not product:
-                stock_errors.append(f'Product with id {item_data.get("id")} not found')
-            elif product.stock < item_data.get('quantity', 0):
-                stock_errors.append(f'Insufficient stock for {product.title}. Available: {product.stock}, Requested: {item_data.get("quantity")}')
         
-        if stock_errors:
-            return Response(json.dumps({'error': 'Stock validation failed', 'details': stock_errors}), 
+        # Customer info, validated like checkout's and upserted on the email
+        # once stock is reserved
+        try:
+            customer_values = checkout.clean_customer(data.get('customerInfo'))
+        except checkout.CheckoutError as e:
+            return Response(json.dumps({'error': str(e), 'details': e.details}), 
                           status=400, content_type='application/json; charset=UTF-8')
         
-        # Create or get customer info
-        customer_data = data.get('customerInfo', {})
-        customer = CustomerInfo(
-            full_name=customer_data.get('fullName'),
-            email=customer_data.get('email'),
-            address=customer_data.get('address'),
-            phone_number=customer_data.get('phoneNumber')
-        )
-        
-        # Validate customer info
-        if not all([customer.full_name, customer.email, customer.address, customer.phone_number]):
-            return Response(json.dumps({'error': 'All customer information fields are required'}), 
+        # Take the stock for every line or for none (one conditional UPDATE
+        # per product), snapshotting each product's price
+        try:
+            quantities = inventory.order_quantities(items)
+            products = inventory.reserve_stock(request.dbsession, quantities)
+        except inventory.StockError as e:
+            return Response(json.dumps({'error': str(e), 'details': e.details}), 
                           status=400, content_type='application/json; charset=UTF-8')
         
-        request.dbsession.add(customer)
-        request.dbsession.flush()  # Get customer ID
+        # A repeat shopper reuses their row, updated with these details;
+        # the order keeps its own copy of where it ships
+        customer = customers.upsert_customer(request.dbsession, customer_values)
         
         # Create order
         order = Order(
             order_id=order_id,
-            customer_info_id=customer.id,
+            customer_info=customer,
             subtotal=data.get('subtotal', 0),
             shipping=data.get('shipping', 0),
             total=data.get('total', 0),
             status=data.get('status', 'pending'),
             status_history=data.get('statusHistory', []),
-            order_date=datetime.now()
+            order_date=utcnow()  # the clock checkout.place_order uses
         )
-        request.dbsession.add(order)
-        request.dbsession.flush()  # Get order ID
-        
-        # Create order items and update stock
-        for item_data in items:
-            # Get product to ensure it exists and get current price
-            product = request.dbsession.query(Product).filter(Product.id == item_data.get('id')).first()
-            
-            # Double-check stock (race condition protection)
-            if product.stock < item_data.get('quantity', 0):
-                return Response(json.dumps({'error': f'Stock changed for {product.title}. Please refresh and try again.'}), 
-                              status=400, content_type='application/json; charset=UTF-8')
-            
-            # Create order item
-            order_item = OrderItem(
-                order_id=order.id,
-                product_id=product.id,
-                quantity=item_data.get('quantity', 1),
-                price=product.price  # Use current product price
+        order.ship_to(customer_values)
+        order.order_items = [
+            OrderItem(
+                product_id=int(item_data['id']),
+                quantity=int(item_data.get('quantity', 1)),
+                price=products[int(item_data['id'])].price  # Price at reservation time
             )
-            request.dbsession.add(order_item)
-            
-            # Update product stock
-            product.stock -= item_data.get('quantity', 1)
-            
-            # Ensure stock doesn't go negative
-            if product.stock < 0:
-                product.stock = 0
-        
+            for item_data in items
+        ]
+        request.dbsession.add(order)
         request.dbsession.flush()
+        
+        commit_hooks.after_commit(request, get_suggest_service(request.registry).items_sold,
+                                  list(quantities.items()))
+        product_cache.products_changed(request, list(quantities))
         return order.to_dict()
         
     except (ValueError, KeyError, SQLAlchemyError) as e:
@@ -123,15 +266,19 @@ def orders_options(request):
     return HTTPOk()
 
 
-@view_config(route_name='order_status', request_method='PUT', renderer='json')
+def _database_error(request, e):
+    """500 without the SQL; the view's earlier statements are rolled back"""
+    log.error(f"Database error updating orders: {e}")
+    commit_hooks.doom(request)
+    return Response(json.dumps({'error': 'Database error occurred'}), status=500,
+                    content_type='application/json; charset=UTF-8')
+
+
+@view_config(route_name='order_status', request_method='PUT', renderer='json', permission=security.ADMIN)
 def update_order_status(request):
-    """Update order status"""
+    """Update order status, following the transitions of :mod:`product_api.order_status`"""
     try:
         order_id = int(request.matchdict['id'])
-        order = request.dbsession.query(Order).filter(Order.id == order_id).first()
-        if not order:
-            return Response(json.dumps({'error': 'Order not found'}), status=404, content_type='application/json; charset=UTF-8')
-        
         data = request.json_body
         new_status = data.get('status')
         note = data.get('note', '')
@@ -139,33 +286,37 @@ def update_order_status(request):
         
         if not new_status:
             return Response(json.dumps({'error': 'Status is required'}), status=400, content_type='application/json; charset=UTF-8')
+        if new_status not in order_status.STATUSES:
+            return Response(json.dumps({'error': f"status must be one of: {', '.join(order_status.STATUSES)}"}),
+                            status=400, content_type='application/json; charset=UTF-8')
         
-        # Restore stock if status is being changed to cancelled
-        if new_status == 'cancelled' and order.status != 'cancelled':
-            for order_item in order.order_items:
-                product = order_item.product
-                if product:
-                    product.stock += order_item.quantity
-
-        # Update status
-        order.status = new_status
-        
-        # Add to status history
-        if not order.status_history:
-            order.status_history = []
+        # Locked like the batch's SELECT, so a concurrent change waits
+        order = request.dbsession.query(Order).options(*ORDER_LOAD_OPTIONS) \
+            .filter(Order.id == order_id).with_for_update(of=Order).first()
+        if not order:
+            return Response(json.dumps({'error': 'Order not found'}), status=404, content_type='application/json; charset=UTF-8')
+        if order.status == new_status:
+            return order.to_dict()
+        if not order_status.allowed_transition(order.status, new_status):
+            return Response(json.dumps({'error': f'Cannot change order status from {order.status} to {new_status}'}),
+                            status=409, content_type='application/json; charset=UTF-8')
         
-        status_update = {
-            'status': new_status,
-            'timestamp': datetime.now().isoformat(),
-            'updatedBy': updated_by,
-            'note': note
-        }
-        order.status_history.append(status_update)
+        # Restore stock if status is being changed to cancelled (once per
+        # order, in one aggregated UPDATE)
+        if new_status == order_status.CANCELLED:
+            _, products = inventory.restore_stock(request.dbsession, [order.id])
+            product_cache.products_changed(request, [product.id for product in products])
+
+        # Update status; the history gains one order_status_events row
+        order.status = new_status
+        order.add_status_event(new_status, updated_by=updated_by, note=note)
         
         return order.to_dict()
         
-    except (ValueError, KeyError, SQLAlchemyError) as e:
+    except (ValueError, KeyError) as e:
         return Response(json.dumps({'error': str(e)}), status=400, content_type='application/json; charset=UTF-8')
+    except SQLAlchemyError as e:
+        return _database_error(request, e)
 
     
 
@@ -175,12 +326,102 @@ def order_status_options(request):
     return HTTPOk()
 
 
-@view_config(route_name='order', request_method='DELETE', renderer='json')
+@view_config(route_name='order_status_batch', request_method='POST', renderer='json', permission=security.ADMIN)
+def batch_update_order_status(request):
+    """Move many orders to one status: ``{"ids": [...], "status": ..., "note": ...}``
+
+    Transitions are validated per order (see :mod:`product_api.order_status`)
+    and applied with set-based statements; the response lists a compact
+    ``{"id", "result", "from"}`` per order instead of full orders.
+    """
+    try:
+        data = request.json_body
+        if not isinstance(data, dict):
+            raise ValueError('Invalid JSON data')
+        order_ids = order_status.clean_order_ids(data.get('ids'))
+        batch = order_status.transition_orders(
+            request.dbsession, order_ids, data.get('status'),
+            note=data.get('note') or None, updated_by=data.get('updatedBy', 'admin'))
+    except ValueError as e:
+        return Response(json.dumps({'error': str(e)}), status=400, content_type='application/json; charset=UTF-8')
+    except SQLAlchemyError as e:
+        return _database_error(request, e)
+
+    commit_hooks.mark_changed(request)
+    if batch.restocked_product_ids:
+        product_cache.products_changed(request, batch.restocked_product_ids)
+    return {'status': data['status'], 'updated': batch.updated, 'results': batch.results}
+
+
+@view_config(route_name='order_status_batch', request_method='OPTIONS')
+def order_status_batch_options(request):
+    return options_view(request)
+
+
+def _restore_stock(request, order_ids):
+    batch = order_status.restore_cancelled_orders(request.dbsession, order_ids)
+    commit_hooks.mark_changed(request)
+    if batch.restocked_product_ids:
+        product_cache.products_changed(request, batch.restocked_product_ids)
+    return batch
+
+
+@view_config(route_name='order_restore_stock', request_method='POST', renderer='json', permission=security.ADMIN)
+def restore_order_stock(request):
+    """Put a cancelled order's items back in stock; a no-op if already done"""
+    try:
+        order_id = int(request.matchdict['id'])
+        batch = _restore_stock(request, [order_id])
+    except ValueError as e:
+        return Response(json.dumps({'error': str(e)}), status=400, content_type='application/json; charset=UTF-8')
+    except SQLAlchemyError as e:
+        return _database_error(request, e)
+
+    result = batch.results[0]
+    if result['result'] == order_status.NOT_FOUND:
+        return Response(json.dumps({'error': 'Order not found'}), status=404, content_type='application/json; charset=UTF-8')
+    if result['result'] == order_status.NOT_CANCELLED:
+        return Response(json.dumps({'error': 'Only cancelled orders can have their stock restored'}),
+                        status=409, content_type='application/json; charset=UTF-8')
+    return dict(result, productIds=batch.restocked_product_ids)
+
+
+@view_config(route_name='order_restore_stock', request_method='OPTIONS')
+def order_restore_stock_options(request):
+    return options_view(request)
+
+
+@view_config(route_name='order_restore_stock_batch', request_method='POST', renderer='json', permission=security.ADMIN)
+def batch_restore_order_stock(request):
+    """Restore stock of many cancelled orders: ``{"ids": [...]}``
+
+    Quantities are summed per product across all the orders and applied in
+    one statement; orders already restored are skipped.
+    """
+    try:
+        data = request.json_body
+        if not isinstance(data, dict):
+            raise ValueError('Invalid JSON data')
+        batch = _restore_stock(request, order_status.clean_order_ids(data.get('ids')))
+    except ValueError as e:
+        return Response(json.dumps({'error': str(e)}), status=400, content_type='application/json; charset=UTF-8')
+    except SQLAlchemyError as e:
+        return _database_error(request, e)
+    return {'restored': batch.count(order_status.RESTORED), 'productIds': batch.restocked_product_ids,
+            'results': batch.results}
+
+
+@view_config(route_name='order_restore_stock_batch', request_method='OPTIONS')
+def order_restore_stock_batch_options(request):
+    return options_view(request)
+
+
+@view_config(route_name='order', request_method='DELETE', renderer='json', permission=security.ADMIN)
 def delete_order(request):
     """Delete order and optionally restore stock if NOT cancelled"""
     try:
         order_id = int(request.matchdict['id'])
-        order = request.dbsession.query(Order).filter(Order.id == order_id).first()
+        order = request.dbsession.query(Order).options(*ORDER_LOAD_OPTIONS).filter(Order.id == order_id).first()
         if not order:
             return Response(json.dumps({'error': 'Order not found'}), status=404, content_type='application/json; charset=UTF-8')
 
@@ -192,16 +433,15 @@ def delete_order(request):
 
         restore_stock = data.get('restoreStock', False)
 
-        # Cegah pengembalian stok kalau order sudah cancelled
-        if restore_stock and order.status != 'cancelled':
-            for order_item in order.order_items:
-                product = order_item.product
-                if product:
-                    product.stock += order_item.quantity
+        # stock_restored mencegah pengembalian stok dua kali (mis. order yang sudah cancelled)
+        restored = []
+        if restore_stock:
+            restored, products = inventory.restore_stock(request.dbsession, [order.id])
+            product_cache.products_changed(request, [product.id for product in products])
 
         request.dbsession.delete(order)
         return {
-            'message': f"Order deleted successfully{' and stock restored' if restore_stock and order.status != 'cancelled' else ' (stock not restored)'}"
+            'message': f"Order deleted successfully{' and stock restored' if restored else ' (stock not restored)'}"
         }
 
     except (ValueError, SQLAlchemyError) as e:
@@ -214,12 +454,16 @@ def order_options(request):
     return HTTPOk()
 
 # Additional endpoint to get order by order_id (custom ID)
-@view_config(route_name='order_by_order_id', request_method='GET', renderer='json')
+@view_config(route_name='order_by_order_id', request_method='GET', renderer='json', permission=security.ADMIN)
 def get_order_by_order_id(request):
-    """Get order by custom order_id"""
+    """Get order by custom order_id
+
+    Admin-only: the full order carries the customer's contact details.
+    Shoppers look their orders up with ``GET /api/orders/track``.
+    """
     try:
         order_id = request.matchdict['order_id']
-        order = request.dbsession.query(Order).filter(Order.order_id == order_id).first()
+        order = request.dbsession.query(Order).options(*ORDER_LOAD_OPTIONS).filter(Order.order_id == order_id).first()
         if not order:
             return Response(json.dumps({'error': 'Order not found'}), status=404, content_type='application/json; charset=UTF-8')
         return order.to_dict()
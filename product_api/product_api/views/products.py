@@ -1,36 +1,337 @@
 from pyramid.response import Response
 from pyramid.view import view_config
 import json
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 from ..models import Product
+from ..models.catalog import get_catalog_state
+from ..cors import options_view
+from ..validation import MissingFieldError, clean_price, clean_product, clean_stock
+from .. import cache as product_cache
+from .. import changes as catalog_changes
+from .. import commit_hooks
+from .. import conditional
+from .. import importer
+from .. import pagination
+from .. import search
+from .. import security
+from ..suggest import get_suggest_service, DEFAULT_LIMIT as SUGGEST_DEFAULT_LIMIT, MAX_LIMIT as SUGGEST_MAX_LIMIT
 import logging
 
 log = logging.getLogger(__name__)
 
+# Sort keys accepted by GET /api/products?sort=, each backed by a (column, id) index
+PRODUCT_SORT_COLUMNS = {
+    'id': Product.id,
+    'price': Product.price,
+    'title': Product.title,
+    'stock': Product.stock,
+}
+
+PRODUCT_PAGE_PARAMS = ('limit', 'cursor', 'sort', 'min_price', 'max_price', 'in_stock')
+
+# Most ids accepted by one ?ids= / POST /api/products/batch lookup
+MAX_BATCH_IDS = 100
+# Most values read, repeats included, before the input is refused unparsed
+MAX_RAW_IDS = 4 * MAX_BATCH_IDS
+
+
+def _filtered_products_query(request):
+    """Product query with the min_price/max_price/in_stock filters applied"""
+    params = request.params
+    query = request.dbsession.query(Product)
+    if params.get('min_price') not in (None, ''):
+        query = query.filter(Product.price >= pagination.parse_decimal(params['min_price'], 'min_price'))
+    if params.get('max_price') not in (None, ''):
+        query = query.filter(Product.price <= pagination.parse_decimal(params['max_price'], 'max_price'))
+    in_stock = params.get('in_stock')
+    if in_stock not in (None, ''):
+        if in_stock.lower() in ('1', 'true', 'yes'):
+            query = query.filter(Product.stock > 0)
+        elif in_stock.lower() in ('0', 'false', 'no'):
+            query = query.filter(Product.stock <= 0)
+        else:
+            raise pagination.InvalidPageRequest('in_stock must be true or false')
+    return query
+
+
+def get_products_page(request):
+    """Keyset-paginated, filtered and sorted product listing"""
+    params = request.params
+    limit = pagination.parse_limit(params.get('limit'))
+    sort_key, descending = pagination.parse_sort(
+        params.get('sort'), PRODUCT_SORT_COLUMNS, default='id')
+    cursor_key = f"-{sort_key}" if descending else sort_key
+
+    products, next_cursor = pagination.paginate(
+        _filtered_products_query(request),
+        cursor_key,
+        PRODUCT_SORT_COLUMNS[sort_key],
+        Product.id,
+        limit,
+        cursor=params.get('cursor') or None,
+        descending=descending,
+    )
+    return {
+        'products': [product.to_dict() for product in products],
+        'nextCursor': next_cursor,
+        'limit': limit,
+    }
+
+
+def _parse_ids(values):
+    """Unique product ids in request order from a list of ints or strings"""
+    if len(values) > MAX_RAW_IDS:
+        raise pagination.InvalidPageRequest(f'At most {MAX_BATCH_IDS} ids per request')
+    ids, seen = [], set()
+    for value in values:
+        try:
+            product_id = int(value)
+        except (TypeError, ValueError):
+            raise pagination.InvalidPageRequest(f'Invalid product id: {value!r}')
+        if product_id in seen:
+            continue
+        seen.add(product_id)
+        ids.append(product_id)
+        if len(ids) > MAX_BATCH_IDS:
+            raise pagination.InvalidPageRequest(f'At most {MAX_BATCH_IDS} ids per request')
+    if not ids:
+        raise pagination.InvalidPageRequest('ids is required')
+    return ids
+
+
+def get_products_by_ids(request, ids):
+    """Products for ``ids`` (one IN query) plus the ids that do not exist"""
+    found = {product.id: product for product in
+             request.dbsession.query(Product).filter(Product.id.in_(ids))}
+    missing = [product_id for product_id in ids if product_id not in found]
+    cache = product_cache.get_product_cache(request.registry)
+    if cache is None:
+        return {'products': [found[pid].to_dict() for pid in ids if pid in found], 'missing': missing}
+
+    # Splice the cached per-product JSON instead of re-encoding it
+    generation = cache.generation
+    bodies = []
+    for product_id in ids:
+        product = found.get(product_id)
+        if product is None:
+            continue
+        body = cache.get(product_id, product.version)
+        if body is None:
+            body = product_cache.encode(product.to_dict())
+            cache.put(product_id, body, generation, product.version)
+        bodies.append(body)
+    body = b'{"products": [' + b', '.join(bodies) + b'], "missing": ' + product_cache.encode(missing) + b'}'
+    response = Response(body=body, content_type='application/json', charset='UTF-8')
+    for name in ('ETag', 'Last-Modified', 'Cache-Control'):
+        if name in request.response.headers:
+            response.headers[name] = request.response.headers[name]
+    return response
+
+
 @view_config(route_name='products', request_method='GET', renderer='json')
 def get_products(request):
-    """Get all products"""
+    """Get products
+
+    Without query parameters the whole catalog is returned as before. Any of
+    ``limit``, ``cursor``, ``sort``, ``min_price``, ``max_price`` or
+    ``in_stock`` switches to a keyset-paginated page with a ``nextCursor``;
+    ``ids=1,5,9`` returns just those products and the ids not found.
+    """
     try:
+        version, updated_at = get_catalog_state(request.dbsession)
+        etag = conditional.catalog_etag(version)
+        if conditional.not_modified(request, etag, updated_at):
+            return conditional.not_modified_response(etag, updated_at)
+        conditional.set_validators(request.response, etag, updated_at)
+        if 'ids' in request.params:
+            return get_products_by_ids(request, _parse_ids(request.params['ids'].split(',', MAX_RAW_IDS)))
+        if any(name in request.params for name in PRODUCT_PAGE_PARAMS):
+            return get_products_page(request)
+        cache = product_cache.get_product_cache(request.registry)
+        if cache is not None:
+            body = cache.get_list(version)
+            if body is not None:
+                return _cached_json_response(body, 'HIT', etag, updated_at)
+            generation = cache.generation
+            products = request.dbsession.query(Product).all()
+            body = product_cache.encode({'products': [product.to_dict() for product in products]})
+            cache.put_list(body, generation, version)
+            return _cached_json_response(body, 'MISS', etag, updated_at)
         products = request.dbsession.query(Product).all()
         return {'products': [product.to_dict() for product in products]}
+    except pagination.InvalidPageRequest as e:
+        return Response(json.dumps({'error': str(e)}), status=400, content_type='application/json; charset=UTF-8')
     except SQLAlchemyError as e:
         log.error(f"Error getting products: {e}")
         return Response(json.dumps({'error': str(e)}), status=500, content_type='application/json; charset=UTF-8')
 
+@view_config(route_name='product_search', request_method='GET', renderer='json')
+def search_products(request):
+    """Full-text search over product title and description, best match first"""
+    q = (request.params.get('q') or '').strip()
+    if not q:
+        return Response(json.dumps({'error': 'q is required'}), status=400, content_type='application/json; charset=UTF-8')
+    try:
+        limit = pagination.parse_limit(request.params.get('limit'),
+                                       default=search.DEFAULT_LIMIT, maximum=search.MAX_LIMIT)
+        results = search.search_products(request.dbsession, q, limit=limit)
+        return {
+            'query': q,
+            'products': [dict(product.to_dict(), rank=rank) for product, rank in results],
+        }
+    except pagination.InvalidPageRequest as e:
+        return Response(json.dumps({'error': str(e)}), status=400, content_type='application/json; charset=UTF-8')
+    except SQLAlchemyError as e:
+        log.error(f"Error searching products for {q!r}: {e}")
+        return Response(json.dumps({'error': 'Search failed'}), status=500, content_type='application/json; charset=UTF-8')
+
+@view_config(route_name='product_suggest', request_method='GET', renderer='json')
+def suggest_products(request):
+    """Type-ahead title suggestions for a prefix, most popular first"""
+    prefix = request.params.get('prefix') or ''
+    if not prefix.strip():
+        return Response(json.dumps({'error': 'prefix is required'}), status=400, content_type='application/json; charset=UTF-8')
+    try:
+        limit = pagination.parse_limit(request.params.get('limit'),
+                                       default=SUGGEST_DEFAULT_LIMIT, maximum=SUGGEST_MAX_LIMIT)
+        index = get_suggest_service(request.registry).get_index(request.dbsession)
+        return {'prefix': prefix, 'suggestions': index.lookup(prefix, limit=limit)}
+    except pagination.InvalidPageRequest as e:
+        return Response(json.dumps({'error': str(e)}), status=400, content_type='application/json; charset=UTF-8')
+    except SQLAlchemyError as e:
+        log.error(f"Error loading suggest index: {e}")
+        return Response(json.dumps({'error': 'Suggestions unavailable'}), status=500, content_type='application/json; charset=UTF-8')
+
+@view_config(route_name='product_changes', request_method='GET', renderer='json')
+def get_product_changes(request):
+    """Product upserts and tombstones committed after ``since``
+
+    Without ``since`` only ``nextSince`` is returned: the position to poll
+    from after (re)loading the full list.
+    """
+    try:
+        since = request.params.get('since')
+        if since in (None, ''):
+            return {'changes': [], 'nextSince': catalog_changes.latest_seq(request.dbsession), 'hasMore': False}
+        try:
+            since = int(since)
+        except ValueError:
+            raise pagination.InvalidPageRequest('since must be an integer')
+        if since < 0:
+            raise pagination.InvalidPageRequest('since must be an integer')
+        limit = pagination.parse_limit(request.params.get('limit'),
+                                       default=catalog_changes.DEFAULT_LIMIT, maximum=catalog_changes.MAX_LIMIT)
+        changes, next_since, has_more = catalog_changes.read_changes(request.dbsession, since, limit=limit)
+        return {'changes': changes, 'nextSince': next_since, 'hasMore': has_more}
+    except catalog_changes.ChangesExpired:
+        return Response(json.dumps({'error': 'Changes since this position are no longer retained; reload /api/products',
+                                    'nextSince': catalog_changes.latest_seq(request.dbsession)}),
+                        status=410, content_type='application/json; charset=UTF-8')
+    except pagination.InvalidPageRequest as e:
+        return Response(json.dumps({'error': str(e)}), status=400, content_type='application/json; charset=UTF-8')
+    except SQLAlchemyError as e:
+        log.error(f"Error reading product changes: {e}")
+        return Response(json.dumps({'error': 'Changes unavailable'}), status=500, content_type='application/json; charset=UTF-8')
+
+@view_config(route_name='product_batch', request_method='POST', renderer='json')
+def get_products_batch(request):
+    """Look up ``{"ids": [...]}`` in one query, e.g. to revalidate a cart"""
+    try:
+        ids = request.json_body.get('ids') if isinstance(request.json_body, dict) else None
+        if not isinstance(ids, list):
+            raise pagination.InvalidPageRequest('ids must be a list')
+        return get_products_by_ids(request, _parse_ids(ids))
+    except pagination.InvalidPageRequest as e:
+        return Response(json.dumps({'error': str(e)}), status=400, content_type='application/json; charset=UTF-8')
+    except ValueError:
+        return Response(json.dumps({'error': 'Invalid JSON body'}), status=400, content_type='application/json; charset=UTF-8')
+    except SQLAlchemyError as e:
+        log.error(f"Error in batch product lookup: {e}")
+        return Response(json.dumps({'error': str(e)}), status=500, content_type='application/json; charset=UTF-8')
+
+@view_config(route_name='product_batch', request_method='OPTIONS')
+def product_batch_options(request):
+    """CORS preflight for the JSON POST"""
+    return options_view(request)
+
+@view_config(route_name='product_import', request_method='POST', renderer='json', permission=security.ADMIN)
+def bulk_import_products(request):
+    """Create or update (by ``sku``) products from a CSV or NDJSON body
+
+    The body is parsed as it is read; ``format=csv|ndjson`` overrides the
+    format implied by the Content-Type. Invalid rows are skipped and listed
+    in ``errors``.
+    """
+    fmt = request.params.get('format') or importer.format_for(request.content_type)
+    if fmt not in importer.FORMATS:
+        return Response(json.dumps({'error': 'format must be csv or ndjson'}), status=400, content_type='application/json; charset=UTF-8')
+    try:
+        commit_hooks.mark_changed(request)
+        report = importer.import_products(request.dbsession, importer.iter_records(request.body_file, fmt))
+    except UnicodeDecodeError as e:
+        # Batches before the bad bytes are already written; keep none of them
+        commit_hooks.doom(request)
+        return Response(json.dumps({'error': f'Body is not valid UTF-8: {e}'}), status=400, content_type='application/json; charset=UTF-8')
+    except SQLAlchemyError as e:
+        log.error(f"Database error importing products: {e}")
+        commit_hooks.doom(request)
+        return Response(json.dumps({'error': 'Database error occurred'}), status=500, content_type='application/json; charset=UTF-8')
+    if report.imported:
+        commit_hooks.after_commit(request, get_suggest_service(request.registry).refresh)
+        product_cache.products_changed(request)
+    log.info(f"Imported {report.imported} products, {report.failed} rows rejected")
+    return report.to_dict()
+
+@view_config(route_name='product_import', request_method='OPTIONS')
+def product_import_options(request):
+    """CORS preflight for the upload"""
+    return options_view(request)
+
+def _cached_json_response(body, cache_state, etag, last_modified):
+    """Response for pre-encoded JSON, tagged with X-Cache: HIT/MISS"""
+    response = Response(body=body, content_type='application/json', charset='UTF-8')
+    response.headers['X-Cache'] = cache_state
+    return conditional.set_validators(response, etag, last_modified)
+
 @view_config(route_name='product', request_method='GET', renderer='json')
 def get_product(request):
     """Get single product"""
     try:
         product_id = int(request.matchdict['id'])
+        validators = request.dbsession.execute(
+            select(Product.version, Product.updated_at).where(Product.id == product_id)
+        ).first()
+        if not validators:
+            return Response(json.dumps({'error': 'Product not found'}), status=404, content_type='application/json; charset=UTF-8')
+        version, updated_at = validators
+        etag = conditional.product_etag(product_id, version)
+        if conditional.not_modified(request, etag, updated_at):
+            return conditional.not_modified_response(etag, updated_at)
+
+        cache = product_cache.get_product_cache(request.registry)
+        if cache is not None:
+            body = cache.get(product_id, version)
+            if body is not None:
+                return _cached_json_response(body, 'HIT', etag, updated_at)
+            generation = cache.generation
         product = request.dbsession.query(Product).filter(Product.id == product_id).first()
         if not product:
             return Response(json.dumps({'error': 'Product not found'}), status=404, content_type='application/json; charset=UTF-8')
+        # Validators describe the row actually serialized, even if it changed
+        # since the first lookup
+        etag = conditional.product_etag(product.id, product.version)
+        if cache is not None:
+            body = product_cache.encode(product.to_dict())
+            cache.put(product_id, body, generation, product.version)
+            return _cached_json_response(body, 'MISS', etag, product.updated_at)
+        conditional.set_validators(request.response, etag, product.updated_at)
         return product.to_dict()
     except (ValueError, SQLAlchemyError) as e:
         log.error(f"Error getting product {request.matchdict.get('id')}: {e}")
         return Response(json.dumps({'error': str(e)}), status=400, content_type='application/json; charset=UTF-8')
 
-@view_config(route_name='products', request_method='POST', renderer='json', accept='application/json; charset=UTF-8')
+@view_config(route_name='products', request_method='POST', renderer='json', accept='application/json; charset=UTF-8', permission=security.ADMIN)
 def create_product(request):
     """Create new product"""
     try:
@@ -53,26 +354,23 @@ def create_product(request):
                 )
         
         # Validate required fields
-        required_fields = ['title', 'description', 'price']
-        for field in required_fields:
-            if not data.get(field):
-                return Response(
-                    json.dumps({'error': f'{field} is required'}), 
-                    status=400, 
-                    content_type='application/json; charset=UTF-8'
-                )
+        try:
+            fields = clean_product(data)
+        except MissingFieldError as e:
+            return Response(
+                json.dumps({'error': str(e)}), 
+                status=400, 
+                content_type='application/json; charset=UTF-8'
+            )
         
         # Create product
-        product = Product(
-            title=data.get('title'),
-            description=data.get('description'),
-            price=float(data.get('price')),
-            stock=int(data.get('stock', 0)),
-            image=data.get('image')
-        )
+        product = Product(**fields)
         
         request.dbsession.add(product)
         request.dbsession.flush()  # Flush to get the ID
+        commit_hooks.after_commit(request, get_suggest_service(request.registry).product_saved,
+                                  product.id, product.title)
+        product_cache.products_changed(request, [product.id])
         
         log.info(f"Product created successfully: {product.id}")
         return Response(
@@ -103,7 +401,7 @@ def create_product(request):
             content_type='application/json; charset=UTF-8'
         )
 
-@view_config(route_name='product', request_method='PUT', renderer='json', accept='application/json; charset=UTF-8')
+@view_config(route_name='product', request_method='PUT', renderer='json', accept='application/json; charset=UTF-8', permission=security.ADMIN)
 def update_product(request):
     """Update product"""
     try:
@@ -137,12 +435,17 @@ def update_product(request):
         if 'description' in data:
             product.description = data['description']
         if 'price' in data:
-            product.price = float(data['price'])
+            product.price = clean_price(data['price'])
         if 'stock' in data:
-            product.stock = int(data['stock'])
+            product.stock = clean_stock(data['stock'])
         if 'image' in data:
             product.image = data['image']
+        if 'sku' in data:
+            product.sku = data['sku'] or None
         
+        commit_hooks.after_commit(request, get_suggest_service(request.registry).product_saved,
+                                  product.id, product.title)
+        product_cache.products_changed(request, [product.id])
         log.info(f"Product updated successfully: {product.id}")
         return Response(
             json.dumps(product.to_dict()),
@@ -172,7 +475,7 @@ def update_product(request):
             content_type='application/json; charset=UTF-8'
         )
 
-@view_config(route_name='product', request_method='DELETE', renderer='json')
+@view_config(route_name='product', request_method='DELETE', renderer='json', permission=security.ADMIN)
 def delete_product(request):
     """Delete product"""
     try:
@@ -187,6 +490,9 @@ def delete_product(request):
             )
         
         request.dbsession.delete(product)
+        commit_hooks.after_commit(request, get_suggest_service(request.registry).product_deleted,
+                                  product_id)
+        product_cache.products_changed(request, [product_id])
         log.info(f"Product deleted successfully: {product_id}")
         
         return Response(
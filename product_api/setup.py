@@ -56,6 +56,11 @@ setup(
         ],
         'console_scripts': [
             'initialize_product_api_db=product_api.scripts.initialize_db:main',
+            'import_product_api_products=product_api.scripts.import_products:main',
+            'export_product_api_data=product_api.scripts.export_data:main',
+            'prune_product_api_changes=product_api.scripts.prune_changes:main',
+            'expire_product_api_orders=product_api.scripts.expire_orders:main',
+            'dedupe_product_api_customers=product_api.scripts.dedupe_customers:main',
         ],
     },
 )
@@ -2,12 +2,15 @@
 import pytest
 import os
 import sys
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from pyramid import testing
 from pyramid.testing import DummyRequest
 from webtest import TestApp
 
+# Full-app tests sign admin tokens with this; the app refuses to start without one
+os.environ.setdefault('PRODUCT_API_JWT_SECRET', 'test-secret-' + 'x' * 32)
+
 # Add the project root to Python path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -44,6 +47,26 @@ def dbsession(engine, tables):
     transaction.rollback()
     connection.close()
 
+@pytest.fixture
+def count_queries(engine):
+    """Count the SQL statements executed inside a ``with count_queries() as queries:`` block"""
+    from contextlib import contextmanager
+
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    return counter
+
 @pytest.fixture
 def config():
     """Create Pyramid test configuration"""
@@ -202,4 +225,28 @@ def multiple_products(dbsession):
 @pytest.fixture
 def jwt_secret():
     """JWT secret for testing"""
-    return "test-secret-key-for-jwt-tokens"
\ No newline at end of file
+    return "test-secret-key-for-jwt-tokens"
+@pytest.fixture
+def seed_admin():
+    """Add an admin straight to a TestApp's database, as create_admin.py does"""
+    def seed(app, username, password):
+        dbsession = app.app.registry['dbsession_factory']()
+        try:
+            if dbsession.query(Admin).filter(Admin.username == username).first() is None:
+                admin = Admin(username=username)
+                admin.set_password(password)
+                dbsession.add(admin)
+                dbsession.commit()
+        finally:
+            dbsession.close()
+    return seed
+
+@pytest.fixture
+def admin_headers(seed_admin):
+    """Seed an admin into a TestApp's database and log in; returns its Authorization header"""
+    def login(app):
+        credentials = {'username': 'testadmin', 'password': 'testpassword123'}
+        seed_admin(app, **credentials)
+        token = app.post_json('/api/admin/login', credentials).json['token']
+        return {'Authorization': f'Bearer {token}'}
+    return login
@@ -0,0 +1,123 @@
+import time
+from decimal import Decimal
+
+import pytest
+import transaction
+from sqlalchemy.exc import OperationalError
+
+from product_api import checkout
+from product_api.models.meta import utcnow
+from product_api.models.order import Order
+from product_api.models.product import Product
+from product_api.views import orders
+from product_api.views.checkout import checkout_order
+
+CUSTOMER = {'fullName': 'John Doe', 'email': 'john@example.com',
+            'address': '123 Main St', 'phoneNumber': '555-1234'}
+
+
+def add_products(dbsession):
+    products = [Product(title='Pen', description='Blue', price=Decimal('0.10'), stock=100),
+                Product(title='Pad', description='A5', price=Decimal('2.20'), stock=1)]
+    dbsession.add_all(products)
+    dbsession.flush()
+    return products
+
+
+class TestCheckout:
+    def test_prices_cart_server_side(self, dummy_request, dbsession):
+        """Test totals come from product prices in Decimal, not the client"""
+        pen, pad = add_products(dbsession)
+        dummy_request.json_body = {'customerInfo': CUSTOMER, 'total': 1,
+                                   'items': [{'id': pen.id, 'quantity': 3}, {'id': pad.id, 'quantity': 1}]}
+        response = checkout_order(dummy_request)
+
+        assert response['subtotal'] == 2.5
+        assert response['total'] == 2.5
+        assert response['status'] == 'pending'
+        assert response['customerInfo']['email'] == 'john@example.com'
+        assert {item['productId']: item['product']['stock'] for item in response['items']} == {
+            pen.id: 97, pad.id: 0}
+        order = dbsession.query(Order).filter(Order.order_id == response['orderId']).one()
+        assert order.subtotal == Decimal('2.5')
+
+    def test_short_stock_writes_nothing(self, dummy_request, dbsession):
+        """Test a cart that cannot be filled creates no order and takes no stock"""
+        pen, pad = add_products(dbsession)
+        dummy_request.json_body = {'customerInfo': CUSTOMER,
+                                   'items': [{'id': pen.id, 'quantity': 1}, {'id': pad.id, 'quantity': 2}]}
+        response = checkout_order(dummy_request)
+
+        assert response.status_code == 400
+        assert response.json_body['details'] == ['Insufficient stock for Pad. Available: 1, Requested: 2']
+        dbsession.expire_all()
+        assert pen.stock == 100
+        assert dbsession.query(Order).count() == 0
+
+    def test_rejects_missing_customer_fields(self, dummy_request, dbsession):
+        """Test every customer field is required"""
+        pen, _ = add_products(dbsession)
+        dummy_request.json_body = {'customerInfo': dict(CUSTOMER, email=' '),
+                                   'items': [{'id': pen.id, 'quantity': 1}]}
+        response = checkout_order(dummy_request)
+        assert response.status_code == 400
+        assert response.json_body['details'] == ['email']
+
+    @pytest.mark.parametrize('create', [checkout_order, orders.create_order])
+    def test_rejects_non_string_customer_fields(self, dummy_request, dbsession, create):
+        """Test a customer field that is not a string is a 400 in both order views"""
+        pen, _ = add_products(dbsession)
+        dummy_request.json_body = {'customerInfo': dict(CUSTOMER, email=['john@example.com'], phoneNumber=5551234),
+                                   'items': [{'id': pen.id, 'quantity': 1}]}
+        response = create(dummy_request)
+        assert response.status_code == 400
+        assert response.json_body['details'] == ['email', 'phoneNumber']
+        dbsession.expire_all()
+        assert pen.stock == 100
+
+    def test_rejects_empty_cart(self, dbsession):
+        """Test an order needs at least one line"""
+        with pytest.raises(checkout.CheckoutError, match='items is required'):
+            checkout.place_order(dbsession, CUSTOMER, [])
+
+    def test_query_count_is_independent_of_response(self, dummy_request, dbsession, count_queries):
+        """Test the returned order is serialized without extra product loads"""
+        pen, pad = add_products(dbsession)
+        dummy_request.json_body = {'customerInfo': CUSTOMER,
+                                   'items': [{'id': pen.id, 'quantity': 1}, {'id': pad.id, 'quantity': 1}]}
+        with count_queries() as queries:
+            checkout_order(dummy_request)
+        assert not [statement for statement in queries if statement.startswith('SELECT')]
+
+    def test_database_error_is_doomed(self, dummy_request, dbsession, monkeypatch):
+        """Test a failure after the stock is taken does not commit the reservation"""
+        pen, _ = add_products(dbsession)
+
+        def fail(*args, **kwargs):
+            raise OperationalError('INSERT INTO customer_info ...', (), Exception('disk I/O error'))
+        monkeypatch.setattr(checkout, 'upsert_customer', fail)
+        dummy_request.tm = transaction.TransactionManager()
+        dummy_request.tm.begin()
+        dummy_request.json_body = {'customerInfo': CUSTOMER, 'items': [{'id': pen.id, 'quantity': 1}]}
+        response = checkout_order(dummy_request)
+        assert response.status_code == 500
+        assert response.json_body == {'error': 'Database error occurred'}
+        assert dummy_request.tm.isDoomed()
+        dummy_request.tm.abort()
+
+    def test_admin_and_checkout_orders_share_a_clock(self, dummy_request, dbsession, monkeypatch):
+        """Test both ways of creating an order stamp order_date in UTC"""
+        pen, _ = add_products(dbsession)
+        monkeypatch.setenv('TZ', 'Asia/Tokyo')
+        time.tzset()
+        try:
+            before = utcnow()
+            placed = checkout.place_order(dbsession, CUSTOMER, [{'id': pen.id, 'quantity': 1}])
+            dummy_request.json_body = {'customerInfo': CUSTOMER, 'items': [{'id': pen.id, 'quantity': 1}]}
+            created = orders.create_order(dummy_request)
+            after = utcnow()
+        finally:
+            monkeypatch.undo()
+            time.tzset()
+        assert before <= placed.order_date <= after
+        assert before.isoformat() <= created['orderDate'] <= after.isoformat()
@@ -625,12 +625,12 @@ class TestIntegration:
         order_id = order_response['id']
         dummy_request.matchdict = {'id': str(order_id)}
         dummy_request.json_body = {
-            'status': 'shipped',
+            'status': 'shipping',
             'note': 'Order shipped via FedEx'
         }
         
         status_response = orders.update_order_status(dummy_request)
-        assert status_response['status'] == 'shipped'
+        assert status_response['status'] == 'shipping'
         assert len(status_response['statusHistory']) == 1
     
     def test_admin_authentication_flow(self, dummy_request, dbsession):
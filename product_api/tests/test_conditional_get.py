@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+from webob.datetime_utils import serialize_date
+
+from product_api import cache
+from product_api.models.catalog import get_catalog_state
+from product_api.models.product import Product
+from product_api.views import products
+
+
+def add_product(dbsession, **fields):
+    product = Product(**dict(dict(title="Lamp", description="d", price=10, stock=5), **fields))
+    dbsession.add(product)
+    dbsession.flush()
+    return product
+
+
+class TestCatalogVersion:
+    def test_bumped_once_per_commit_with_product_writes(self, dbsession):
+        """Test the catalog version follows product inserts, updates and deletes"""
+        start, _ = get_catalog_state(dbsession)
+        product = add_product(dbsession)
+        product.stock = 4
+        dbsession.flush()
+        dbsession.commit()
+        assert get_catalog_state(dbsession)[0] == start + 1
+
+        dbsession.delete(product)
+        dbsession.commit()
+        assert get_catalog_state(dbsession)[0] == start + 2
+
+        dbsession.commit()
+        assert get_catalog_state(dbsession)[0] == start + 2
+
+    def test_product_version_increments_on_update(self, dbsession):
+        """Test every UPDATE bumps the row version"""
+        product = add_product(dbsession)
+        assert product.version == 1
+        product.price = 12
+        dbsession.flush()
+        assert product.version == 2
+
+
+class TestConditionalGet:
+    def test_product_etag_round_trip(self, dummy_request, dbsession):
+        """Test a matching If-None-Match gets 304 until the product changes"""
+        product = add_product(dbsession)
+        dummy_request.matchdict = {'id': str(product.id)}
+
+        assert products.get_product(dummy_request) == product.to_dict()
+        etag = dummy_request.response.headers['ETag']
+        assert dummy_request.response.headers['Cache-Control'] == 'no-cache'
+
+        dummy_request.headers = {'If-None-Match': etag}
+        response = products.get_product(dummy_request)
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag
+
+        product.stock = 1
+        dbsession.flush()
+        assert products.get_product(dummy_request)['stock'] == 1
+
+    def test_product_if_modified_since(self, dummy_request, dbsession):
+        """Test If-Modified-Since is honoured when no ETag is sent"""
+        product = add_product(dbsession)
+        dummy_request.matchdict = {'id': str(product.id)}
+
+        dummy_request.headers = {'If-Modified-Since': serialize_date(product.updated_at + timedelta(seconds=1))}
+        assert products.get_product(dummy_request).status_code == 304
+        dummy_request.headers = {'If-Modified-Since': serialize_date(product.updated_at - timedelta(seconds=5))}
+        assert products.get_product(dummy_request)['id'] == product.id
+
+    def test_catalog_etag_changes_with_catalog(self, config, dummy_request, dbsession):
+        """Test the list 304s from catalog_state and cached bodies match their ETag"""
+        config.registry['product_cache'] = cache.ProductCache()
+        add_product(dbsession)
+        dbsession.commit()
+
+        first = products.get_products(dummy_request)
+        etag = first.headers['ETag']
+        dummy_request.headers = {'If-None-Match': etag}
+        assert products.get_products(dummy_request).status_code == 304
+
+        add_product(dbsession, title="Chair")
+        dbsession.commit()
+        response = products.get_products(dummy_request)
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        assert response.headers['X-Cache'] == 'MISS'
+        assert "Chair" in response.text
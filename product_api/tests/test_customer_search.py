@@ -0,0 +1,109 @@
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from product_api.models.customer_info import CustomerInfo
+from product_api.models.order import Order
+from product_api.views import customer_info
+
+PEOPLE = [
+    ('Amy Pond', 'amy@example.com', '555-0101'),
+    ('Amelia Williams', 'AMELIA@example.com', '555-0102'),
+    ('Rory Williams', 'rory@example.com', '555-0201'),
+    ('River Song', 'river_song@example.com', '555-0301'),
+    ('Clara 100%', 'clara@example.com', '777-0001'),
+]
+
+
+def add_customers(dbsession):
+    customers = [CustomerInfo(full_name=name, email=email, address='1 Main Street', phone_number=phone)
+                 for name, email, phone in PEOPLE]
+    dbsession.add_all(customers)
+    dbsession.flush()
+    return customers
+
+
+def search(dummy_request, **params):
+    dummy_request.params = params
+    return customer_info.get_customers(dummy_request)
+
+
+class TestCustomerSearch:
+    def test_prefix_searches(self, dummy_request, dbsession):
+        """Test name and email ignore case, each search sorts on its own column"""
+        add_customers(dbsession)
+        names = lambda response: [c['fullName'] for c in response['customers']]
+
+        assert names(search(dummy_request, name='am')) == ['Amelia Williams', 'Amy Pond']
+        assert names(search(dummy_request, email='R')) == ['River Song', 'Rory Williams']
+        assert names(search(dummy_request, phone='555-01')) == ['Amy Pond', 'Amelia Williams']
+        assert names(search(dummy_request, q='r')) == ['Rory Williams', 'River Song']
+        assert names(search(dummy_request, q='777')) == ['Clara 100%']
+        # Wildcards in the search are literal
+        assert names(search(dummy_request, name='clara 100%')) == ['Clara 100%']
+        assert names(search(dummy_request, email='river_')) == ['River Song']
+        assert names(search(dummy_request, email='river%')) == []
+
+    def test_prefix_ending_in_punctuation(self, dummy_request, dbsession):
+        """Test a prefix ending in punctuation only matches that punctuation"""
+        add_customers(dbsession)
+        dbsession.add(CustomerInfo(full_name='Nardole', email='nardole@example.com',
+                                   address='1 Main Street', phone_number='5551234'))
+        dbsession.flush()
+        response = search(dummy_request, phone='555-')
+        assert [c['phoneNumber'] for c in response['customers']] == ['555-0101', '555-0102', '555-0201', '555-0301']
+
+    def test_ranges_compare_in_byte_order_on_postgresql(self):
+        """Test the prefix range and its sort use COLLATE "C", like their indexes"""
+        criteria, sort = customer_info._search_criteria({'phone': '555-'})
+        statement = select(CustomerInfo.id).where(*criteria).order_by(customer_info.CUSTOMER_SORT_COLUMNS[sort])
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        assert sql.count('customer_info.phone_number COLLATE "C"') == 3
+        assert 'COLLATE' not in str(statement.compile(dialect=sqlite.dialect()))
+
+    def test_keyset_pages(self, dummy_request, dbsession):
+        """Test cursors walk every customer once, in order, in both directions"""
+        add_customers(dbsession)
+        for sort in ('name', '-name', 'email', 'id'):
+            seen, cursor = [], None
+            while True:
+                params = {'sort': sort, 'limit': '2'}
+                if cursor:
+                    params['cursor'] = cursor
+                response = search(dummy_request, **params)
+                seen += [c['fullName'] for c in response['customers']]
+                cursor = response['nextCursor']
+                if cursor is None:
+                    break
+            assert len(seen) == len(PEOPLE)
+            if sort == 'name':
+                assert seen == sorted(name for name, _, _ in PEOPLE)
+            if sort == '-name':
+                assert seen == sorted((name for name, _, _ in PEOPLE), reverse=True)
+
+    def test_stats_in_one_query(self, dummy_request, dbsession, count_queries):
+        """Test order aggregates come from one grouped query for the page"""
+        amy, amelia, *_ = add_customers(dbsession)
+        for i, (customer, total, day) in enumerate([(amy, 10, 1), (amy, 15, 3), (amelia, 7, 2)]):
+            dbsession.add(Order(order_id=f'ORD-S{i}', customer_info=customer, subtotal=total, shipping=0,
+                                total=total, status='pending', order_date=datetime(2026, 10, day)))
+        dbsession.flush()
+
+        with count_queries() as queries:
+            response = search(dummy_request, name='am', stats='1')
+        assert len(queries) == 2
+        stats = {c['fullName']: (c['orderCount'], c['lifetimeTotal'], c['lastOrderDate'])
+                 for c in response['customers']}
+        assert stats == {'Amy Pond': (2, 25.0, '2026-10-03T00:00:00'),
+                         'Amelia Williams': (1, 7.0, '2026-10-02T00:00:00')}
+        assert search(dummy_request, name='rory', stats='1')['customers'][0]['orderCount'] == 0
+
+    def test_invalid_parameters(self, dummy_request, dbsession):
+        """Test unknown sorts, bad limits and cursors of another sort are 400"""
+        add_customers(dbsession)
+        cursor = search(dummy_request, sort='email', limit='1')['nextCursor']
+        for params in ({'sort': 'address'}, {'limit': '0'}, {'name': 'a', 'cursor': '???'},
+                       {'sort': 'name', 'cursor': cursor}):
+            dummy_request.params = params
+            assert customer_info.get_customers(dummy_request).status_code == 400
@@ -0,0 +1,100 @@
+from decimal import Decimal
+
+from sqlalchemy import insert
+
+from product_api import checkout, customers
+from product_api.models.customer_info import CustomerInfo
+from product_api.models.order import Order
+from product_api.models.product import Product
+from product_api.views import customer_info, orders
+
+CUSTOMER = {'fullName': 'Amy Pond', 'email': 'amy@example.com',
+            'address': '1 Leadworth Lane', 'phoneNumber': '555-0101'}
+
+
+def add_legacy_customer(dbsession, email, full_name='Amy'):
+    """A row from before email_normalized existed"""
+    return dbsession.execute(insert(CustomerInfo).values(
+        full_name=full_name, email=email, address='Old address', phone_number='555-0000',
+    )).inserted_primary_key[0]
+
+
+def add_order(dbsession, order_id, customer_id):
+    dbsession.add(Order(order_id=order_id, customer_info_id=customer_id, subtotal=1,
+                        shipping=0, total=1, status='pending'))
+    dbsession.flush()
+
+
+class TestUpsert:
+    def test_repeat_shopper_reuses_row(self, dbsession):
+        """Test orders with the same email, in any case, share one customer with the latest details"""
+        pen = Product(title='Pen', description='Blue', price=Decimal('1.00'), stock=10)
+        dbsession.add(pen)
+        dbsession.flush()
+        items = [{'id': pen.id, 'quantity': 1}]
+        first = checkout.place_order(dbsession, CUSTOMER, items)
+        second = checkout.place_order(
+            dbsession, dict(CUSTOMER, email=' AMY@Example.com', address='2 New Street'), items)
+
+        assert first.customer_info_id == second.customer_info_id
+        assert dbsession.query(CustomerInfo).count() == 1
+        customer = second.customer_info
+        assert (customer.email, customer.address) == ('AMY@Example.com', '2 New Street')
+        assert customer.email_normalized == 'amy@example.com'
+        # ...but the first order still ships where it was sent
+        assert first.to_dict()['customerInfo']['address'] == '1 Leadworth Lane'
+        assert second.to_dict()['customerInfo']['address'] == '2 New Street'
+
+    def test_upsert_is_one_statement(self, dbsession, count_queries):
+        """Test an existing customer is updated by the INSERT itself"""
+        values = {'full_name': 'Amy', 'email': 'amy@example.com', 'address': 'x', 'phone_number': '1'}
+        customers.upsert_customer(dbsession, values)
+        with count_queries() as queries:
+            customer = customers.upsert_customer(dbsession, dict(values, phone_number='2'))
+        assert len(queries) == 1
+        assert customer.phone_number == '2'
+
+    def test_tracking_ignores_case(self, dummy_request, dbsession):
+        """Test order tracking finds a customer's orders whatever the email's case"""
+        customer = customers.upsert_customer(dbsession, {'full_name': 'Amy', 'email': 'Amy@Example.com',
+                                                         'address': 'x', 'phone_number': '1'})
+        add_order(dbsession, 'ORD-C1', customer.id)
+        dummy_request.params = {'email': 'amy@EXAMPLE.com'}
+        assert [o['orderId'] for o in orders.track_orders(dummy_request)['orders']] == ['ORD-C1']
+
+    def test_create_and_update_reject_taken_email(self, dummy_request, dbsession, sample_customer):
+        """Test POST and PUT /api/customers answer 409 for another customer's email"""
+        dummy_request.json_body = dict(CUSTOMER, email='John.Doe@example.com ')
+        assert customer_info.create_customer(dummy_request).status_code == 409
+
+        dummy_request.json_body = CUSTOMER
+        amy = customer_info.create_customer(dummy_request)
+        dummy_request.matchdict = {'id': str(amy['id'])}
+        dummy_request.json_body = {'email': 'JOHN.DOE@example.com'}
+        assert customer_info.update_customer(dummy_request).status_code == 409
+        dummy_request.json_body = {'email': 'AMY@example.com'}
+        assert customer_info.update_customer(dummy_request)['email'] == 'AMY@example.com'
+
+
+class TestMerge:
+    def test_merges_and_repoints_orders(self, dbsession):
+        """Test the oldest row survives with the newest details and gets every order"""
+        oldest = add_legacy_customer(dbsession, 'amy@example.com', 'Amy')
+        middle = add_legacy_customer(dbsession, 'AMY@example.com', 'Amy P')
+        newest = add_legacy_customer(dbsession, ' Amy@Example.com', 'Amy Pond')
+        other = add_legacy_customer(dbsession, 'rory@example.com', 'Rory')
+        for i, customer_id in enumerate([oldest, middle, newest, newest, other]):
+            add_order(dbsession, f'ORD-M{i}', customer_id)
+
+        report = customers.merge_duplicates(dbsession, batch_size=1)
+        assert report.to_dict() == {'groups': 1, 'merged': 2, 'ordersRepointed': 3}
+        dbsession.expire_all()
+        assert [c.id for c in dbsession.query(CustomerInfo).order_by(CustomerInfo.id)] == [oldest, other]
+        assert dbsession.get(CustomerInfo, oldest).full_name == 'Amy Pond'
+        assert {o.customer_info_id for o in dbsession.query(Order) if o.order_id != 'ORD-M4'} == {oldest}
+        # Orders placed without a snapshot keep the details of the row they pointed at
+        assert [o.customer_dict()['fullName'] for o in dbsession.query(Order).order_by(Order.id)] == [
+            'Amy', 'Amy P', 'Amy Pond', 'Amy Pond', 'Rory']
+
+        # Nothing left to merge
+        assert customers.merge_duplicates(dbsession).merged == 0
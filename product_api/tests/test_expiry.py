@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+
+from product_api import expiry
+from product_api.models.customer_info import CustomerInfo
+from product_api.models.order import Order, OrderItem
+from product_api.models.product import Product
+
+NOW = datetime(2026, 10, 18, 12, 0)
+
+
+def add_order(dbsession, product, status, age_minutes, quantity=2):
+    order_id = f'ORD-X-{status}-{age_minutes}-{quantity}'
+    customer = CustomerInfo(full_name='Customer', email=f'{order_id}@example.com',
+                            address='1 Main Street', phone_number='555-0100')
+    order = Order(order_id=order_id, customer_info=customer,
+                  subtotal=10, shipping=0, total=10, status=status,
+                  created_at=NOW - timedelta(minutes=age_minutes))
+    order.order_items = [OrderItem(product=product, quantity=quantity, price=5)]
+    dbsession.add(order)
+    dbsession.flush()
+    return order
+
+
+class TestExpiry:
+    def setup_orders(self, dbsession):
+        pen = Product(title='Pen', description='Blue', price=5, stock=0)
+        dbsession.add(pen)
+        dbsession.flush()
+        stale = [add_order(dbsession, pen, 'pending', 120 + i, quantity=i + 1) for i in range(5)]
+        fresh = add_order(dbsession, pen, 'pending', 30)
+        shipped = add_order(dbsession, pen, 'shipping', 600)
+        return pen, stale, fresh, shipped
+
+    def test_expires_stale_pending_orders(self, dbsession):
+        """Test pending orders past the TTL are cancelled in batches and their stock released"""
+        pen, stale, fresh, shipped = self.setup_orders(dbsession)
+        report = expiry.expire_pending_orders(dbsession, ttl_minutes=60, now=NOW, batch_size=2)
+
+        assert report.to_dict() == {'cutoff': '2026-10-18T11:00:00', 'dryRun': False, 'batches': 3,
+                                    'orders': 5, 'unitsReleased': 15, 'products': 1}
+        dbsession.expire_all()
+        assert pen.stock == 15
+        assert {order.status for order in stale} == {'cancelled'}
+        assert all(order.stock_restored for order in stale)
+        assert stale[0].status_history[-1]['note'] == expiry.NOTE
+        assert (fresh.status, shipped.status) == ('pending', 'shipping')
+
+        # Nothing left to do on a second run
+        assert expiry.expire_pending_orders(dbsession, ttl_minutes=60, now=NOW).orders == 0
+
+    def test_dry_run_changes_nothing(self, dbsession):
+        """Test a dry run reports the same numbers without writing"""
+        pen, stale, _, _ = self.setup_orders(dbsession)
+        report = expiry.expire_pending_orders(dbsession, ttl_minutes=60, now=NOW, batch_size=2, dry_run=True)
+
+        assert (report.orders, report.units, report.batches) == (5, 15, 3)
+        dbsession.expire_all()
+        assert pen.stock == 0
+        assert {order.status for order in stale} == {'pending'}
+        assert stale[0].status_history == []
+
+    def test_batch_statement_count(self, dbsession, count_queries):
+        """Test a batch is a fixed number of statements whatever its size"""
+        self.setup_orders(dbsession)
+        report = expiry.ExpiryReport(expiry.cutoff_for(60, NOW))
+        with count_queries() as queries:
+            expiry.expire_batch(dbsession, report, batch_size=10)
+        assert report.orders == 5
+        # candidates, status read, update, events, restock claim, restock, units, products
+        assert len(queries) == 8
+
+    def test_cutoff_uses_the_created_at_clock(self, dbsession):
+        """Test the default cutoff reads the database clock created_at defaults to"""
+        pen = Product(title='Pen', description='Blue', price=5, stock=0)
+        customer = CustomerInfo(full_name='Customer', email='clock@example.com',
+                                address='1 Main Street', phone_number='555-0100')
+        order = Order(order_id='ORD-X-clock', customer_info=customer, subtotal=10, total=10,
+                      order_items=[OrderItem(product=pen, quantity=1, price=5)])
+        dbsession.add(order)
+        dbsession.flush()
+        dbsession.refresh(order)
+        now = expiry.database_now(dbsession)
+        assert abs(now - order.created_at) < timedelta(minutes=1)
+
+        assert expiry.expire_pending_orders(dbsession, ttl_minutes=60).orders == 0
+        order.created_at = now - timedelta(minutes=61)
+        dbsession.flush()
+        assert expiry.expire_pending_orders(dbsession, ttl_minutes=60).orders == 1
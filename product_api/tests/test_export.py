@@ -0,0 +1,99 @@
+import csv
+import gzip
+import io
+import json
+import tracemalloc
+
+from sqlalchemy.orm import Session
+
+from product_api import export
+from product_api.models.customer_info import CustomerInfo
+from product_api.models.order import Order, OrderItem
+from product_api.views.export import export_data
+
+
+def add_orders(dbsession, count, product):
+    for i in range(count):
+        customer = CustomerInfo(full_name=f'Customer {i}', email=f'c{i}@example.com',
+                                address='1 Main Street', phone_number='555-0100')
+        order = Order(order_id=f'ORD-EXPORT-{i:06d}', customer_info=customer,
+                      subtotal=20, shipping=5, total=25, status='pending', status_history=[])
+        order.order_items.append(OrderItem(product_id=product.id, quantity=2, price=10))
+        dbsession.add(order)
+    dbsession.flush()
+
+
+def read_export(dbsession, kind, fmt='ndjson', gzip_output=False, yield_per=2):
+    chunks = export.stream_export(lambda: Session(bind=dbsession.connection()), kind, fmt,
+                                  gzip=gzip_output, yield_per=yield_per)
+    data = b''.join(chunks)
+    return gzip.decompress(data) if gzip_output else data
+
+
+class TestExport:
+    def test_orders_ndjson_matches_api_shape(self, dbsession, sample_order):
+        """Test exported orders are exactly what Order.to_dict() returns"""
+        lines = read_export(dbsession, 'orders').decode().splitlines()
+        assert [json.loads(line) for line in lines] == [sample_order.to_dict()]
+
+    def test_products_csv(self, dbsession, multiple_products):
+        """Test CSV has a header and one row per product, in id order"""
+        data = read_export(dbsession, 'products', 'csv').decode()
+        rows = list(csv.DictReader(io.StringIO(data)))
+        assert [row['title'] for row in rows] == [p.title for p in multiple_products]
+        assert rows[0]['price'] == '10.0'
+
+    def test_orders_csv_flattens_customer_and_items(self, dbsession, sample_order):
+        """Test CSV orders carry the customer columns and items as JSON"""
+        row = next(csv.DictReader(io.StringIO(read_export(dbsession, 'orders', 'csv').decode())))
+        assert row['customerEmail'] == 'john.doe@example.com'
+        assert json.loads(row['items']) == [
+            {'productId': sample_order.order_items[0].product_id, 'quantity': 1, 'price': 29.99}]
+
+    def test_gzip(self, dbsession, sample_customer):
+        """Test gzip output decompresses to the plain export"""
+        assert read_export(dbsession, 'customers', gzip_output=True) == read_export(dbsession, 'customers')
+
+    def test_memory_does_not_grow_with_rows(self, dbsession, sample_product):
+        """Test peak memory while streaming is independent of the number of orders"""
+        def peak(count):
+            dbsession.query(OrderItem).delete()
+            dbsession.query(Order).delete()
+            dbsession.query(CustomerInfo).delete()
+            add_orders(dbsession, count, sample_product)
+            dbsession.expunge_all()
+            tracemalloc.start()
+            try:
+                for _ in export.stream_export(lambda: Session(bind=dbsession.connection()),
+                                              'orders', yield_per=50):
+                    pass
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        small = peak(100)
+        assert peak(2000) < small * 2
+
+
+class TestExportView:
+    def test_unknown_kind(self, dummy_request):
+        """Test exports other than products, orders and customers are 404"""
+        dummy_request.matchdict = {'kind': 'admins'}
+        assert export_data(dummy_request).status_code == 404
+
+    def test_bad_format(self, dummy_request):
+        """Test an unsupported format is rejected"""
+        dummy_request.matchdict = {'kind': 'orders'}
+        dummy_request.params = {'format': 'xml'}
+        assert export_data(dummy_request).status_code == 400
+
+    def test_download_headers(self, config, dummy_request, dbsession):
+        """Test the response is an attachment streamed from its own session"""
+        config.registry['dbsession_factory'] = lambda: Session(bind=dbsession.connection())
+        dummy_request.matchdict = {'kind': 'products'}
+        dummy_request.params = {'format': 'csv', 'gzip': 'true'}
+        dummy_request.registry = config.registry
+        response = export_data(dummy_request)
+        assert response.content_type == 'application/gzip'
+        assert response.content_disposition == 'attachment; filename="products.csv.gz"'
+        assert gzip.decompress(b''.join(response.app_iter)).startswith(b'id,sku,title')
@@ -0,0 +1,98 @@
+import json
+from datetime import timedelta
+
+from pyramid.response import Response
+from sqlalchemy import create_engine
+from webtest import TestApp
+
+from product_api import idempotency, main
+from product_api.models.idempotency import IdempotencyKey
+from product_api.models.meta import Base, utcnow
+
+CUSTOMER = {'fullName': 'John Doe', 'email': 'john@example.com',
+            'address': '123 Main St', 'phoneNumber': '555-1234'}
+
+
+def counting_view(status=200):
+    calls = []
+
+    def view(context, request):
+        calls.append(1)
+        return Response(json.dumps({'call': len(calls)}), status=status,
+                        content_type='application/json; charset=UTF-8')
+
+    return idempotency.idempotent(view), calls
+
+
+def keyed(dummy_request, key='key-1', body=b'{"items": []}'):
+    dummy_request.method = 'POST'
+    dummy_request.path = '/api/checkout'
+    dummy_request.headers = {'Idempotency-Key': key}
+    dummy_request.body = body
+    return dummy_request
+
+
+class TestIdempotentDecorator:
+    def test_repeat_replays_stored_bytes(self, dummy_request, dbsession):
+        """Test the view runs once and the retry gets the same response"""
+        view, calls = counting_view()
+        first = view(None, keyed(dummy_request))
+        replay = view(None, keyed(dummy_request))
+
+        assert len(calls) == 1
+        assert replay.body == first.body
+        assert replay.status_code == 200
+        assert replay.headers['Content-Type'] == 'application/json; charset=UTF-8'
+        assert replay.headers['Idempotent-Replayed'] == 'true'
+
+    def test_without_key_always_runs(self, dummy_request, dbsession):
+        """Test requests without the header are not deduplicated"""
+        view, calls = counting_view()
+        view(None, dummy_request)
+        view(None, dummy_request)
+        assert len(calls) == 2
+
+    def test_key_reused_for_other_request(self, dummy_request, dbsession):
+        """Test a key cannot replay a response for a different body"""
+        view, calls = counting_view()
+        view(None, keyed(dummy_request))
+        response = view(None, keyed(dummy_request, body=b'{"items": [1]}'))
+        assert response.status_code == 422
+        assert len(calls) == 1
+
+    def test_failures_are_not_stored(self, dummy_request, dbsession):
+        """Test a failed attempt can be retried with the same key"""
+        view, calls = counting_view(status=400)
+        view(None, keyed(dummy_request))
+        view(None, keyed(dummy_request))
+        assert len(calls) == 2
+        assert dbsession.query(IdempotencyKey).count() == 0
+
+    def test_expired_key_runs_again(self, dummy_request, dbsession):
+        """Test a stored response past its TTL is replaced"""
+        view, calls = counting_view()
+        view(None, keyed(dummy_request))
+        dbsession.query(IdempotencyKey).update({'expires_at': utcnow() - timedelta(seconds=1)})
+        assert json.loads(view(None, keyed(dummy_request)).body) == {'call': 2}
+        assert idempotency.purge_expired(dbsession, now=utcnow() + timedelta(days=2)) == 1
+
+
+class TestIdempotentCheckout:
+    def test_retried_checkout_creates_one_order(self, tmp_path, admin_headers):
+        """Test a retried POST through the app takes stock and writes the order once"""
+        url = f"sqlite:///{tmp_path / 'app.sqlite'}"
+        Base.metadata.create_all(create_engine(url))
+        app = TestApp(main({}, **{'sqlalchemy.url': url}))
+        auth = admin_headers(app)
+        product = app.post_json('/api/products', {'title': 'Pen', 'description': 'Blue',
+                                                  'price': 2, 'stock': 5}, headers=auth).json
+        body = {'customerInfo': CUSTOMER, 'items': [{'id': product['id'], 'quantity': 2}]}
+        headers = {'Idempotency-Key': 'checkout-123'}
+
+        first = app.post_json('/api/checkout', body, headers=headers)
+        retry = app.post_json('/api/checkout', body, headers=headers)
+
+        assert retry.body == first.body
+        assert retry.headers['Idempotent-Replayed'] == 'true'
+        assert app.get(f"/api/products/{product['id']}").json['stock'] == 3
+        assert len(app.get('/api/orders', headers=auth).json['orders']) == 1
@@ -0,0 +1,83 @@
+import re
+import threading
+import time
+
+from product_api import ids
+from product_api.models.customer_info import CustomerInfo
+from product_api.models.order import Order
+from product_api.views import orders
+
+ORDER_ID = re.compile(r'^ORD-[0-9A-HJKMNP-TV-Z]{26}$')
+
+
+class TestIds:
+    def test_format_and_timestamp(self):
+        """Test order ids are ORD- plus a ULID carrying the creation time"""
+        before = int(time.time() * 1000)
+        order_id = ids.new_order_id()
+        after = int(time.time() * 1000)
+        assert ORDER_ID.match(order_id)
+        assert before <= ids.timestamp_ms(order_id) <= after
+
+    def test_monotonic_within_a_millisecond_and_after_clock_step_back(self, monkeypatch):
+        """Test IDs keep increasing when the clock stands still or goes backwards"""
+        # Restored afterwards, or later IDs would stay in the future
+        monkeypatch.setattr(ids, '_last_ms', -1)
+        monkeypatch.setattr(ids, '_last_random', 0)
+        values = [ids.ulid(now_ms=2_000_000_000_000) for _ in range(100)]
+        values.append(ids.ulid(now_ms=1_999_999_999_000))
+        assert values == sorted(values)
+        assert len(set(values)) == len(values)
+        assert ids.timestamp_ms(values[-1]) == 2_000_000_000_000
+
+    def test_unique_across_threads(self):
+        """Test concurrent generators never hand out the same ID"""
+        results = []
+
+        def generate():
+            results.extend(ids.new_order_id() for _ in range(2000))
+
+        threads = [threading.Thread(target=generate) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(set(results)) == 16000
+
+    def test_prefix_bounds(self):
+        """Test prefix bounds carry past the last base32 digit"""
+        assert ids.prefix_bounds('ORD-01JZ') == ('ORD-01JZ', 'ORD-01K')
+        assert ids.prefix_bounds('ORD-0Z') == ('ORD-0Z', 'ORD-1')
+        assert ids.prefix_bounds('ORD-ZZ') == ('ORD-ZZ', None)
+        assert ids.prefix_bounds('ORD-') is None
+        assert ids.prefix_bounds('ord-01') is None
+
+
+class TestOrderIdPrefix:
+    def add_orders(self, dbsession, order_ids):
+        for order_id in order_ids:
+            customer = CustomerInfo(full_name='Customer', email=f'{order_id}@example.com',
+                                    address='1 Main Street', phone_number='555-0100')
+            dbsession.add(Order(order_id=order_id, customer_info=customer, subtotal=1, shipping=0,
+                                total=1, status='pending', status_history=[]))
+        dbsession.flush()
+
+    def test_prefix_filter(self, dummy_request, dbsession):
+        """Test order_id_prefix selects exactly the IDs starting with it"""
+        self.add_orders(dbsession, ['ORD-01JZ0', 'ORD-01JZZ', 'ORD-01K00', 'ORD-01JY9', 'ORD-x_1'])
+        dummy_request.params = {'order_id_prefix': 'ORD-01JZ', 'sort': 'id'}
+        response = orders.get_orders(dummy_request)
+        assert [order['orderId'] for order in response['orders']] == ['ORD-01JZ0', 'ORD-01JZZ']
+
+        dummy_request.params = {'order_id_prefix': 'ORD-x_'}
+        assert [o['orderId'] for o in orders.get_orders(dummy_request)['orders']] == ['ORD-x_1']
+
+    def test_generated_order_id(self, dummy_request, dbsession):
+        """Test orders created without an orderId get a time-ordered one"""
+        dummy_request.json_body = {'customerInfo': {'fullName': 'A', 'email': 'a@example.com',
+                                                    'address': 'x', 'phoneNumber': '1'},
+                                   'items': [], 'total': 0}
+        first = orders.create_order(dummy_request)['orderId']
+        second = orders.create_order(dummy_request)['orderId']
+        assert ORDER_ID.match(first)
+        assert first < second
@@ -0,0 +1,117 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from product_api import inventory
+from product_api.models.catalog import CatalogChange
+from product_api.models.meta import Base
+from product_api.models.product import Product
+from product_api.views import orders
+
+CUSTOMER = {'fullName': 'John Doe', 'email': 'john@example.com',
+            'address': '123 Main St', 'phoneNumber': '555-1234'}
+
+
+def add_products(dbsession, *stocks):
+    products = [Product(title=f'Item {i}', description='Test', price=10 + i, stock=stock)
+                for i, stock in enumerate(stocks)]
+    dbsession.add_all(products)
+    dbsession.flush()
+    return products
+
+
+class TestReserveStock:
+    def test_reserves_and_snapshots_prices(self, dbsession):
+        """Test stock is taken, versions bump and current prices come back"""
+        lamp, chair = add_products(dbsession, 5, 3)
+        products = inventory.reserve_stock(dbsession, {lamp.id: 2, chair.id: 3})
+        assert products == {lamp.id: lamp, chair.id: chair}
+        assert float(chair.price) == 11
+        assert (lamp.stock, chair.stock) == (3, 0)
+        assert lamp.version == 2
+
+    def test_all_or_nothing(self, dbsession):
+        """Test one short line leaves every product's stock untouched"""
+        lamp, chair = add_products(dbsession, 5, 1)
+        with pytest.raises(inventory.StockError) as info:
+            inventory.reserve_stock(dbsession, {lamp.id: 2, chair.id: 2, 999999: 1})
+        assert info.value.details == ['Insufficient stock for Item 1. Available: 1, Requested: 2',
+                                      'Product with id 999999 not found']
+        dbsession.expire_all()
+        assert (lamp.stock, chair.stock) == (5, 1)
+
+    def test_reservation_is_published(self, dbsession):
+        """Test Core stock updates reach the change feed on commit"""
+        lamp, = add_products(dbsession, 5)
+        dbsession.commit()
+        inventory.reserve_stock(dbsession, {lamp.id: 1})
+        dbsession.commit()
+        assert dbsession.query(CatalogChange).filter(CatalogChange.product_id == lamp.id).count() == 2
+
+    def test_quantities_merge_and_validate(self):
+        """Test repeated lines add up and bad quantities are rejected"""
+        assert inventory.order_quantities([{'id': 1, 'quantity': 2}, {'id': '1'}]) == {1: 3}
+        with pytest.raises(inventory.StockError):
+            inventory.order_quantities([{'id': 1, 'quantity': 0}])
+
+    def test_stock_check_constraint(self, dbsession):
+        """Test the database refuses negative stock from any writer"""
+        lamp, = add_products(dbsession, 1)
+        with pytest.raises(IntegrityError), dbsession.begin_nested():
+            lamp.stock = -1
+
+    def test_concurrent_checkouts_never_oversell(self, tmp_path):
+        """Test racing sessions sell exactly the stock there is"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'race.sqlite'}", connect_args={'timeout': 30})
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as session:
+            product_id = add_products(session, 10)[0].id
+            session.commit()
+
+        sold = []
+
+        def buy():
+            with Session() as session:
+                try:
+                    inventory.reserve_stock(session, {product_id: 1})
+                except inventory.StockError:
+                    return
+                session.commit()
+                sold.append(1)
+
+        threads = [threading.Thread(target=buy) for _ in range(25)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with Session() as session:
+            assert session.get(Product, product_id).stock == 0
+        assert len(sold) == 10
+        engine.dispose()
+
+
+class TestCreateOrderStock:
+    def test_order_prices_come_from_reservation(self, dummy_request, dbsession):
+        """Test the order is priced at reservation and stock is taken once"""
+        lamp, = add_products(dbsession, 5)
+        dummy_request.json_body = {'customerInfo': CUSTOMER, 'total': 20,
+                                   'items': [{'id': lamp.id, 'quantity': 2}]}
+        response = orders.create_order(dummy_request)
+        assert response['items'][0]['price'] == 10
+        assert response['items'][0]['product']['stock'] == 3
+
+    def test_failed_line_rolls_back_whole_order(self, dummy_request, dbsession):
+        """Test no stock is taken when any line is short"""
+        lamp, chair = add_products(dbsession, 5, 1)
+        dummy_request.json_body = {'customerInfo': CUSTOMER,
+                                   'items': [{'id': lamp.id, 'quantity': 2},
+                                             {'id': chair.id, 'quantity': 2}]}
+        response = orders.create_order(dummy_request)
+        assert response.status_code == 400
+        assert 'Insufficient stock for Item 1' in response.json_body['details'][0]
+        dbsession.expire_all()
+        assert lamp.stock == 5
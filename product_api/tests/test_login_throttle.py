@@ -0,0 +1,107 @@
+import threading
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+from webtest import TestApp
+
+from product_api import hashing, main, throttle
+from product_api.models.meta import Base
+
+CREDENTIALS = {'username': 'testadmin', 'password': 'testpassword123'}
+
+
+class TestTokenBucket:
+    def test_burst_then_refill(self):
+        """Test a bucket allows its burst, then one attempt per refill interval"""
+        bucket = throttle.TokenBucket(per_minute=6, burst=3)
+        assert [bucket.take('k', now=0) for _ in range(3)] == [0, 0, 0]
+        assert bucket.take('k', now=0) == pytest.approx(10)
+        assert bucket.take('k', now=10) == 0
+        assert bucket.take('other', now=10) == 0
+
+    def test_key_count_is_bounded(self):
+        """Test the least recently used keys are dropped past max_keys"""
+        bucket = throttle.TokenBucket(per_minute=1, burst=1, max_keys=2)
+        for key in 'abc':
+            bucket.take(key, now=0)
+        assert list(bucket._buckets) == ['b', 'c']
+
+    def test_login_throttle_checks_address_first(self):
+        """Test a refused address does not use up the username's tokens"""
+        login = throttle.LoginThrottle(ip_per_minute=1, ip_burst=1, username_per_minute=1, username_burst=2)
+        assert login.check('10.0.0.1', 'Amy', now=0) == 0
+        assert login.check('10.0.0.1', 'amy', now=0) > 0
+        assert login.check('10.0.0.2', 'AMY', now=0) == 0
+        assert login.check('10.0.0.3', 'amy', now=0) > 0
+
+
+class TestHashPool:
+    def test_full_pool_refuses_at_once(self):
+        """Test work beyond workers + max_queue is rejected without waiting"""
+        pool = hashing.HashPool(workers=1, max_queue=0)
+        started, release = threading.Event(), threading.Event()
+
+        def hold():
+            started.set()
+            release.wait(5)
+
+        holder = threading.Thread(target=pool.run, args=(hold,))
+        holder.start()
+        try:
+            started.wait(5)
+            with pytest.raises(hashing.PoolBusy):
+                pool.run(len, 'x')
+            assert pool.rejected == 1
+        finally:
+            release.set()
+            holder.join()
+        assert pool.run(len, 'abc') == 3
+        pool.shutdown()
+
+
+class TestLoginEndpoint:
+    @pytest.fixture
+    def app(self, tmp_path, seed_admin):
+        url = f"sqlite:///{tmp_path / 'app.sqlite'}"
+        Base.metadata.create_all(create_engine(url))
+        app = TestApp(main({}, **{'sqlalchemy.url': url, 'password_hashing.workers': '1',
+                                  'password_hashing.max_queue': '0'}))
+        seed_admin(app, **CREDENTIALS)
+        return app
+
+    def test_throttled_before_hashing(self, app):
+        """Test guesses past the username's burst get 429 without a hash"""
+        wrong = dict(CREDENTIALS, password='guess')
+        for _ in range(throttle.DEFAULT_USERNAME_BURST):
+            app.post_json('/api/admin/login', wrong, status=401)
+        with patch('product_api.hashing.check_password_hash') as check:
+            response = app.post_json('/api/admin/login', CREDENTIALS, status=429)
+        assert not check.called
+        assert int(response.headers['Retry-After']) > 0
+
+    def test_credentials_must_be_strings(self, app):
+        """Test non-string credentials are 400 before the throttle keys on them"""
+        for body in ({'username': ['admin'], 'password': 'x'}, {'username': {'a': 1}, 'password': 'x'},
+                     {'username': 'admin', 'password': 12345678}, ['admin', 'x'], 'admin'):
+            response = app.post_json('/api/admin/login', body, status=400)
+            assert response.json == {'error': 'Username and password are required'}
+
+        headers = {'Authorization': 'Bearer ' + app.post_json('/api/admin/login', CREDENTIALS).json['token']}
+        app.post_json('/api/admin/create', {'username': 7, 'password': 'x' * 12}, headers=headers, status=400)
+        app.post_json('/api/admin/create', {'username': 'second', 'password': ['x']}, headers=headers, status=400)
+
+    def test_busy_pool_is_503(self, app):
+        """Test a login finding the hash pool full is turned away"""
+        pool = hashing.get_hash_pool(app.app.registry)
+        started, release = threading.Event(), threading.Event()
+        holder = threading.Thread(target=pool.run, args=(lambda: (started.set(), release.wait(5)),))
+        holder.start()
+        try:
+            started.wait(5)
+            response = app.post_json('/api/admin/login', CREDENTIALS, status=503)
+            assert response.headers['Retry-After'] == '1'
+        finally:
+            release.set()
+            holder.join()
+        assert app.post_json('/api/admin/login', CREDENTIALS).json['token']
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+from product_api.models.customer_info import CustomerInfo
+from product_api.models.order import Order
+from product_api.views import orders
+
+START = datetime(2026, 10, 1, 12, 0)
+
+
+def add_orders(dbsession, count=6):
+    created = []
+    for i in range(count):
+        customer = CustomerInfo(full_name=f'Customer {i}', email=f'buyer{i}@example.com',
+                                address='1 Main Street', phone_number='555-0100')
+        order = Order(order_id=f'ORD-L{i:03d}', customer_info=customer, subtotal=10 * i,
+                      shipping=0, total=10 * i, status='pending' if i % 2 else 'shipping',
+                      status_history=[], order_date=START + timedelta(days=i))
+        dbsession.add(order)
+        created.append(order)
+    dbsession.flush()
+    return created
+
+
+class TestOrderListing:
+    def test_no_params_returns_every_order(self, dummy_request, dbsession):
+        """Test the unparameterised listing keeps its original shape"""
+        add_orders(dbsession, 3)
+        response = orders.get_orders(dummy_request)
+        assert set(response) == {'orders'}
+        assert len(response['orders']) == 3
+
+    def test_walk_pages_newest_first(self, dummy_request, dbsession):
+        """Test the default page order is newest first and nextCursor visits every order once"""
+        created = add_orders(dbsession)
+        seen = []
+        cursor = None
+        while True:
+            dummy_request.params = {'limit': '4'}
+            if cursor:
+                dummy_request.params['cursor'] = cursor
+            response = orders.get_orders(dummy_request)
+            seen.extend(order['orderId'] for order in response['orders'])
+            cursor = response['nextCursor']
+            if not cursor:
+                break
+        assert seen == [order.order_id for order in reversed(created)]
+
+    def test_filters(self, dummy_request, dbsession):
+        """Test status, date range, min_total and free-text filters combine"""
+        add_orders(dbsession)
+        dummy_request.params = {'status': 'pending', 'from': '2026-10-02', 'to': '2026-10-04',
+                                'min_total': '20', 'sort': 'total'}
+        response = orders.get_orders(dummy_request)
+        assert [order['orderId'] for order in response['orders']] == ['ORD-L003']
+
+        dummy_request.params = {'q': 'BUYER4@'}
+        assert [o['orderId'] for o in orders.get_orders(dummy_request)['orders']] == ['ORD-L004']
+        dummy_request.params = {'q': 'l00', 'status': 'shipping,pending', 'sort': 'id'}
+        assert len(orders.get_orders(dummy_request)['orders']) == 6
+
+    def test_like_wildcards_are_literal(self, dummy_request, dbsession):
+        """Test % and _ in q match themselves"""
+        add_orders(dbsession, 2)
+        dummy_request.params = {'q': '%'}
+        assert orders.get_orders(dummy_request)['orders'] == []
+
+    def test_invalid_params(self, dummy_request, dbsession):
+        """Test bad filter and sort values are 400"""
+        for params in ({'from': 'yesterday'}, {'min_total': 'lots'}, {'sort': 'status'},
+                       {'cursor': 'garbage'}):
+            dummy_request.params = params
+            assert orders.get_orders(dummy_request).status_code == 400
@@ -0,0 +1,67 @@
+import pytest
+
+from product_api.models.customer_info import CustomerInfo
+from product_api.models.order import Order, OrderItem
+from product_api.models.product import Product
+from product_api.views import orders
+
+
+def add_orders(dbsession, count):
+    products = [Product(title=f'Item {i}', description='Test', price=5, stock=100) for i in range(3)]
+    dbsession.add_all(products)
+    dbsession.flush()
+    for i in range(count):
+        customer = CustomerInfo(full_name=f'Customer {i}', email=f'c{i}@example.com',
+                                address='1 Main Street', phone_number='555-0100')
+        order = Order(order_id=f'ORD-Q-{i:04d}', customer_info=customer, subtotal=10,
+                      shipping=0, total=10, status='pending', status_history=[])
+        order.order_items = [OrderItem(product=product, quantity=1, price=5) for product in products]
+        dbsession.add(order)
+    dbsession.flush()
+    dbsession.expunge_all()
+
+
+class TestOrderQueryCount:
+    @pytest.mark.parametrize('count', [1, 25])
+    def test_list_query_count_is_constant(self, dbsession, dummy_request, count_queries, count):
+        """Test listing orders does not lazy-load customers, items, products or status events"""
+        add_orders(dbsession, count)
+        with count_queries() as queries:
+            response = orders.get_orders(dummy_request)
+        assert len(response['orders']) == count
+        assert response['orders'][0]['items'][0]['product']['title'] == 'Item 0'
+        assert len(queries) == 3
+
+    def test_single_order_reads(self, dbsession, dummy_request, count_queries):
+        """Test the single-order endpoints load everything in three queries"""
+        add_orders(dbsession, 1)
+        order = dbsession.query(Order).one()
+        dbsession.expunge_all()
+
+        dummy_request.matchdict = {'id': str(order.id)}
+        with count_queries() as queries:
+            assert orders.get_order(dummy_request)['customerInfo']['fullName'] == 'Customer 0'
+        assert len(queries) == 3
+
+        dbsession.expunge_all()
+        dummy_request.matchdict = {'order_id': 'ORD-Q-0000'}
+        with count_queries() as queries:
+            assert len(orders.get_order_by_order_id(dummy_request)['items']) == 3
+        assert len(queries) == 3
+
+    def test_status_update_query_count(self, dbsession, dummy_request, count_queries):
+        """Test cancelling restores stock in one statement, without per-item queries"""
+        add_orders(dbsession, 1)
+        order = dbsession.query(Order).one()
+        dbsession.expunge_all()
+
+        dummy_request.matchdict = {'id': str(order.id)}
+        dummy_request.json_body = {'status': 'cancelled'}
+        with count_queries() as queries:
+            response = orders.update_order_status(dummy_request)
+        assert response['status'] == 'cancelled'
+        assert [item['product']['stock'] for item in response['items']] == [101, 101, 101]
+        # 3 loads, stock_restored claim, one restock UPDATE for all items,
+        # then to_dict() flushes the status and event and reads updated_at
+        assert len(queries) == 8
+        assert sum(1 for sql in queries if sql.startswith('UPDATE products')) == 1
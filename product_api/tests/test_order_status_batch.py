@@ -0,0 +1,144 @@
+import pytest
+import transaction
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from webtest import TestApp
+
+from product_api import main, order_status
+from product_api.models.customer_info import CustomerInfo
+from product_api.models.meta import Base
+from product_api.models.order import Order, OrderItem
+from product_api.models.product import Product
+from product_api.views import orders
+
+
+def add_orders(dbsession, statuses, products=()):
+    created = []
+    for i, status in enumerate(statuses):
+        customer = CustomerInfo(full_name=f'Customer {i}', email=f'c{i}@example.com',
+                                address='1 Main Street', phone_number='555-0100')
+        order = Order(order_id=f'ORD-B-{i:04d}', customer_info=customer, subtotal=10,
+                      shipping=0, total=10, status=status)
+        order.order_items = [OrderItem(product=product, quantity=quantity, price=5)
+                             for product, quantity in products]
+        dbsession.add(order)
+        created.append(order)
+    dbsession.flush()
+    return created
+
+
+def batch(dummy_request, body):
+    dummy_request.json_body = body
+    return orders.batch_update_order_status(dummy_request)
+
+
+class TestOrderStatusBatch:
+    def test_per_order_results(self, dummy_request, dbsession):
+        """Test each id reports updated, unchanged, invalid_transition or not_found"""
+        preparing, shipping, completed = add_orders(dbsession, ['preparing', 'shipping', 'completed'])
+        response = batch(dummy_request, {'ids': [preparing.id, shipping.id, completed.id, 999999],
+                                         'status': 'shipping', 'note': 'Courier pickup'})
+
+        assert response['updated'] == 1
+        assert response['results'] == [
+            {'id': preparing.id, 'result': 'updated', 'from': 'preparing'},
+            {'id': shipping.id, 'result': 'unchanged', 'from': 'shipping'},
+            {'id': completed.id, 'result': 'invalid_transition', 'from': 'completed'},
+            {'id': 999999, 'result': 'not_found'},
+        ]
+        dbsession.expire_all()
+        assert preparing.status == 'shipping'
+        assert [(e['status'], e['note']) for e in preparing.to_dict()['statusHistory']] == [
+            ('shipping', 'Courier pickup')]
+        assert shipping.status_history == []
+
+    @pytest.mark.parametrize('count', [2, 40])
+    def test_statement_count_is_constant(self, dummy_request, dbsession, count_queries, count):
+        """Test the batch costs the same statements for 2 orders as for 40"""
+        created = add_orders(dbsession, ['pending', 'confirmed'] * (count // 2))
+        with count_queries() as queries:
+            response = batch(dummy_request, {'ids': [order.id for order in created], 'status': 'preparing'})
+        assert response['updated'] == count
+        # select, one update per source status, one multi-row insert
+        assert len(queries) == 4
+
+    def test_cancel_restores_stock_once(self, dummy_request, dbsession, count_queries):
+        """Test cancelling adds every item back with one aggregated UPDATE"""
+        pen = Product(title='Pen', description='Blue', price=1, stock=10)
+        pad = Product(title='Pad', description='A5', price=2, stock=0)
+        created = add_orders(dbsession, ['pending', 'shipping', 'delivered'], [(pen, 2), (pad, 1)])
+
+        with count_queries() as queries:
+            response = batch(dummy_request, {'ids': [order.id for order in created], 'status': 'cancelled'})
+        assert response['updated'] == 2
+        assert response['results'][2]['result'] == 'invalid_transition'
+        assert sum(1 for sql in queries if sql.lstrip().upper().startswith('UPDATE PRODUCTS')) == 1
+        assert (pen.stock, pad.stock) == (14, 2)
+
+        # Cancelled orders are final: no second restock
+        response = batch(dummy_request, {'ids': [created[0].id], 'status': 'cancelled'})
+        assert response['results'][0]['result'] == 'unchanged'
+        assert pen.stock == 14
+
+    def test_invalid_requests(self, dummy_request, dbsession):
+        """Test unknown statuses and malformed id lists are 400"""
+        order, = add_orders(dbsession, ['pending'])
+        for body in ({'ids': [order.id], 'status': 'lost'}, {'ids': [], 'status': 'shipping'},
+                     {'ids': 'all', 'status': 'shipping'}, {'ids': ['x'], 'status': 'shipping'},
+                     {'ids': list(range(1001)), 'status': 'shipping'}):
+            assert batch(dummy_request, body).status_code == 400
+
+    def test_route(self, tmp_path, admin_headers):
+        """Test POST /api/orders/status:batch reaches the batch view and commits"""
+        url = f"sqlite:///{tmp_path / 'app.sqlite'}"
+        Base.metadata.create_all(create_engine(url))
+        app = TestApp(main({}, **{'sqlalchemy.url': url}))
+        headers = admin_headers(app)
+        product = app.post_json('/api/products', {'title': 'Pen', 'description': 'Blue',
+                                                  'price': 2, 'stock': 5}, headers=headers).json
+        order = app.post_json('/api/checkout', {
+            'customerInfo': {'fullName': 'A', 'email': 'a@example.com', 'address': 'x', 'phoneNumber': '1'},
+            'items': [{'id': product['id'], 'quantity': 2}]}).json
+
+        response = app.post_json('/api/orders/status:batch', {'ids': [order['id'], 999], 'status': 'cancelled'},
+                                 headers=headers)
+        assert [result['result'] for result in response.json['results']] == ['updated', 'not_found']
+        assert app.get(f"/api/orders/{order['id']}", headers=headers).json['status'] == 'cancelled'
+        assert app.get(f"/api/products/{product['id']}").json['stock'] == 5
+        assert app.options('/api/orders/status:batch').status_code == 200
+
+    def test_database_error_is_generic_and_doomed(self, dummy_request, dbsession, monkeypatch):
+        """Test a failing batch hides the SQL and rolls back what it wrote"""
+        order, = add_orders(dbsession, ['pending'])
+
+        def fail(*args, **kwargs):
+            raise OperationalError('UPDATE orders SET status=?', (), Exception('disk I/O error'))
+        monkeypatch.setattr(order_status, 'transition_orders', fail)
+        dummy_request.tm = transaction.TransactionManager()
+        dummy_request.tm.begin()
+        response = batch(dummy_request, {'ids': [order.id], 'status': 'confirmed'})
+        assert response.status_code == 500
+        assert response.json == {'error': 'Database error occurred'}
+        assert dummy_request.tm.isDoomed()
+        dummy_request.tm.abort()
+
+
+class TestSingleStatusUpdate:
+    def put(self, dummy_request, order, status):
+        dummy_request.matchdict = {'id': str(order.id)}
+        dummy_request.json_body = {'status': status}
+        return orders.update_order_status(dummy_request)
+
+    def test_follows_transition_rules(self, dummy_request, dbsession):
+        """Test the PUT refuses what the batch refuses, e.g. reopening a cancelled order"""
+        cancelled, completed, preparing = add_orders(dbsession, ['cancelled', 'completed', 'preparing'])
+        response = self.put(dummy_request, cancelled, 'pending')
+        assert response.status_code == 409
+        assert response.json == {'error': 'Cannot change order status from cancelled to pending'}
+        assert self.put(dummy_request, completed, 'cancelled').status_code == 409
+        assert self.put(dummy_request, preparing, 'lost').status_code == 400
+        assert (cancelled.status, completed.status) == ('cancelled', 'completed')
+
+        assert self.put(dummy_request, preparing, 'shipping')['status'] == 'shipping'
+        # Setting the current status again is a no-op, like the batch's "unchanged"
+        assert len(self.put(dummy_request, preparing, 'shipping')['statusHistory']) == 1
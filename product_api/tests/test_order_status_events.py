@@ -0,0 +1,65 @@
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from product_api import export
+from product_api.models.order import Order, OrderStatusEvent
+from product_api.views import orders
+
+
+class TestOrderStatusEvents:
+    def test_status_change_is_one_insert(self, dbsession, dummy_request, sample_order, count_queries):
+        """Test a transition adds one event row instead of rewriting the history"""
+        sample_order.add_status_event('pending', updated_by='system')
+        dbsession.flush()
+        dummy_request.matchdict = {'id': str(sample_order.id)}
+        dummy_request.json_body = {'status': 'shipping', 'note': 'Via courier'}
+        response = orders.update_order_status(dummy_request)
+
+        with count_queries() as queries:
+            dbsession.flush()
+        inserts = [sql for sql in queries if sql.lstrip().upper().startswith('INSERT')]
+        assert len(inserts) == 1 and 'order_status_events' in inserts[0]
+        assert [(entry['status'], entry['updatedBy'], entry['note'])
+                for entry in response['statusHistory']] == [
+            ('pending', 'system', None), ('shipping', 'admin', 'Via courier')]
+
+    def test_history_given_on_create(self, dbsession, dummy_request):
+        """Test a client-supplied statusHistory is stored as events, in UTC"""
+        dummy_request.json_body = {
+            'customerInfo': {'fullName': 'A', 'email': 'a@example.com', 'address': 'x', 'phoneNumber': '1'},
+            'items': [],
+            'statusHistory': [{'status': 'pending', 'timestamp': '2026-10-01T17:00:00+07:00',
+                               'updatedBy': 'shop', 'note': 'Placed'}],
+        }
+        response = orders.create_order(dummy_request)
+        assert response['statusHistory'] == [
+            {'status': 'pending', 'timestamp': '2026-10-01T10:00:00', 'updatedBy': 'shop', 'note': 'Placed'}]
+        with pytest.raises(ValueError):
+            OrderStatusEvent.from_dict('pending')
+
+    def test_query_by_status_and_time(self, dbsession, sample_order):
+        """Test "orders shipped on a day" is answerable from the events table"""
+        sample_order.add_status_event('shipped', ts=datetime(2026, 10, 17, 9, 30))
+        sample_order.add_status_event('delivered', ts=datetime(2026, 10, 18, 8, 0))
+        dbsession.flush()
+        shipped = dbsession.scalars(
+            select(Order.order_id).join(Order.status_events)
+            .where(OrderStatusEvent.status == 'shipped',
+                   OrderStatusEvent.ts >= datetime(2026, 10, 17),
+                   OrderStatusEvent.ts < datetime(2026, 10, 18))
+        ).all()
+        assert shipped == [sample_order.order_id]
+
+    def test_export_includes_history(self, dbsession, sample_order):
+        """Test exported orders carry the same statusHistory as the API"""
+        sample_order.add_status_event('pending', updated_by='system', ts=datetime(2026, 10, 1))
+        sample_order.add_status_event('shipped', updated_by='admin', ts=datetime(2026, 10, 2))
+        dbsession.flush()
+        data = b''.join(export.stream_export(lambda: Session(bind=dbsession.connection()), 'orders'))
+        record = json.loads(data)
+        assert record['statusHistory'] == sample_order.to_dict()['statusHistory']
+        assert [entry['status'] for entry in record['statusHistory']] == ['pending', 'shipped']
@@ -0,0 +1,45 @@
+from product_api.customers import upsert_customer
+from product_api.models.order import Order, OrderItem
+from product_api.views import orders
+
+
+def add_order(dbsession, order_id, email, phone, product, quantities=(1,)):
+    customer = upsert_customer(dbsession, {'full_name': 'Shopper', 'email': email,
+                                           'address': '1 Main Street', 'phone_number': phone})
+    order = Order(order_id=order_id, customer_info=customer, subtotal=20, shipping=5,
+                  total=25, status='pending', status_history=[])
+    order.order_items = [OrderItem(product=product, quantity=q, price=10) for q in quantities]
+    dbsession.add(order)
+    dbsession.flush()
+    return order
+
+
+class TestOrderTracking:
+    def test_lookup_by_email_returns_summaries(self, dummy_request, dbsession, sample_product):
+        """Test only the shopper's orders come back, without nested products"""
+        add_order(dbsession, 'ORD-T1', 'amy@example.com', '555-1', sample_product, (2, 3))
+        add_order(dbsession, 'ORD-T2', 'amy@example.com', '555-1', sample_product)
+        add_order(dbsession, 'ORD-T3', 'bob@example.com', '555-2', sample_product)
+
+        dummy_request.params = {'email': ' amy@example.com '}
+        response = orders.track_orders(dummy_request)
+        summaries = {order['orderId']: order for order in response['orders']}
+        assert set(summaries) == {'ORD-T1', 'ORD-T2'}
+        assert summaries['ORD-T1']['itemCount'] == 5
+        assert summaries['ORD-T1']['total'] == 25
+        assert 'items' not in summaries['ORD-T1'] and 'customerInfo' not in summaries['ORD-T1']
+
+    def test_lookup_by_phone_and_order_id(self, dummy_request, dbsession, sample_product):
+        """Test every given parameter must match"""
+        add_order(dbsession, 'ORD-T1', 'amy@example.com', '555-1', sample_product)
+        add_order(dbsession, 'ORD-T2', 'amy@example.com', '555-1', sample_product)
+
+        dummy_request.params = {'phone': '555-1', 'orderId': 'ORD-T2'}
+        assert [o['orderId'] for o in orders.track_orders(dummy_request)['orders']] == ['ORD-T2']
+        dummy_request.params = {'email': 'bob@example.com', 'orderId': 'ORD-T2'}
+        assert orders.track_orders(dummy_request)['orders'] == []
+
+    def test_lookup_requires_a_key(self, dummy_request):
+        """Test the endpoint never lists orders without a lookup key"""
+        dummy_request.params = {'email': '  '}
+        assert orders.track_orders(dummy_request).status_code == 400
@@ -0,0 +1,45 @@
+import json
+
+from product_api import cache
+from product_api.models.product import Product
+from product_api.views import products
+
+
+def make_products(dbsession, count):
+    items = [Product(title=f"Item {i}", description="d", price=i + 1, stock=i) for i in range(count)]
+    dbsession.add_all(items)
+    dbsession.flush()
+    return items
+
+
+class TestBatchLookup:
+    def test_ids_query_returns_found_and_missing(self, dummy_request, dbsession):
+        """Test ?ids= keeps request order, drops duplicates and reports unknown ids"""
+        first, second = make_products(dbsession, 2)
+        dummy_request.params = {'ids': f"{second.id},999999,{first.id},{second.id}"}
+
+        response = products.get_products(dummy_request)
+        assert [p['id'] for p in response['products']] == [second.id, first.id]
+        assert response['missing'] == [999999]
+
+    def test_post_batch_uses_cached_json(self, config, dummy_request, dbsession):
+        """Test the POST body form and that the spliced JSON matches to_dict"""
+        config.registry['product_cache'] = cache.ProductCache()
+        first, second = make_products(dbsession, 2)
+        dummy_request.json_body = {'ids': [first.id, second.id]}
+
+        products.get_products_batch(dummy_request)
+        response = products.get_products_batch(dummy_request)
+        assert json.loads(response.body) == {'products': [first.to_dict(), second.to_dict()], 'missing': []}
+        assert cache.get_product_cache(config.registry).hits == 2
+
+    def test_batch_size_is_capped(self, dummy_request):
+        """Test oversized and malformed batches are rejected"""
+        dummy_request.json_body = {'ids': list(range(1, products.MAX_BATCH_IDS + 2))}
+        assert products.get_products_batch(dummy_request).status_code == 400
+        dummy_request.json_body = {'ids': [1] * (products.MAX_RAW_IDS + 1)}
+        assert products.get_products_batch(dummy_request).status_code == 400
+        dummy_request.json_body = {'ids': ['x']}
+        assert products.get_products_batch(dummy_request).status_code == 400
+        dummy_request.params = {'ids': ''}
+        assert products.get_products(dummy_request).status_code == 400
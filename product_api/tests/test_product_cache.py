@@ -0,0 +1,84 @@
+import json
+
+from product_api import cache
+from product_api.models.product import Product
+from product_api.views import admin, orders, products
+
+
+def body_of(response):
+    return json.loads(response.body)
+
+
+class TestProductCache:
+    def test_lru_eviction(self):
+        """Test the least recently read entry is evicted first"""
+        product_cache = cache.ProductCache(max_entries=2)
+        generation = product_cache.generation
+        product_cache.put(1, b'1', generation)
+        product_cache.put(2, b'2', generation)
+        assert product_cache.get(1) == b'1'
+        product_cache.put(3, b'3', generation)
+
+        assert product_cache.get(2) is None
+        assert product_cache.get(1) == b'1'
+        assert product_cache.get(3) == b'3'
+
+    def test_fill_from_before_invalidation_is_dropped(self):
+        """Test a reader that started before a write cannot store stale bytes"""
+        product_cache = cache.ProductCache()
+        generation = product_cache.generation
+        product_cache.invalidate([1])
+        product_cache.put(1, b'stale', generation)
+        product_cache.put_list(b'stale', generation)
+
+        assert product_cache.get(1) is None
+        assert product_cache.get_list() is None
+
+
+class TestCachedViews:
+    def test_get_product_hit_and_invalidation(self, config, dummy_request, dbsession):
+        """Test repeated reads hit and updates are visible immediately"""
+        config.registry['product_cache'] = cache.ProductCache()
+        product = Product(title="Desk Lamp", description="d", price=10, stock=5)
+        dbsession.add(product)
+        dbsession.flush()
+        dummy_request.matchdict = {'id': str(product.id)}
+
+        first = products.get_product(dummy_request)
+        second = products.get_product(dummy_request)
+        assert first.headers['X-Cache'] == 'MISS'
+        assert second.headers['X-Cache'] == 'HIT'
+        assert body_of(second) == product.to_dict()
+
+        dummy_request.json_body = {'title': 'Floor Lamp'}
+        products.update_product(dummy_request)
+        response = products.get_product(dummy_request)
+        assert response.headers['X-Cache'] == 'MISS'
+        assert body_of(response)['title'] == 'Floor Lamp'
+
+    def test_list_invalidated_by_order_stock_change(self, config, dummy_request, dbsession):
+        """Test placing an order drops the cached list with the old stock"""
+        config.registry['product_cache'] = cache.ProductCache()
+        product = Product(title="Mug", description="d", price=10, stock=5)
+        dbsession.add(product)
+        dbsession.flush()
+
+        assert products.get_products(dummy_request).headers['X-Cache'] == 'MISS'
+        assert products.get_products(dummy_request).headers['X-Cache'] == 'HIT'
+
+        dummy_request.json_body = {
+            'customerInfo': {'fullName': 'Budi', 'email': 'budi@example.com',
+                             'phoneNumber': '0812', 'address': 'Jl. Mawar 1'},
+            'items': [{'id': product.id, 'quantity': 2}],
+        }
+        orders.create_order(dummy_request)
+
+        response = products.get_products(dummy_request)
+        assert response.headers['X-Cache'] == 'MISS'
+        stock = {p['id']: p['stock'] for p in body_of(response)['products']}
+        assert stock[product.id] == 3
+
+    def test_disabled_cache_uses_renderer(self, config, dummy_request):
+        """Test views return plain dicts when the cache is not configured"""
+        assert products.get_products(dummy_request) == {'products': []}
+        assert admin.get_product_cache_stats(dummy_request) == {'enabled': False}
@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+from product_api import changes
+from product_api.models.catalog import CatalogChange
+from product_api.models.meta import utcnow
+from product_api.models.product import Product
+from product_api.views import products
+
+
+def feed(dummy_request, since, **params):
+    dummy_request.params = dict(params, since=str(since))
+    return products.get_product_changes(dummy_request)
+
+
+class TestChangeFeed:
+    def test_upserts_and_tombstones_since_position(self, dummy_request, dbsession):
+        """Test a client only receives what changed after its position"""
+        dummy_request.params = {}
+        start = products.get_product_changes(dummy_request)['nextSince']
+
+        lamp = Product(title="Lamp", description="d", price=10, stock=5)
+        chair = Product(title="Chair", description="d", price=20, stock=1)
+        dbsession.add_all([lamp, chair])
+        dbsession.commit()
+        lamp.stock = 3
+        dbsession.commit()
+        dbsession.delete(chair)
+        dbsession.commit()
+
+        response = feed(dummy_request, start)
+        assert [(c['op'], c.get('id') or c['product']['id']) for c in response['changes']] == [
+            ('upsert', lamp.id), ('delete', chair.id)]
+        assert response['changes'][0]['product']['stock'] == 3
+        assert response['hasMore'] is False
+
+        assert feed(dummy_request, response['nextSince'])['changes'] == []
+
+    def test_paging(self, dummy_request, dbsession):
+        """Test limit splits the feed and nextSince resumes it"""
+        dummy_request.params = {}
+        start = products.get_product_changes(dummy_request)['nextSince']
+        for title in ("A", "B", "C"):
+            dbsession.add(Product(title=title, description="d", price=1, stock=1))
+            dbsession.commit()
+
+        first = feed(dummy_request, start, limit='2')
+        second = feed(dummy_request, first['nextSince'], limit='2')
+        assert first['hasMore'] and not second['hasMore']
+        assert [c['product']['title'] for c in first['changes'] + second['changes']] == ["A", "B", "C"]
+
+    def test_invalid_since(self, dummy_request):
+        """Test a malformed position is rejected"""
+        assert feed(dummy_request, 'abc').status_code == 400
+
+
+class TestPruning:
+    def test_compact_keeps_latest_entry_per_product(self, dbsession):
+        """Test superseded entries are removed"""
+        product = Product(title="Lamp", description="d", price=10, stock=5)
+        dbsession.add(product)
+        dbsession.commit()
+        for stock in (4, 3, 2):
+            product.stock = stock
+            dbsession.commit()
+
+        changes.compact(dbsession)
+        rows = dbsession.query(CatalogChange).filter(CatalogChange.product_id == product.id).all()
+        assert len(rows) == 1
+
+    def test_expired_position_gets_410(self, dummy_request, dbsession):
+        """Test clients behind the retention horizon are told to reload"""
+        dummy_request.params = {}
+        start = products.get_product_changes(dummy_request)['nextSince']
+        dbsession.add(Product(title="Old", description="d", price=1, stock=1))
+        dbsession.commit()
+
+        assert changes.expire(dbsession, retention_days=1, now=utcnow() + timedelta(days=2)) >= 1
+        response = feed(dummy_request, start)
+        assert response.status_code == 410
+        assert feed(dummy_request, changes.latest_seq(dbsession))['changes'] == []
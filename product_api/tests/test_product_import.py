@@ -0,0 +1,123 @@
+import io
+import json
+
+from sqlalchemy import create_engine
+from webtest import TestApp
+
+from product_api import importer, main
+from product_api.models.catalog import CatalogChange
+from product_api.models.meta import Base
+from product_api.models.product import Product
+from product_api.views import products
+
+CSV = (
+    "sku,title,description,price,stock\n"
+    "A-1,Desk Lamp,Warm light,12.50,4\n"
+    "A-2,,No title,3,1\n"
+    "A-3,Chair,Oak,abc,1\n"
+    ",Loose Item,No sku,1,\n"
+)
+
+
+def run_import(dbsession, data, fmt):
+    return importer.import_products(dbsession, importer.iter_records(io.BytesIO(data.encode()), fmt),
+                                    batch_size=2)
+
+
+class TestImporter:
+    def test_csv_rows_validated_like_create_product(self, dbsession):
+        """Test valid rows are written and invalid ones reported by row number"""
+        report = run_import(dbsession, CSV, 'csv')
+
+        assert report.imported == 2
+        assert [error['row'] for error in report.errors] == [2, 3]
+        assert report.errors[0]['error'] == 'title is required'
+        lamp = dbsession.query(Product).filter(Product.sku == 'A-1').one()
+        assert (lamp.title, float(lamp.price), lamp.stock) == ('Desk Lamp', 12.5, 4)
+        assert dbsession.query(Product).filter(Product.title == 'Loose Item').one().stock == 0
+
+    def test_upsert_on_sku(self, dbsession):
+        """Test re-importing a SKU updates the row and bumps its version"""
+        run_import(dbsession, CSV, 'csv')
+        lines = [json.dumps({'sku': 'A-1', 'title': 'Desk Lamp', 'description': 'Cool light',
+                             'price': 15, 'stock': 9}),
+                 '', 'not json', '[1, 2]']
+        report = run_import(dbsession, '\n'.join(lines), 'ndjson')
+
+        assert report.imported == 1
+        assert [error['row'] for error in report.errors] == [3, 4]
+        dbsession.expire_all()
+        lamp = dbsession.query(Product).filter(Product.sku == 'A-1').one()
+        assert (lamp.description, lamp.stock, lamp.version) == ('Cool light', 9, 2)
+        assert dbsession.query(Product).filter(Product.sku == 'A-1').count() == 1
+
+    def test_non_finite_prices_are_rejected(self, dbsession):
+        """Test nan and inf convert to float but are reported, not imported"""
+        report = run_import(dbsession, "title,description,price\nA,x,nan\nB,x,inf\nC,x,-Infinity\n", 'csv')
+        assert report.imported == 0
+        assert {error['error'] for error in report.errors} == {'price must be a finite number'}
+
+    def test_values_checked_against_columns(self, dbsession):
+        """Test too long or non-string text fields are reported per row"""
+        lines = [json.dumps(record) for record in (
+            {'title': 'T' * 256, 'description': 'x', 'price': 1},
+            {'title': 5, 'description': 'x', 'price': 1},
+            {'title': 'Lamp', 'description': ['x'], 'price': 1},
+            {'title': 'Lamp', 'description': 'x', 'price': 1, 'sku': 'S' * 65},
+            {'title': 'T' * 255, 'description': 'x', 'price': 1, 'sku': 'S' * 64},
+        )]
+        report = run_import(dbsession, '\n'.join(lines), 'ndjson')
+
+        assert report.imported == 1
+        assert [(error['row'], error['error']) for error in report.errors] == [
+            (1, 'title must be at most 255 characters'),
+            (2, 'title must be a string'),
+            (3, 'description must be a string'),
+            (4, 'sku must be at most 64 characters'),
+        ]
+
+    def test_repeated_sku_counted_once(self, dbsession):
+        """Test a SKU repeated across batches of one file is one imported product"""
+        rows = ''.join(f"A-1,Lamp {n},x,1\n" for n in range(5))
+        report = run_import(dbsession, "sku,title,description,price\n" + rows + ",Loose,x,1\n", 'csv')
+
+        assert report.imported == 2
+        assert len(report.product_ids) == 2
+        assert dbsession.query(Product).filter(Product.sku == 'A-1').one().title == 'Lamp 4'
+
+    def test_import_is_published_to_change_feed(self, dbsession):
+        """Test Core-level writes still reach the change log on commit"""
+        report = run_import(dbsession, CSV, 'csv')
+        dbsession.commit()
+        logged = {row.product_id for row in dbsession.query(CatalogChange)}
+        assert set(report.product_ids) <= logged
+
+
+class TestImportView:
+    def test_import_endpoint(self, dummy_request, dbsession):
+        """Test the endpoint streams the body and returns the report"""
+        dummy_request.content_type = 'text/csv'
+        dummy_request.body_file = io.BytesIO(CSV.encode())
+
+        response = products.bulk_import_products(dummy_request)
+        assert response['imported'] == 2
+        assert response['failed'] == 2
+        assert response['errorsTruncated'] is False
+
+    def test_unknown_format(self, dummy_request):
+        """Test a body in an unsupported format is rejected"""
+        dummy_request.content_type = 'application/xml'
+        assert products.bulk_import_products(dummy_request).status_code == 400
+
+    def test_failed_import_writes_nothing(self, tmp_path, admin_headers):
+        """Test batches written before a decoding error are rolled back with the 400"""
+        url = f"sqlite:///{tmp_path / 'app.sqlite'}"
+        Base.metadata.create_all(create_engine(url))
+        app = TestApp(main({}, **{'sqlalchemy.url': url}))
+        rows = ''.join(f'S-{i},Item {i},x,1,1\n' for i in range(importer.DEFAULT_BATCH_SIZE + 1000))
+        body = b'sku,title,description,price,stock\n' + rows.encode() + b'S-x,\xff\xfe,x,1,1\n'
+
+        response = app.post('/api/products/import', body, headers=admin_headers(app), content_type='text/csv',
+                            status=400)
+        assert 'UTF-8' in response.json['error']
+        assert app.get('/api/products').json['products'] == []
@@ -0,0 +1,103 @@
+import base64
+import json
+
+from product_api.models.product import Product
+from product_api.views import products
+
+
+def add_products(dbsession, count=7):
+    items = [
+        Product(
+            title=f"Item {i:02d}",
+            description=f"Description {i}",
+            price=10 + (i % 3),
+            stock=i % 4,
+        )
+        for i in range(count)
+    ]
+    dbsession.add_all(items)
+    dbsession.flush()
+    return items
+
+
+def raw_cursor(sort_key, value, row_id=1):
+    """A cursor as a client could forge it"""
+    payload = json.dumps([sort_key, value, row_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+class TestProductPagination:
+    def test_no_params_returns_full_catalog(self, dummy_request, dbsession):
+        """Test the unparameterised listing keeps its original shape"""
+        add_products(dbsession, 3)
+        response = products.get_products(dummy_request)
+        assert set(response) == {'products'}
+        assert len(response['products']) == 3
+
+    def test_walk_pages_by_id(self, dummy_request, dbsession):
+        """Test following nextCursor visits every product exactly once"""
+        created = add_products(dbsession)
+        seen = []
+        cursor = None
+        while True:
+            dummy_request.params = {'limit': '3'}
+            if cursor:
+                dummy_request.params['cursor'] = cursor
+            response = products.get_products(dummy_request)
+            seen.extend(p['id'] for p in response['products'])
+            cursor = response['nextCursor']
+            if not cursor:
+                break
+        assert seen == [p.id for p in created]
+
+    def test_sort_by_price_descending_with_ties(self, dummy_request, dbsession):
+        """Test keyset paging is stable across equal sort values"""
+        created = add_products(dbsession)
+        expected = [p.id for p in sorted(created, key=lambda p: (-p.price, -p.id))]
+
+        dummy_request.params = {'limit': '4', 'sort': '-price'}
+        first = products.get_products(dummy_request)
+        dummy_request.params = {'limit': '4', 'sort': '-price', 'cursor': first['nextCursor']}
+        second = products.get_products(dummy_request)
+
+        ids = [p['id'] for p in first['products'] + second['products']]
+        assert ids == expected
+        assert second['nextCursor'] is None
+
+    def test_filters(self, dummy_request, dbsession):
+        """Test price range and in_stock filters"""
+        add_products(dbsession)
+        dummy_request.params = {'min_price': '11', 'max_price': '11', 'in_stock': 'true'}
+        response = products.get_products(dummy_request)
+        assert response['products']
+        for product in response['products']:
+            assert product['price'] == 11
+            assert product['stock'] > 0
+
+    def test_cursor_from_other_sort_rejected(self, dummy_request, dbsession):
+        """Test a cursor cannot be replayed against a different sort order"""
+        add_products(dbsession)
+        dummy_request.params = {'limit': '2', 'sort': 'title'}
+        cursor = products.get_products(dummy_request)['nextCursor']
+
+        dummy_request.params = {'limit': '2', 'sort': 'price', 'cursor': cursor}
+        response = products.get_products(dummy_request)
+        assert response.status_code == 400
+
+    def test_invalid_params(self, dummy_request):
+        """Test malformed paging parameters return 400"""
+        for params in ({'limit': 'abc'}, {'sort': 'color'}, {'cursor': '!!'},
+                       {'min_price': 'cheap'}, {'in_stock': 'maybe'}):
+            dummy_request.params = params
+            response = products.get_products(dummy_request)
+            assert response.status_code == 400
+
+
+    def test_crafted_cursors_rejected(self, dummy_request, dbsession):
+        """Test cursors with undecodable or mistyped values are 400, not 500"""
+        add_products(dbsession, 3)
+        for sort, value in (('price', {'d': 'abc'}), ('price', {'t': 'notadate'}), ('price', {'x': 1}),
+                            ('price', {'d': 'NaN'}), ('price', 'cheap'), ('price', [1]), ('id', {'d': '1'})):
+            dummy_request.params = {'sort': sort, 'cursor': raw_cursor(sort, value)}
+            response = products.get_products(dummy_request)
+            assert response.status_code == 400, value
@@ -0,0 +1,74 @@
+import json
+
+from product_api import search
+from product_api.models.product import Product
+from product_api.views import products
+
+
+def search_ids(dummy_request, q):
+    dummy_request.params = {'q': q}
+    return [p['id'] for p in products.search_products(dummy_request)['products']]
+
+
+class TestProductSearch:
+    def test_title_match_ranks_above_description_match(self, dummy_request, dbsession):
+        """Test title hits outrank description-only hits"""
+        in_description = Product(title="Plain Mug", description="Goes well with a wireless keyboard", price=5)
+        in_title = Product(title="Wireless Keyboard", description="Compact layout", price=30)
+        unrelated = Product(title="Desk Lamp", description="Warm light", price=12)
+        dbsession.add_all([in_description, in_title, unrelated])
+        dbsession.flush()
+
+        assert search_ids(dummy_request, 'wireless keyboard') == [in_title.id, in_description.id]
+
+    def test_every_match_is_ranked_below_the_cap(self, dummy_request, dbsession):
+        """Test matches within MAX_CANDIDATES are ranked whatever their insertion order"""
+        weaker = Product(title="Lamp Stand With Extra Long Adjustable Arm", description="Metal", price=20)
+        stronger = Product(title="Lamp", description="Warm light", price=12)
+        dbsession.add_all([weaker, stronger])
+        dbsession.flush()
+
+        assert search_ids(dummy_request, 'lamp') == [stronger.id, weaker.id]
+
+    def test_frequent_terms_score_a_bounded_number_of_rows(self, dummy_request, dbsession, monkeypatch):
+        """Test a term matching more than MAX_CANDIDATES rows reads only that many"""
+        monkeypatch.setattr(search, 'MAX_CANDIDATES', 3)
+        dbsession.add_all([Product(title=f"Lamp {i}", description="Warm light", price=12) for i in range(10)])
+        dbsession.flush()
+
+        assert len(search_ids(dummy_request, 'lamp')) == 3
+
+    def test_index_follows_create_update_delete(self, dummy_request, dbsession):
+        """Test the index stays in sync through the product write views"""
+        dummy_request.json_body = {'title': 'Bamboo Cutting Board', 'description': 'Kitchen', 'price': 9}
+        created = products.create_product(dummy_request)
+        product_id = json.loads(created.body)['id']
+        assert search_ids(dummy_request, 'bamboo') == [product_id]
+
+        dummy_request.matchdict = {'id': str(product_id)}
+        dummy_request.json_body = {'title': 'Oak Cutting Board'}
+        products.update_product(dummy_request)
+        dbsession.flush()
+        assert search_ids(dummy_request, 'bamboo') == []
+        assert search_ids(dummy_request, 'oak') == [product_id]
+
+        products.delete_product(dummy_request)
+        dbsession.flush()
+        assert search_ids(dummy_request, 'oak') == []
+
+    def test_query_syntax_is_not_interpreted(self, dummy_request, dbsession):
+        """Test FTS operators in user input are treated as plain words"""
+        dbsession.add(Product(title="Red Cable", description="USB-C", price=3))
+        dbsession.flush()
+        assert search_ids(dummy_request, 'title: "red* OR NEAR(') == []
+        assert len(search_ids(dummy_request, 'usb-c')) == 1
+
+    def test_missing_query(self, dummy_request):
+        """Test q is required"""
+        response = products.search_products(dummy_request)
+        assert response.status_code == 400
+
+    def test_search_terms(self):
+        """Test tokenisation lowercases and caps the number of terms"""
+        assert search.search_terms('Wireless  MOUSE!') == ['wireless', 'mouse']
+        assert len(search.search_terms(' '.join(['a'] * 50))) == search.MAX_TERMS
@@ -0,0 +1,176 @@
+import bisect
+import random
+import threading
+
+import transaction
+
+from product_api import commit_hooks, suggest
+from product_api.models.order import OrderItem, Order
+from product_api.models.product import Product
+from product_api.views import products
+
+
+def titles(results):
+    return [result['title'] for result in results]
+
+
+class TestSuggestIndex:
+    def test_prefix_match_is_case_insensitive_and_alphabetical(self):
+        """Test prefix lookup without sales data"""
+        index = suggest.SuggestIndex()
+        index.build([(1, 'Wireless Mouse'), (2, 'wired Keyboard'), (3, 'Webcam'), (4, 'Mouse Pad')])
+        assert titles(index.lookup('WIR')) == ['wired Keyboard', 'Wireless Mouse']
+        assert titles(index.lookup('mouse')) == ['Mouse Pad']
+        assert index.lookup('zzz') == []
+        assert index.lookup('   ') == []
+
+    def test_popularity_ranks_first(self):
+        """Test units sold outrank alphabetical order"""
+        index = suggest.SuggestIndex()
+        index.build([(1, 'Lamp Alpha'), (2, 'Lamp Beta'), (3, 'Lamp Gamma')], {3: 5, 2: 1})
+        assert titles(index.lookup('lamp', limit=2)) == ['Lamp Gamma', 'Lamp Beta']
+
+        index.add_weight(1, 10)
+        assert index.lookup('lamp', limit=1) == [{'id': 1, 'title': 'Lamp Alpha', 'popularity': 10}]
+
+    def test_incremental_updates(self):
+        """Test upsert renames and remove drops entries"""
+        index = suggest.SuggestIndex()
+        index.build([(1, 'Desk Lamp')])
+        index.upsert(2, 'Desk Chair')
+        index.upsert(1, 'Floor Lamp')
+        assert titles(index.lookup('desk')) == ['Desk Chair']
+        assert titles(index.lookup('floor')) == ['Floor Lamp']
+
+        index.remove(2)
+        assert index.lookup('desk') == []
+        assert len(index) == 1
+
+    def test_memoised_broad_prefix_is_invalidated(self, monkeypatch):
+        """Test results cached for broad prefixes are dropped on writes"""
+        monkeypatch.setattr(suggest, 'MEMO_THRESHOLD', 2)
+        index = suggest.SuggestIndex()
+        index.build([(1, 'Cable A'), (2, 'Cable B'), (3, 'Cable C')])
+        assert titles(index.lookup('cable', limit=1)) == ['Cable A']
+        index.add_weight(3, 1)
+        assert titles(index.lookup('cable', limit=1)) == ['Cable C']
+
+    def test_memo_is_patched_not_dropped(self, monkeypatch):
+        """Test sales keep memoised rankings exact without discarding unrelated prefixes"""
+        monkeypatch.setattr(suggest, 'MEMO_THRESHOLD', 2)
+        rng = random.Random(7)
+        index = suggest.SuggestIndex()
+        index.build([(i, f"{word} {i:02d}") for i, word in enumerate(['Cable', 'Case', 'Desk'] * 10)])
+        cable, desk = index.lookup('cable', limit=3), index.lookup('desk', limit=3)
+        index.add_weight(0, 5)  # a cable
+        assert index.lookup('desk', limit=3) is desk
+        assert index.lookup('cable', limit=3) is not cable
+
+        for _ in range(200):
+            index.add_weight(rng.randrange(30), rng.randint(1, 3))
+            for prefix in ('c', 'ca', 'cable', 'desk'):
+                start, end = (bisect.bisect_left(index._keys, folded)
+                              for folded in (prefix, prefix + '\U0010ffff'))
+                assert index.lookup(prefix, limit=3) == index._rank(index._keys, index._weights, start, end, 3)
+
+    def test_prefix_range_covers_astral_characters(self):
+        """Test titles continuing with characters above U+FFFF still match"""
+        index = suggest.SuggestIndex()
+        index.build([(1, 'Mug \U0001f600'), (2, 'Mug \uffef')])
+        assert titles(index.lookup('mug ')) == ['Mug \uffef', 'Mug \U0001f600']
+
+
+class TestSuggestService:
+    def test_writes_during_rebuild_are_replayed(self):
+        """Test a background rebuild keeps the writes made while it was reading"""
+        reading, release = threading.Event(), threading.Event()
+
+        class Session:
+            def query(self, *columns):
+                return self
+
+            def execution_options(self, **options):
+                return self
+
+            def group_by(self, column):
+                return self
+
+            def __iter__(self):
+                if not reading.is_set():
+                    reading.set()
+                    release.wait(5)
+                    return iter([(1, 'Desk Lamp'), (2, 'Desk Chair')])
+                return iter([(2, 3)])
+
+            def close(self):
+                pass
+
+        service = suggest.SuggestService(Session, refresh_interval=0)
+        service.index.build([(1, 'Desk Lamp')])
+        service.refresh()
+        assert reading.wait(5)
+        service.refresh()  # already running: no second rebuild
+        service.product_saved(3, 'Desk Fan')
+        service.items_sold([(1, 4)])
+        service.product_deleted(2)
+        release.set()
+        for thread in threading.enumerate():
+            if thread.name == 'suggest-refresh':
+                thread.join(5)
+
+        assert service.index.lookup('desk') == [{'id': 1, 'title': 'Desk Lamp', 'popularity': 4},
+                                                 {'id': 3, 'title': 'Desk Fan', 'popularity': 0}]
+        assert service._pending is None and not service._refreshing
+
+
+class TestSuggestView:
+    def test_loads_from_database_and_follows_writes(self, config, dummy_request, dbsession, sample_customer):
+        """Test the view builds the index lazily and views keep it current"""
+        popular = Product(title="Smart Watch", description="d", price=10, stock=5)
+        other = Product(title="Smart Speaker", description="d", price=10, stock=5)
+        dbsession.add_all([popular, other])
+        dbsession.flush()
+        order = Order(order_id="ORD-SUGGEST", customer_info_id=sample_customer.id, subtotal=10, total=10)
+        dbsession.add(order)
+        dbsession.flush()
+        dbsession.add(OrderItem(order_id=order.id, product_id=popular.id, quantity=3, price=10))
+        dbsession.flush()
+
+        dummy_request.params = {'prefix': 'sma'}
+        response = products.suggest_products(dummy_request)
+        assert titles(response['suggestions']) == ['Smart Watch', 'Smart Speaker']
+
+        dummy_request.json_body = {'title': 'Smart Ring', 'description': 'd', 'price': 5}
+        products.create_product(dummy_request)
+        dummy_request.matchdict = {'id': str(popular.id)}
+        products.delete_product(dummy_request)
+
+        response = products.suggest_products(dummy_request)
+        assert titles(response['suggestions']) == ['Smart Ring', 'Smart Speaker']
+
+    def test_prefix_required(self, config, dummy_request):
+        """Test an empty prefix is rejected"""
+        assert products.suggest_products(dummy_request).status_code == 400
+
+
+class TestAfterCommit:
+    def test_runs_only_on_commit(self, dummy_request):
+        """Test callbacks are deferred to commit and skipped on abort"""
+        calls = []
+        dummy_request.tm = transaction.TransactionManager()
+
+        dummy_request.tm.begin()
+        commit_hooks.after_commit(dummy_request, calls.append, 'aborted')
+        dummy_request.tm.abort()
+        dummy_request.tm.begin()
+        commit_hooks.after_commit(dummy_request, calls.append, 'committed')
+        assert calls == []
+        dummy_request.tm.commit()
+
+        assert calls == ['committed']
+
+    def test_runs_immediately_without_transaction_manager(self, dummy_request):
+        """Test bare requests (scripts, unit tests) apply the change at once"""
+        calls = []
+        commit_hooks.after_commit(dummy_request, calls.append, 1)
+        assert calls == [1]
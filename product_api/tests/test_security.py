@@ -0,0 +1,169 @@
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+import jwt
+import pytest
+from pyramid.exceptions import ConfigurationError
+from sqlalchemy import create_engine
+from webtest import TestApp
+
+from product_api import main, security
+from product_api.models import RevokedToken
+from product_api.models.meta import utcnow
+from product_api.models.meta import Base
+
+
+def token_for(admin, secret=security.DEFAULT_JWT_SECRET, expires_in=3600, **claims):
+    return jwt.encode(dict(claims, admin_id=admin.id, exp=int(time.time()) + expires_in), secret,
+                      algorithm=security.JWT_ALGORITHM)
+
+
+def bearer(dummy_request, token):
+    dummy_request.headers = {'Authorization': f'Bearer {token}'}
+    return dummy_request
+
+
+class TestAuthenticator:
+    def test_claims_decoded_once_per_token(self, dummy_request, sample_admin):
+        """Test a cached token is not verified again"""
+        authenticator = security.Authenticator()
+        bearer(dummy_request, token_for(sample_admin))
+        with patch('product_api.security.jwt.decode', wraps=jwt.decode) as decode:
+            for _ in range(3):
+                assert authenticator.authenticate(dummy_request).id == sample_admin.id
+        assert decode.call_count == 1
+
+    def test_expired_tokens_are_rejected(self, dummy_request, sample_admin):
+        """Test expired and foreign-signed tokens are never accepted or cached"""
+        authenticator = security.Authenticator()
+        for token, error in ((token_for(sample_admin, expires_in=-10), 'Token has expired'),
+                             (token_for(sample_admin, secret='x' * 32), 'Invalid token'),
+                             ('not-a-jwt', 'Invalid token')):
+            with pytest.raises(security.AuthenticationError, match=error):
+                authenticator.authenticate(bearer(dummy_request, token))
+        assert len(authenticator.claims) == 0
+
+    def test_deactivation_drops_cached_admin(self, dummy_request, dbsession, sample_admin):
+        """Test flushing a deactivated admin stops its cached token from working"""
+        authenticator = security.Authenticator()
+        bearer(dummy_request, token_for(sample_admin))
+        assert authenticator.authenticate(dummy_request).username == 'testadmin'
+
+        sample_admin.is_active = False
+        dbsession.flush()
+        with pytest.raises(security.AuthenticationError, match='deactivated'):
+            authenticator.authenticate(dummy_request)
+
+
+class TestJwtSecret:
+    def test_app_refuses_to_start_without_a_secret(self, monkeypatch):
+        """Test a missing, placeholder or short secret stops startup; the environment wins"""
+        monkeypatch.delenv(security.JWT_SECRET_ENVIRON, raising=False)
+        for settings in ({}, {'auth.jwt_secret': 'change-me'}, {'auth.jwt_secret': security.DEFAULT_JWT_SECRET},
+                         {'auth.jwt_secret': 'short'}):
+            with pytest.raises(ConfigurationError):
+                security.jwt_secret(settings)
+        monkeypatch.setenv(security.JWT_SECRET_ENVIRON, 's' * 32)
+        assert security.jwt_secret({'auth.jwt_secret': 'change-me'}) == 's' * 32
+
+
+class TestSecurityPolicy:
+    @pytest.fixture
+    def app(self, tmp_path):
+        url = f"sqlite:///{tmp_path / 'app.sqlite'}"
+        Base.metadata.create_all(create_engine(url))
+        return TestApp(main({}, **{'sqlalchemy.url': url}))
+
+    def test_admin_views_need_a_token(self, app, admin_headers):
+        """Test protected views answer 401 JSON without a valid token and work with one"""
+        for method, path in (('get', '/api/orders'), ('get', '/api/customers'), ('delete', '/api/products/1'),
+                             ('get', '/api/export/customers'), ('post', '/api/admin/create'),
+                             ('post', '/api/orders'), ('get', '/api/orders/order-id/ORD-1')):
+            response = getattr(app, method)(path, status=401)
+            assert response.json == {'error': 'Authorization token required'}
+            assert response.headers['WWW-Authenticate'] == 'Bearer'
+        response = app.get('/api/orders', headers={'Authorization': 'Bearer nope'}, status=401)
+        assert response.json == {'error': 'Invalid token'}
+
+        headers = admin_headers(app)
+        assert app.get('/api/orders', headers=headers).json == {'orders': []}
+        assert app.get('/api/customers', headers=headers).json == {'customers': []}
+
+    def test_storefront_stays_public(self, app, admin_headers):
+        """Test browsing, checkout, tracking and preflight need no token"""
+        product = app.post_json('/api/products', {'title': 'Pen', 'description': 'Blue', 'price': 2, 'stock': 5},
+                                headers=admin_headers(app)).json
+        assert app.get('/api/products').json['products'][0]['id'] == product['id']
+        order = app.post_json('/api/checkout', {
+            'customerInfo': {'fullName': 'A', 'email': 'a@example.com', 'address': 'x', 'phoneNumber': '1'},
+            'items': [{'id': product['id'], 'quantity': 1}]}).json
+        assert app.get('/api/orders/track', {'email': 'a@example.com'}).json['orders'][0]['id'] == order['id']
+        assert app.get(f"/api/orders/order-id/{order['orderId']}", status=401)
+        assert app.options('/api/orders').status_code == 200
+
+
+class TestRevocation:
+    def test_logout_revokes_the_token(self, tmp_path, admin_headers):
+        """Test a logged-out token is refused while a fresh login works"""
+        url = f"sqlite:///{tmp_path / 'app.sqlite'}"
+        Base.metadata.create_all(create_engine(url))
+        app = TestApp(main({}, **{'sqlalchemy.url': url}))
+        headers = admin_headers(app)
+        app.get('/api/orders', headers=headers)
+
+        assert app.post('/api/admin/logout', headers=headers).json == {'message': 'Logout successful'}
+        response = app.get('/api/orders', headers=headers, status=401)
+        assert response.json == {'error': 'Token has been revoked'}
+        app.post('/api/admin/logout', headers=headers, status=401)
+        token = app.post_json('/api/admin/login', {'username': 'testadmin', 'password': 'testpassword123'}).json['token']
+        assert app.get('/api/orders', headers={'Authorization': f'Bearer {token}'}).json == {'orders': []}
+
+    def test_other_processes_see_revocations_on_refresh(self, dummy_request, dbsession, sample_admin,
+                                                        count_queries):
+        """Test revocations are checked in memory and picked up by the next refresh"""
+        authenticator = security.Authenticator(revocation_refresh_interval=60)
+        bearer(dummy_request, token_for(sample_admin, jti='stolen'))
+        authenticator.authenticate(dummy_request)
+        with count_queries() as queries:
+            authenticator.authenticate(dummy_request)
+        assert queries == []
+
+        security.revoke(dummy_request)  # through another authenticator, as in another process
+        assert authenticator.authenticate(dummy_request).id == sample_admin.id
+        authenticator.revocations.refresh(dbsession)
+        with pytest.raises(security.AuthenticationError, match='revoked'):
+            authenticator.authenticate(dummy_request)
+
+    def test_revoked_twice_across_processes(self, dummy_request, dbsession, sample_admin):
+        """Test logging out a token another process already revoked succeeds"""
+        bearer(dummy_request, token_for(sample_admin, jti='shared'))
+        first, second = security.Authenticator(), security.Authenticator(revocation_refresh_interval=60)
+        second.authenticate(dummy_request)  # refreshed before the first logout
+        for authenticator in (first, second):
+            dummy_request.registry = {'authenticator': authenticator}
+            assert security.revoke(dummy_request).id == sample_admin.id
+        dbsession.flush()
+        assert [row.jti for row in dbsession.query(RevokedToken)] == ['shared']
+
+    def test_non_string_jti_is_invalid(self, dummy_request, sample_admin):
+        """Test a jti that cannot be a revocation key is refused, not a 500"""
+        authenticator = security.Authenticator()
+        for jti in (['a'], {'a': 1}, 7):
+            with pytest.raises(security.AuthenticationError, match='Invalid token'):
+                authenticator.authenticate(bearer(dummy_request, token_for(sample_admin, jti=jti)))
+
+    def test_expired_revocations_are_dropped(self, dbsession, sample_admin):
+        """Test revocations of expired tokens leave memory and the table"""
+        dbsession.add_all([
+            RevokedToken(jti='old', admin_id=sample_admin.id, expires_at=utcnow() - timedelta(seconds=1)),
+            RevokedToken(jti='live', admin_id=sample_admin.id, expires_at=utcnow() + timedelta(hours=1)),
+        ])
+        dbsession.flush()
+        revocations = security.RevocationList()
+        revocations.add('gone', time.time() - 1)
+        revocations.refresh(dbsession)
+        assert len(revocations) == 1 and revocations.is_revoked(dbsession, 'live')
+
+        assert security.purge_expired_revocations(dbsession) == 1
+        assert [row.jti for row in dbsession.query(RevokedToken)] == ['live']
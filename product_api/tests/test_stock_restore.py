@@ -0,0 +1,119 @@
+import itertools
+
+from sqlalchemy import create_engine
+from webtest import TestApp
+
+from product_api import inventory, main
+from product_api.models.customer_info import CustomerInfo
+from product_api.models.meta import Base
+from product_api.models.order import Order, OrderItem
+from product_api.models.product import Product
+from product_api.views import orders
+
+ORDER_NUMBERS = itertools.count()
+
+
+def add_products(dbsession):
+    pen = Product(title='Pen', description='Blue', price=1, stock=10)
+    pad = Product(title='Pad', description='A5', price=2, stock=0)
+    dbsession.add_all([pen, pad])
+    dbsession.flush()
+    return pen, pad
+
+
+def add_order(dbsession, status, lines):
+    order_id = f'ORD-R-{next(ORDER_NUMBERS):04d}'
+    customer = CustomerInfo(full_name='Customer', email=f'{order_id}@example.com',
+                            address='1 Main Street', phone_number='555-0100')
+    order = Order(order_id=order_id, customer_info=customer,
+                  subtotal=10, shipping=0, total=10, status=status)
+    order.order_items = [OrderItem(product=product, quantity=quantity, price=1) for product, quantity in lines]
+    dbsession.add(order)
+    dbsession.flush()
+    return order
+
+
+class TestRestoreStock:
+    def test_restores_once(self, dbsession):
+        """Test stock_restored makes a second restore a no-op"""
+        pen, pad = add_products(dbsession)
+        order = add_order(dbsession, 'cancelled', [(pen, 2), (pad, 1), (pen, 1)])
+
+        restored, products = inventory.restore_stock(dbsession, [order.id])
+        assert restored == [order.id]
+        assert sorted(product.id for product in products) == sorted([pen.id, pad.id])
+        assert (pen.stock, pad.stock) == (13, 1)
+        assert order.stock_restored is True
+
+        assert inventory.restore_stock(dbsession, [order.id]) == ([], [])
+        assert (pen.stock, pad.stock) == (13, 1)
+
+    def test_endpoint(self, dummy_request, dbsession):
+        """Test restore-stock answers restored, then already_restored; 409/404 otherwise"""
+        pen, _ = add_products(dbsession)
+        cancelled = add_order(dbsession, 'cancelled', [(pen, 4)])
+        pending = add_order(dbsession, 'pending', [(pen, 1)])
+
+        dummy_request.matchdict = {'id': str(cancelled.id)}
+        assert orders.restore_order_stock(dummy_request) == {
+            'id': cancelled.id, 'result': 'restored', 'productIds': [pen.id]}
+        assert orders.restore_order_stock(dummy_request)['result'] == 'already_restored'
+        assert pen.stock == 14
+
+        dummy_request.matchdict = {'id': str(pending.id)}
+        assert orders.restore_order_stock(dummy_request).status_code == 409
+        dummy_request.matchdict = {'id': '999999'}
+        assert orders.restore_order_stock(dummy_request).status_code == 404
+
+    def test_batch_aggregates_per_product(self, dummy_request, dbsession, count_queries):
+        """Test many orders are restocked with one UPDATE of products"""
+        pen, pad = add_products(dbsession)
+        created = [add_order(dbsession, 'cancelled', [(pen, 1), (pad, 2)]) for _ in range(5)]
+        shipping = add_order(dbsession, 'shipping', [(pen, 1)])
+
+        dummy_request.json_body = {'ids': [order.id for order in created] + [shipping.id]}
+        with count_queries() as queries:
+            response = orders.batch_restore_order_stock(dummy_request)
+        assert response['restored'] == 5
+        assert response['results'][-1] == {'id': shipping.id, 'result': 'not_cancelled', 'from': 'shipping'}
+        assert sum(1 for sql in queries if sql.startswith('UPDATE products')) == 1
+        assert (pen.stock, pad.stock) == (15, 10)
+
+    def test_cancel_then_restore_call_does_not_double(self, dummy_request, dbsession):
+        """Test the admin console's restore call after a cancelling PUT changes nothing"""
+        pen, _ = add_products(dbsession)
+        order = add_order(dbsession, 'pending', [(pen, 3)])
+        dummy_request.matchdict = {'id': str(order.id)}
+        dummy_request.json_body = {'status': 'cancelled'}
+        orders.update_order_status(dummy_request)
+        assert orders.restore_order_stock(dummy_request)['result'] == 'already_restored'
+        assert pen.stock == 13
+
+    def test_delete_does_not_restore_twice(self, dummy_request, dbsession):
+        """Test deleting a restocked order with restoreStock leaves stock alone"""
+        pen, _ = add_products(dbsession)
+        order = add_order(dbsession, 'cancelled', [(pen, 3)])
+        inventory.restore_stock(dbsession, [order.id])
+        dummy_request.matchdict = {'id': str(order.id)}
+        dummy_request.json_body = {'restoreStock': True}
+        assert orders.delete_order(dummy_request)['message'].endswith('(stock not restored)')
+        assert pen.stock == 13
+
+    def test_routes(self, tmp_path, admin_headers):
+        """Test both restore endpoints are routed and commit"""
+        url = f"sqlite:///{tmp_path / 'app.sqlite'}"
+        Base.metadata.create_all(create_engine(url))
+        app = TestApp(main({}, **{'sqlalchemy.url': url}))
+        headers = admin_headers(app)
+        product = app.post_json('/api/products', {'title': 'Pen', 'description': 'Blue',
+                                                  'price': 2, 'stock': 5}, headers=headers).json
+        order = app.post_json('/api/checkout', {
+            'customerInfo': {'fullName': 'A', 'email': 'a@example.com', 'address': 'x', 'phoneNumber': '1'},
+            'items': [{'id': product['id'], 'quantity': 2}]}).json
+        app.post_json('/api/orders/status:batch', {'ids': [order['id']], 'status': 'cancelled'}, headers=headers)
+
+        response = app.post(f"/api/orders/{order['id']}/restore-stock", headers=headers)
+        assert response.json['result'] == 'already_restored'
+        response = app.post_json('/api/orders/restore-stock:batch', {'ids': [order['id']]}, headers=headers)
+        assert response.json['results'] == [{'id': order['id'], 'result': 'already_restored'}]
+        assert app.get(f"/api/products/{product['id']}").json['stock'] == 5